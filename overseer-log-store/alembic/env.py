@@ -21,6 +21,12 @@ fileConfig(config.config_file_name)
 # add your model's MetaData object here for 'autogenerate' support
 target_metadata = Base.metadata
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Exclude the FTS5 search index and its shadow tables from autogenerate."""
+    return not (type_ == "table" and name.startswith("data_accesses_fts"))
+
+
 # other values from the config, defined by the needs of env.py, can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
@@ -41,6 +47,7 @@ def run_migrations_offline():
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
         # batch mode required to add constraints to existing tables in SQLite by creating
         # a new table and copying all data (!)
         render_as_batch=True,
@@ -69,6 +76,7 @@ def run_migrations_online():
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
+            include_object=include_object,
             # batch mode required to add constraints to existing tables in SQLite by
             # creating a new table and copying all data (!)
             render_as_batch=True,
@@ -0,0 +1,36 @@
+"""Add justification search index
+
+Revision ID: d2b7c94e6a1f
+Revises: 8a3e1f2d4c5b
+Create Date: 2026-10-19 11:03:47.218653
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d2b7c94e6a1f"
+down_revision = "8a3e1f2d4c5b"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Virtual tables can't be autogenerated. Keep the statement in sync with
+    # `overseer.db.models`.
+    op.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS data_accesses_fts USING fts5(
+            justification,
+            content='data_accesses',
+            content_rowid='id',
+            tokenize='porter unicode61'
+        )
+        """
+    )
+
+    # index the justifications of all existing data accesses
+    op.execute("INSERT INTO data_accesses_fts(data_accesses_fts) VALUES('rebuild')")
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS data_accesses_fts")
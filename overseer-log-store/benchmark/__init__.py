@@ -0,0 +1,61 @@
+""" Benchmarks for Overseer, run from the project root, e.g. `python -m benchmark.auth` """
+
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+from typing import Callable, Dict
+
+BENCHMARK_DIRECTORY = tempfile.mkdtemp(prefix="overseer-benchmark-")
+
+
+def setup_environment():
+    """
+    Configure Overseer with a throwaway database and key pair.
+    Must be called before importing any overseer module.
+    """
+    private_key_path = os.path.join(BENCHMARK_DIRECTORY, "issuer")
+    public_key_path = os.path.join(BENCHMARK_DIRECTORY, "issuer.pub")
+
+    # fmt: off
+    subprocess.check_call(["openssl", "ecparam", "-name", "secp384r1", "-genkey", "-noout", "-out", private_key_path])
+    subprocess.check_call(["openssl", "ec", "-in", private_key_path, "-pubout", "-out", public_key_path], stderr=subprocess.DEVNULL)
+    # fmt: on
+
+    os.environ.setdefault("ADMIN_USER", "admin")
+    os.environ.setdefault("ADMIN_USER_PASSWORD", "admin")
+    os.environ.setdefault("TECHNICAL_USER", "tech")
+    os.environ.setdefault("TECHNICAL_USER_PASSWORD", "tech")
+    os.environ["DATABASE_URI"] = "sqlite:///" + os.path.join(
+        BENCHMARK_DIRECTORY, "data.db"
+    )
+    os.environ["JWT_ALGORITHM"] = "ES384"
+    os.environ["JWT_PUBLIC_KEY_PATH"] = public_key_path
+    os.environ.setdefault("REVOLORI_SERVICE_ROOT", "http://127.0.0.1:5429")
+
+
+def read_private_key() -> bytes:
+    with open(os.path.join(BENCHMARK_DIRECTORY, "issuer"), "rb") as file:
+        return file.read()
+
+
+def measure(func: Callable[[], object], repetitions: int) -> Dict[str, float]:
+    """Call `func` repeatedly and return latency statistics in milliseconds."""
+    durations = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+
+    durations.sort()
+    return {
+        "mean": statistics.mean(durations),
+        "p50": durations[len(durations) // 2],
+        "p99": durations[min(len(durations) - 1, int(len(durations) * 0.99))],
+    }
+
+
+def print_result(name: str, result: Dict[str, float]):
+    formatted = "  ".join(f"{key}={value:.3f}ms" for key, value in result.items())
+    print(f"{name:<40} {formatted}")
@@ -0,0 +1,45 @@
+""" Benchmark of the per-request cost of JWT authentication """
+
+import argparse
+import datetime as dt
+
+from benchmark import measure, print_result, read_private_key, setup_environment
+
+setup_environment()
+
+import jwt  # isort:skip
+from overseer.auth import IssuerKeySet, JWTBearer, VerifiedTokenCache  # isort:skip
+from overseer.settings import settings  # isort:skip
+
+
+def create_token(user: str) -> str:
+    content = {
+        "sub": user,
+        "exp": (dt.datetime.now() + dt.timedelta(days=1)).timestamp(),
+    }
+    return jwt.encode(content, read_private_key(), algorithm="ES384").decode()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--repetitions", type=int, default=2000)
+    args = parser.parse_args()
+
+    token = create_token("user1@example.com")
+    keys = IssuerKeySet(settings.JWT_ALGORITHM, settings.JWT_PUBLIC_KEY_PATH)
+
+    uncached = JWTBearer(settings.JWT_ALGORITHM, keys)
+    cached = JWTBearer(settings.JWT_ALGORITHM, keys, VerifiedTokenCache(10000, 300))
+
+    print_result(
+        "verify token (no cache)",
+        measure(lambda: uncached._parse_token(token), args.repetitions),
+    )
+    print_result(
+        "verify token (cached)",
+        measure(lambda: cached._parse_token(token), args.repetitions),
+    )
+
+
+if __name__ == "__main__":
+    main()
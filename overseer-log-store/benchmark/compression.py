@@ -0,0 +1,86 @@
+""" Benchmark of response size and latency of data access pages with compression """
+
+import argparse
+import datetime as dt
+
+from benchmark import measure, print_result, setup_environment
+
+setup_environment()
+
+from fastapi.testclient import TestClient  # isort:skip
+from overseer.auth import get_current_user  # isort:skip
+from overseer.compression import available_encoders  # isort:skip
+from overseer.dao.data_access import DataAccessDao  # isort:skip
+from overseer.db.connection import SessionLocal, init_db  # isort:skip
+from overseer.db.models import Tool  # isort:skip
+from overseer.main import overseer  # isort:skip
+
+OWNER = "owner@example.com"
+TOOLS = ["jira", "git", "slack", "confluence"]
+
+
+def fill_log(entries: int):
+    init_db()
+    with SessionLocal() as session:
+        session.add_all([Tool(name=tool) for tool in TOOLS])
+
+    with SessionLocal() as session:
+        DataAccessDao.generate_log(
+            session=session,
+            owner_rid=OWNER,
+            date_range=(dt.date(2020, 1, 1), dt.date(2020, 12, 31)),
+            number_of_entries=entries,
+            tools=TOOLS,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--pages",
+        default="10,100,1000,10000",
+        help="comma separated numbers of accesses per page",
+    )
+    parser.add_argument(
+        "--bandwidth",
+        type=float,
+        default=10,
+        help="bandwidth in Mbit/s used to estimate the transfer time",
+    )
+    parser.add_argument("-n", "--repetitions", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = sorted(int(page) for page in args.pages.split(","))
+    fill_log(pages[-1])
+
+    overseer.dependency_overrides[get_current_user] = lambda: OWNER
+    client = TestClient(overseer)
+    encodings = ["identity"] + list(available_encoders(6, 4))
+
+    for page in pages:
+        for encoding in encodings:
+
+            def request():
+                # content decodes the body, just like a browser would
+                return client.get(
+                    "/data-accesses",
+                    params={"limit": page},
+                    headers={"Accept-Encoding": encoding},
+                ).content
+
+            response = client.get(
+                "/data-accesses",
+                params={"limit": page},
+                headers={"Accept-Encoding": encoding},
+                stream=True,
+            )
+            size = len(response.raw.read(decode_content=False))
+            transfer = size * 8 / (args.bandwidth * 1000)
+
+            result = measure(request, args.repetitions)
+            result = {**result, "end-to-end": result["mean"] + transfer}
+            print_result(f"{page} accesses, {encoding}, {size / 1024:.1f}KiB", result)
+
+
+if __name__ == "__main__":
+    main()
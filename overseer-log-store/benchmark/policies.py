@@ -0,0 +1,124 @@
+""" Benchmark of policy evaluation as the policy table grows """
+
+import argparse
+import datetime as dt
+import random
+
+from benchmark import measure, print_result, setup_environment
+
+setup_environment()
+
+from overseer.dao.data_access_policy import DataAccessPolicyDao  # isort:skip
+from overseer.db.connection import SessionLocal, engine, init_db  # isort:skip
+from overseer.db.models import DataAccess, DataAccessPolicy, DataOwner  # isort:skip
+from overseer.db.models import Tool  # isort:skip
+from overseer.models import DataAccessKind  # isort:skip
+
+POLICIES_PER_OWNER = 10
+TOOLS = ["jira", "git", "slack", "confluence"]
+KINDS = [kind.value for kind in DataAccessKind]
+INDEX_NAME = "ix__data_access_policies__owner_rid__tool"
+
+
+def owner(number: int) -> str:
+    return f"owner-{number}@example.com"
+
+
+def random_policy(owner_number: int) -> dict:
+    return {
+        "owner_rid": owner(owner_number),
+        "tool": random.choice(TOOLS + [None]),
+        "access_kind": random.choice(KINDS + [None]),
+        "user_rid": random.choice([None, f"user-{random.randrange(100)}@example.com"]),
+        "validity_period_start_date": None,
+        "validity_period_end_date": None,
+    }
+
+
+def grow_policy_table(current_size: int, size: int):
+    """Insert policies until the table has `size` rows."""
+    rows = [
+        random_policy(number // POLICIES_PER_OWNER)
+        for number in range(current_size, size)
+    ]
+    with engine.begin() as connection:
+        connection.execute(DataAccessPolicy.__table__.insert(), rows)
+
+
+def random_access(owners: int, size: int) -> DataAccess:
+    data_access = DataAccess(
+        user_rid="user-1@example.com",
+        tool="jira",
+        access_kind=DataAccessKind.DIRECT,
+        timestamp=dt.datetime.now(),
+    )
+    # distinct owners, also when asking for more owners than have policies
+    owner_numbers = random.sample(
+        range(max(owners, size // POLICIES_PER_OWNER)), owners
+    )
+    data_access.data_owners = [
+        DataOwner(owner_rid=owner(number)) for number in owner_numbers
+    ]
+    return data_access
+
+
+def evaluate(data_access: DataAccess, granting_owners: bool):
+    session = SessionLocal()
+    try:
+        # bypass the decision cache to measure the query itself
+        if granting_owners:
+            owners = {owner.owner_rid for owner in data_access.data_owners}
+            DataAccessPolicyDao.load_granting_owners(session, data_access, owners)
+        else:
+            DataAccessPolicyDao.load_matching(session, data_access)
+    finally:
+        session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        default="1000,10000,100000,1000000",
+        help="comma separated numbers of policies in the table",
+    )
+    parser.add_argument(
+        "--owners",
+        default="10",
+        help="comma separated numbers of owners per access, e.g. 10,1000,100000",
+    )
+    parser.add_argument("-n", "--repetitions", type=int, default=200)
+    parser.add_argument(
+        "--without-index",
+        action="store_true",
+        help="drop the owner index to compare against a full table scan",
+    )
+    args = parser.parse_args()
+
+    init_db()
+    with SessionLocal() as session:
+        session.add_all([Tool(name=tool) for tool in TOOLS])
+
+    if args.without_index:
+        with engine.begin() as connection:
+            connection.execute(f"DROP INDEX {INDEX_NAME}")
+
+    current_size = 0
+    for size in sorted(int(size) for size in args.sizes.split(",")):
+        grow_policy_table(current_size, size)
+        current_size = size
+        for owners in sorted(int(owners) for owners in args.owners.split(",")):
+            data_access = random_access(owners, size)
+            for granting_owners in [False, True]:
+                name = "load_granting_owners" if granting_owners else "load_matching"
+                print_result(
+                    f"{name} {owners} owners, {size} policies",
+                    measure(
+                        lambda: evaluate(data_access, granting_owners),
+                        args.repetitions,
+                    ),
+                )
+
+
+if __name__ == "__main__":
+    main()
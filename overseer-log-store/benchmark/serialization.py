@@ -0,0 +1,69 @@
+""" Benchmark of standard vs. fast serialization of large data access pages """
+
+import argparse
+import datetime as dt
+
+from benchmark import measure, print_result, setup_environment
+
+setup_environment()
+
+from fastapi.testclient import TestClient  # isort:skip
+from overseer.auth import get_current_user  # isort:skip
+from overseer.dao.data_access import DataAccessDao  # isort:skip
+from overseer.db.connection import SessionLocal, init_db  # isort:skip
+from overseer.db.models import Tool  # isort:skip
+from overseer.main import overseer  # isort:skip
+from overseer.settings import settings  # isort:skip
+
+OWNER = "owner@example.com"
+TOOLS = ["jira", "git", "slack", "confluence"]
+
+
+def fill_log(entries: int):
+    init_db()
+    with SessionLocal() as session:
+        session.add_all([Tool(name=tool) for tool in TOOLS])
+
+    with SessionLocal() as session:
+        DataAccessDao.generate_log(
+            session=session,
+            owner_rid=OWNER,
+            date_range=(dt.date(2020, 1, 1), dt.date(2020, 12, 31)),
+            number_of_entries=entries,
+            tools=TOOLS,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--pages",
+        default="100,1000,10000",
+        help="comma separated numbers of accesses per page",
+    )
+    parser.add_argument("-n", "--repetitions", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = sorted(int(page) for page in args.pages.split(","))
+    fill_log(pages[-1])
+
+    overseer.dependency_overrides[get_current_user] = lambda: OWNER
+    client = TestClient(overseer)
+
+    for page in pages:
+        for fast_serialization in [False, True]:
+            settings.FAST_SERIALIZATION = fast_serialization
+
+            def request():
+                return client.get(
+                    "/data-accesses",
+                    params={"limit": page},
+                    headers={"Accept-Encoding": "identity"},
+                )
+
+            mode = "fast" if fast_serialization else "standard"
+            print_result(f"{page} accesses, {mode}", measure(request, args.repetitions))
+
+
+if __name__ == "__main__":
+    main()
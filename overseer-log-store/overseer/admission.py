@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+""" Per-tool admission control of access requests """
+
+import math
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from overseer.models import ToolLimits
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average and bursts of `burst` requests."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take a token. Returns 0 on success or the seconds until one is available."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+        if self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+        self._tokens -= 1
+        return 0
+
+
+class ToolAdmission:
+    """Admission state and counters of a single tool."""
+
+    def __init__(self):
+        self.limits: Optional[ToolLimits] = None
+        self.bucket: Optional[TokenBucket] = None
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed_concurrency = 0
+        self.shed_rate = 0
+
+    def configure(self, limits: ToolLimits):
+        """
+        Apply changed limits. The bucket starts full again, requests in flight stay.
+        """
+        if limits == self.limits:
+            return
+
+        self.limits = limits
+        self.bucket = None
+        if limits.rate_limit is not None:
+            burst = limits.rate_limit_burst or math.ceil(limits.rate_limit)
+            self.bucket = TokenBucket(limits.rate_limit, burst)
+
+
+class AdmissionControl:
+    """
+    Sheds the access requests of tools which exceed the concurrency or rate limits
+    configured on their `Tool` row, so that a flood of requests from one tool doesn't
+    starve the thread pool and the database writer for all others.
+
+    The limits are enforced per process. Requests are rejected before they do any
+    work, so shedding is cheap even under overload.
+    """
+
+    def __init__(self):
+        self._tools: Dict[str, ToolAdmission] = {}
+        self._lock = threading.Lock()
+
+    def admit(self, tool: str, limits: ToolLimits) -> Tuple[bool, float]:
+        """
+        Try to admit a request of the tool. Returns whether it is admitted and
+        otherwise the seconds after which a retry may succeed. Admitted requests must
+        be released with `release`.
+        """
+        with self._lock:
+            admission = self._tools.get(tool)
+            if admission is None:
+                admission = self._tools[tool] = ToolAdmission()
+            admission.configure(limits)
+
+            max_concurrent = limits.max_concurrent_requests
+            if max_concurrent is not None and admission.in_flight >= max_concurrent:
+                admission.shed_concurrency += 1
+                return False, 1
+
+            if admission.bucket is not None:
+                retry_after = admission.bucket.take()
+                if retry_after > 0:
+                    admission.shed_rate += 1
+                    return False, retry_after
+
+            admission.in_flight += 1
+            admission.admitted += 1
+            return True, 0
+
+    def release(self, tool: str):
+        """Release an admitted request once it is done."""
+        with self._lock:
+            self._tools[tool].in_flight -= 1
+
+    def metrics(self) -> Dict[str, float]:
+        metrics: Dict[str, float] = {}
+        with self._lock:
+            for tool, admission in sorted(self._tools.items()):
+                metrics[f"{tool}.in_flight"] = admission.in_flight
+                metrics[f"{tool}.admitted"] = admission.admitted
+                metrics[f"{tool}.shed_concurrency"] = admission.shed_concurrency
+                metrics[f"{tool}.shed_rate"] = admission.shed_rate
+        return metrics
+
+
+admission_control = AdmissionControl()
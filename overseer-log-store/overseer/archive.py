@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+""" Cold archive of old data accesses """
+
+import argparse
+import datetime as dt
+import fcntl
+import functools
+import gzip
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from overseer.models import DataAccessFilter, RevoloriId
+from overseer.settings import settings
+
+SEGMENT_SUFFIX = ".seg"
+INDEX_SUFFIX = ".idx"
+PENDING_SUFFIX = ".pending"
+WATERMARK_FILE = "watermark"
+LOCK_FILE = "lock"
+
+# an archived data access, i.e. a dict with the fields `id`, `access_kind`,
+# `data_types`, `justification`, `timestamp`, `tool` and `user_rid`
+ArchivedAccess = Dict[str, Any]
+
+# how many accesses of an owner share a date, tool, user and access kind
+SummaryRow = Tuple[str, str, str, str, int]
+
+# offset, length and number of accesses of the part of a segment which belongs to an
+# owner, and the summary of those accesses. Segments written before summaries were
+# indexed have no summary.
+IndexEntry = Tuple[Any, ...]
+
+
+def _month_of(date: dt.date) -> str:
+    return f"{date.year:04}-{date.month:02}"
+
+
+def _write_atomically(path: str, content: bytes):
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(content)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+
+
+@functools.lru_cache(maxsize=1024)
+def _read_index(path: str, mtime_ns: int) -> Dict[RevoloriId, IndexEntry]:
+    """Read the index of a segment. Segments never change, so indexes are cached."""
+    with open(path) as file:
+        return {owner_rid: tuple(entry) for owner_rid, entry in json.load(file).items()}
+
+
+def _summarize(accesses: List[ArchivedAccess]) -> List[SummaryRow]:
+    counts: Dict[Tuple[str, str, str, str], int] = {}
+    for access in accesses:
+        key = (
+            access["timestamp"].date().isoformat(),
+            access["tool"],
+            access["user_rid"],
+            access["access_kind"],
+        )
+        counts[key] = counts.get(key, 0) + 1
+    return [(*key, count) for key, count in sorted(counts.items())]
+
+
+class AccessArchive:
+    """
+    Append-only archive of data accesses in compressed segment files.
+
+    Accesses are grouped by the month of their timestamp into directories named
+    `YYYY-MM`. Every archiving run adds a new segment to each month it touches. A
+    segment stores the accesses of each owner as a separate gzip member of JSON lines.
+    Its index maps each owner to the offset, length and number of their accesses, so
+    reading the accesses of one owner only decompresses their part of the segment, and
+    to a summary of their accesses, so counting them doesn't decompress anything.
+
+    All archived accesses are older than the watermark. A segment is written with a
+    pending index and only published once its accesses are deleted from the database,
+    so no access is visible in both. Segments without an index are ignored. Archiving
+    runs hold the lock of the archive, so every access is archived in one segment.
+    """
+
+    def __init__(self, directory: Optional[str]):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """
+        Hold the archive exclusively across threads and processes. Segments are only
+        written, published and discarded while holding it.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, LOCK_FILE), "a") as file:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+            yield
+
+    def watermark(self) -> Optional[dt.datetime]:
+        """Return the point in time before which accesses may have been archived."""
+        if not self.enabled:
+            return None
+
+        try:
+            with open(os.path.join(self.directory, WATERMARK_FILE)) as file:
+                return dt.datetime.fromisoformat(file.read().strip())
+        except FileNotFoundError:
+            return None
+
+    def advance_watermark(self, watermark: dt.datetime):
+        """Move the watermark forward, it is never moved back."""
+        with self._lock:
+            current = self.watermark()
+            if current is None or current < watermark:
+                os.makedirs(self.directory, exist_ok=True)
+                path = os.path.join(self.directory, WATERMARK_FILE)
+                _write_atomically(path, watermark.isoformat().encode())
+
+    def covers(self, date_start: Optional[dt.date]) -> bool:
+        """Check whether archived accesses may be on or after the start date."""
+        watermark = self.watermark()
+        if watermark is None:
+            return False
+        return (
+            date_start is None
+            or dt.datetime.combine(date_start, dt.time.min) < watermark
+        )
+
+    def _months(
+        self, date_start: Optional[dt.date], date_end: Optional[dt.date]
+    ) -> List[str]:
+        """The archived months within the date range, newest first."""
+        if not self.enabled or not os.path.isdir(self.directory):
+            return []
+
+        months = [
+            entry.name
+            for entry in os.scandir(self.directory)
+            if entry.is_dir()
+            and (date_start is None or entry.name >= _month_of(date_start))
+            and (date_end is None or entry.name <= _month_of(date_end))
+        ]
+        return sorted(months, reverse=True)
+
+    def _segments(self, month: str, suffix: str = INDEX_SUFFIX) -> List[str]:
+        """The segments of a month with the given suffix, by default the published."""
+        directory = os.path.join(self.directory, month)
+        return sorted(
+            os.path.join(directory, name[: -len(suffix)])
+            for name in os.listdir(directory)
+            if name.endswith(suffix)
+        )
+
+    @staticmethod
+    def _index(segment: str) -> Dict[RevoloriId, IndexEntry]:
+        index_path = segment + INDEX_SUFFIX
+        return _read_index(index_path, os.stat(index_path).st_mtime_ns)
+
+    @staticmethod
+    def _decompress(segment: str, offset: int = 0, length: int = -1) -> List[dict]:
+        with open(segment + SEGMENT_SUFFIX, "rb") as file:
+            file.seek(offset)
+            lines = gzip.decompress(file.read(length)).splitlines()
+        return [json.loads(line) for line in lines]
+
+    def _read(self, segment: str, owner_rid: RevoloriId) -> List[ArchivedAccess]:
+        index = self._index(segment)
+        if owner_rid not in index:
+            return []
+
+        offset, length = index[owner_rid][:2]
+        accesses = self._decompress(segment, offset, length)
+        for access in accesses:
+            access["timestamp"] = dt.datetime.fromisoformat(access["timestamp"])
+        return accesses
+
+    def _load_month(self, month: str, owner_rid: RevoloriId) -> List[ArchivedAccess]:
+        """The accesses of the owner in a month, newest first."""
+        accesses: List[ArchivedAccess] = []
+        for segment in self._segments(month):
+            accesses.extend(self._read(segment, owner_rid))
+
+        return sorted(
+            accesses,
+            key=lambda access: (access["timestamp"], access["id"]),
+            reverse=True,
+        )
+
+    def load(
+        self,
+        owner_rid: RevoloriId,
+        date_start: Optional[dt.date] = None,
+        date_end: Optional[dt.date] = None,
+    ) -> Iterator[List[ArchivedAccess]]:
+        """
+        Generate the archived accesses of the owner per month, newest month first.
+        The accesses of each month are ordered newest first. Only whole months are
+        selected, the accesses still have to be filtered by their exact date.
+        """
+        for month in self._months(date_start, date_end):
+            yield self._load_month(month, owner_rid)
+
+    def summarize(
+        self,
+        owner_rid: RevoloriId,
+        date_start: Optional[dt.date] = None,
+        date_end: Optional[dt.date] = None,
+    ) -> Iterator[Tuple[ArchivedAccess, int]]:
+        """
+        Generate the archived accesses of the owner together with how many accesses
+        share their date, tool, user and access kind, which are the only fields set.
+        The counts are read from the indexes, only months with segments written
+        before summaries were indexed are decompressed.
+        """
+        for month in self._months(date_start, date_end):
+            segments = self._segments(month)
+            entries = [self._index(segment).get(owner_rid) for segment in segments]
+            if any(entry is not None and len(entry) < 4 for entry in entries):
+                for access in self._load_month(month, owner_rid):
+                    yield access, 1
+                continue
+
+            for entry in entries:
+                for date, tool, user_rid, access_kind, count in (
+                    entry[3] if entry else []
+                ):
+                    access = dict(
+                        timestamp=dt.datetime.fromisoformat(date),
+                        tool=tool,
+                        user_rid=user_rid,
+                        access_kind=access_kind,
+                    )
+                    yield access, count
+
+    def write(
+        self, month: dt.date, accesses: Dict[RevoloriId, List[ArchivedAccess]]
+    ) -> str:
+        """
+        Write the accesses of a month into a new segment and return its path without
+        suffix. The segment stays invisible until it is published.
+        """
+        directory = os.path.join(self.directory, _month_of(month))
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            # also counts unpublished segments, so their names aren't reused
+            sequence_number = len(self._segments(_month_of(month), SEGMENT_SUFFIX))
+            segment = os.path.join(directory, f"{sequence_number:06}")
+
+            index: Dict[RevoloriId, IndexEntry] = {}
+            with open(segment + SEGMENT_SUFFIX, "wb") as file:
+                for owner_rid, owner_accesses in sorted(accesses.items()):
+                    lines = "".join(
+                        json.dumps(access, default=dt.datetime.isoformat) + "\n"
+                        for access in owner_accesses
+                    )
+                    compressed = gzip.compress(lines.encode())
+                    index[owner_rid] = (
+                        file.tell(),
+                        len(compressed),
+                        len(owner_accesses),
+                        _summarize(owner_accesses),
+                    )
+                    file.write(compressed)
+                file.flush()
+                os.fsync(file.fileno())
+
+            _write_atomically(segment + PENDING_SUFFIX, json.dumps(index).encode())
+
+        return segment
+
+    def publish(self, segment: str):
+        """Make a segment visible once its accesses are deleted from the database."""
+        os.replace(segment + PENDING_SUFFIX, segment + INDEX_SUFFIX)
+
+    def discard(self, segment: str):
+        """Remove a segment whose accesses could not be deleted from the database."""
+        with self._lock:
+            os.remove(segment + PENDING_SUFFIX)
+            os.remove(segment + SEGMENT_SUFFIX)
+
+    def pending(self) -> Iterator[Tuple[str, List[ArchivedAccess]]]:
+        """
+        Generate the segments which were neither published nor discarded, e.g. after
+        a crash, with their accesses. Accesses of several owners appear repeatedly.
+        Only segments of interrupted runs are pending while holding the lock.
+        """
+        for month in self._months(None, None):
+            for segment in self._segments(month, PENDING_SUFFIX):
+                accesses = self._decompress(segment)
+                for access in accesses:
+                    access["timestamp"] = dt.datetime.fromisoformat(access["timestamp"])
+                yield segment, accesses
+
+
+def matches(
+    access: ArchivedAccess,
+    date_start: Optional[dt.date] = None,
+    date_end: Optional[dt.date] = None,
+    filters: Optional[DataAccessFilter] = None,
+) -> bool:
+    """
+    Check whether an archived access lies within the date range and matches the
+    filters. The full text search is approximated by matching the words of the
+    search without stemming.
+    """
+    date = access["timestamp"].date()
+    if date_start is not None and date < date_start:
+        return False
+    if date_end is not None and date > date_end:
+        return False
+    if filters is None:
+        return True
+
+    if filters.tools and access["tool"] not in filters.tools:
+        return False
+    if filters.user_rids and access["user_rid"] not in filters.user_rids:
+        return False
+    if filters.access_kinds and access["access_kind"] not in filters.access_kinds:
+        return False
+    if filters.data_types and not set(access["data_types"]) & set(filters.data_types):
+        return False
+    if filters.search and filters.search.strip():
+        justification = (access["justification"] or "").lower()
+        if not all(word in justification for word in filters.search.lower().split()):
+            return False
+
+    return True
+
+
+access_archive = AccessArchive(settings.ARCHIVE_DIRECTORY)
+
+
+def main():
+    # imported here since the data access DAO depends on this module
+    from overseer.dao.data_access import DataAccessDao
+    from overseer.db.connection import SessionLocal, init_db
+
+    parser = argparse.ArgumentParser(
+        description="Move old data accesses into the cold archive."
+    )
+    parser.add_argument(
+        "--before",
+        type=dt.date.fromisoformat,
+        default=dt.date.today() - dt.timedelta(days=settings.ARCHIVE_AFTER_DAYS),
+        help="archive the accesses before this date (default: ARCHIVE_AFTER_DAYS ago)",
+    )
+    args = parser.parse_args()
+
+    if not access_archive.enabled:
+        parser.error("ARCHIVE_DIRECTORY is not set.")
+
+    init_db()
+    with SessionLocal() as session:
+        archived = DataAccessDao.archive(
+            session, dt.datetime.combine(args.before, dt.time.min)
+        )
+    print(f"{archived} data accesses were archived")
+
+
+if __name__ == "__main__":
+    main()
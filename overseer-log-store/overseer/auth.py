@@ -1,28 +1,205 @@
+import hashlib
+import logging
+import os
 import secrets
+import threading
+import time
+from collections import OrderedDict
 from os import path
-from typing import Mapping
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBasic, HTTPBearer
 from pydantic import BaseModel, ValidationError
 
 import jwt
-from jwt import InvalidTokenError
+from jwt import InvalidSignatureError, InvalidTokenError
+from jwt.algorithms import get_default_algorithms
 from overseer.models import RevoloriId
 from overseer.settings import settings
 from starlette.requests import Request
 from starlette.status import HTTP_401_UNAUTHORIZED
 
+logger = logging.getLogger(__name__)
+
+PUBLIC_KEY_EXTENSIONS = (".pub", ".pem")
+
 
 class JWTAuthenticationCredentials(BaseModel):
     user_rid: RevoloriId
 
 
+class VerifiedTokenCache:
+    """
+    Bounded LRU cache of the claims of tokens whose signature has been verified.
+
+    Entries are keyed by the SHA-256 hash of the token, so the tokens themselves are
+    not kept in memory. An entry expires with the `exp` claim of its token, but after
+    `max_ttl` seconds at the latest.
+    """
+
+    def __init__(self, max_size: int, max_ttl: float):
+        self._max_size = max_size
+        self._max_ttl = max_ttl
+        self._entries: "OrderedDict[bytes, Tuple[float, Mapping]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Mapping]:
+        """Return the cached claims of the token or None if they are unknown."""
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, claims = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return claims
+
+    def put(self, token: str, claims: Mapping):
+        """Cache the claims of a verified token."""
+        if self._max_size <= 0:
+            return
+
+        expires_at = min(float(claims["exp"]), time.time() + self._max_ttl)
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all cached tokens."""
+        with self._lock:
+            self._entries.clear()
+
+
+class IssuerKeySet:
+    """
+    Set of pre-parsed public keys of the JWT issuer, selected by the `kid` header.
+
+    The key path is either a single PEM file or a directory of PEM files (`*.pub` or
+    `*.pem`). The id of a key is its file name without extension. Keys are parsed once
+    when they are loaded and reloaded in the background whenever the key files change,
+    so keys can be rotated by adding the new key next to the old one without restarting.
+    The keys are loaded on startup or on first use, not when the set is created.
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        key_path: str,
+        on_change: Optional[Callable[[], None]] = None,
+    ):
+        self._algorithm = get_default_algorithms()[algorithm]
+        self._key_path = path.abspath(key_path)
+        self._on_change = on_change
+        self._keys: Dict[str, Any] = {}
+        self._fingerprint: Optional[Tuple] = None
+        self._reload_lock = threading.Lock()
+        self._stop_reloading = threading.Event()
+        self._reloader: Optional[threading.Thread] = None
+
+    def _key_files(self) -> List[str]:
+        if not path.isdir(self._key_path):
+            return [self._key_path]
+
+        return sorted(
+            path.join(self._key_path, name)
+            for name in os.listdir(self._key_path)
+            if name.endswith(PUBLIC_KEY_EXTENSIONS)
+        )
+
+    def _current_fingerprint(self) -> Tuple:
+        files = self._key_files()
+        return tuple((file, os.stat(file).st_mtime_ns) for file in files)
+
+    def reload(self) -> bool:
+        """Parse the key files again if they changed. Returns whether they changed."""
+        with self._reload_lock:
+            fingerprint = self._current_fingerprint()
+            if fingerprint == self._fingerprint:
+                return False
+
+            keys = {}
+            for file, _ in fingerprint:
+                kid = path.splitext(path.basename(file))[0]
+                keys[kid] = self._algorithm.prepare_key(read_pub_key(file))
+
+            self._keys = keys
+            self._fingerprint = fingerprint
+
+        logger.info("Loaded JWT issuer keys %s", ", ".join(keys))
+        if self._on_change is not None:
+            self._on_change()
+        return True
+
+    def candidates(self, kid: Optional[str]) -> List[Any]:
+        """
+        Return the keys which may have signed a token with the given key id.
+        Tokens without key id are checked against all keys.
+        """
+        if self._fingerprint is None:
+            # not loaded on startup, e.g. in tests
+            self.reload()
+
+        keys = self._keys
+        if kid is None:
+            return list(keys.values())
+        return [keys[kid]] if kid in keys else []
+
+    def _reload_periodically(self, interval: float):
+        while not self._stop_reloading.wait(interval):
+            try:
+                self.reload()
+            except Exception:
+                # keep the previous keys, e.g. while a key file is being replaced
+                logger.exception("Reloading the JWT issuer keys failed.")
+
+    def start_reloading(self, interval: float):
+        """Start watching the key files in a background thread."""
+        if self._reloader is not None:
+            return
+
+        self._stop_reloading.clear()
+        self._reloader = threading.Thread(
+            target=self._reload_periodically,
+            args=(interval,),
+            name="jwt-key-reloader",
+            daemon=True,
+        )
+        self._reloader.start()
+
+    def stop_reloading(self):
+        """Stop watching the key files."""
+        if self._reloader is None:
+            return
+
+        self._stop_reloading.set()
+        self._reloader.join()
+        self._reloader = None
+
+
 class JWTBearer(HTTPBearer):
-    def __init__(self, algorithm: str, issuer_public_key: bytes):
+    def __init__(
+        self,
+        algorithm: str,
+        issuer_keys: IssuerKeySet,
+        token_cache: Optional[VerifiedTokenCache] = None,
+    ):
         super().__init__(auto_error=False)
         self._algorithm = algorithm
-        self._issuer_public_key = issuer_public_key
+        self._issuer_keys = issuer_keys
+        self._token_cache = token_cache
 
     async def __call__(self, request: Request) -> JWTAuthenticationCredentials:
         credentials = await super().__call__(request)
@@ -35,18 +212,45 @@ class JWTBearer(HTTPBearer):
         return self._parse_claims(token)
 
     def _parse_token(self, credentials: str) -> Mapping:
+        if self._token_cache is not None:
+            cached_token = self._token_cache.get(credentials)
+            if cached_token is not None:
+                return cached_token
+
         try:
-            return jwt.decode(
-                credentials,
-                self._issuer_public_key,
-                algorithms=[self._algorithm],
-                options={"require_exp": True, "verify_exp": True},
-            )
+            token = self._decode(credentials)
         except InvalidTokenError:
             raise HTTPException(
                 status_code=HTTP_401_UNAUTHORIZED, detail="Invalid token"
             )
 
+        if self._token_cache is not None:
+            self._token_cache.put(credentials, token)
+
+        return token
+
+    def _decode(self, credentials: str) -> Mapping:
+        kid = jwt.get_unverified_header(credentials).get("kid")
+        keys = self._issuer_keys.candidates(kid)
+        if not keys:
+            raise InvalidTokenError(f"Unknown key id {kid}.")
+
+        for key in keys[:-1]:
+            try:
+                return self._decode_with_key(credentials, key)
+            except InvalidSignatureError:
+                continue
+
+        return self._decode_with_key(credentials, keys[-1])
+
+    def _decode_with_key(self, credentials: str, key: Any) -> Mapping:
+        return jwt.decode(
+            credentials,
+            key,
+            algorithms=[self._algorithm],
+            options={"require_exp": True, "verify_exp": True},
+        )
+
     @staticmethod
     def _parse_claims(token: Mapping) -> JWTAuthenticationCredentials:
         try:
@@ -63,7 +267,14 @@ def read_pub_key(pub_key_path: str) -> bytes:
         return file.read()
 
 
-jwt_auth = JWTBearer(settings.JWT_ALGORITHM, read_pub_key(settings.JWT_PUBLIC_KEY_PATH))
+token_cache = VerifiedTokenCache(settings.JWT_CACHE_SIZE, settings.JWT_CACHE_TTL)
+
+# tokens verified with a removed key must not outlive the key in the cache
+issuer_keys = IssuerKeySet(
+    settings.JWT_ALGORITHM, settings.JWT_PUBLIC_KEY_PATH, on_change=token_cache.clear
+)
+
+jwt_auth = JWTBearer(settings.JWT_ALGORITHM, issuer_keys, token_cache)
 
 
 def get_current_user(credentials: JWTAuthenticationCredentials = Depends(jwt_auth)):
@@ -79,15 +290,19 @@ class RequiredLogin(HTTPBasic):
     async def __call__(self, request: Request):
         credentials = await super().__call__(request)
 
-        correct_username = secrets.compare_digest(credentials.username, self._username)
-        correct_password = secrets.compare_digest(credentials.password, self._password)
-        if not (correct_username and correct_password):
+        if not self.is_valid(credentials.username, credentials.password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect username or password",
                 headers={"WWW-Authenticate": "Basic"},
             )
 
+    def is_valid(self, username: str, password: str) -> bool:
+        """Check the given credentials in constant time."""
+        correct_username = secrets.compare_digest(username, self._username)
+        correct_password = secrets.compare_digest(password, self._password)
+        return correct_username and correct_password
+
 
 technical_user_logged_in = RequiredLogin(
     "Technical User", settings.TECHNICAL_USER, settings.TECHNICAL_USER_PASSWORD
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+""" In-process caches """
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, Iterable, Optional, Tuple, TypeVar
+
+from overseer.models import RevoloriId, Tool
+from overseer.settings import settings
+
+# (tool, access_kind, user_rid, date of access in ISO format)
+AccessSignature = Tuple[str, str, str, str]
+
+T = TypeVar("T")
+
+
+class PolicyDecisionCache:
+    """
+    Bounded LRU cache of the policy decisions of data owners keyed by the signature of
+    the access.
+
+    Every owner has a generation counter which is bumped whenever the owner's policies
+    change, and clearing the cache bumps the generations of all owners. Decisions are
+    stored with the generation they were computed for and are ignored once the
+    generation of their owner moved on.
+    """
+
+    def __init__(self, max_size: int):
+        self._max_size = max_size
+        self._entries: "OrderedDict[Hashable, Tuple[int, bool]]" = OrderedDict()
+        self._generations: Dict[RevoloriId, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def generation(self, owner_rid: RevoloriId) -> int:
+        """Return the current generation of the owner's policies."""
+        return self._epoch + self._generations.get(owner_rid, 0)
+
+    def get(self, owner_rid: RevoloriId, signature: AccessSignature) -> Optional[bool]:
+        """Return whether the owner grants the access or None if it is unknown."""
+        key = (owner_rid, signature)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != self.generation(owner_rid):
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(
+        self,
+        owner_rid: RevoloriId,
+        signature: AccessSignature,
+        generation: int,
+        granted: bool,
+    ):
+        """
+        Store a decision. `generation` must be read before loading the policies the
+        decision is based on, so that decisions racing with a change are discarded.
+        """
+        if self._max_size <= 0:
+            return
+
+        key = (owner_rid, signature)
+        with self._lock:
+            self._entries[key] = (generation, granted)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, owner_rids: Iterable[RevoloriId]):
+        """Discard the decisions of the owners by bumping their generations."""
+        with self._lock:
+            for owner_rid in owner_rids:
+                self._generations[owner_rid] = self._generations.get(owner_rid, 0) + 1
+                self.invalidations += 1
+
+    def clear(self):
+        """Discard all decisions."""
+        with self._lock:
+            self._entries.clear()
+            self._epoch += 1
+            self.invalidations += 1
+
+    def metrics(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+class TableSnapshot(Generic[T]):
+    """
+    Copy of a small table which is loaded on first use and dropped whenever the table
+    changes.
+    """
+
+    def __init__(self):
+        self._value: Optional[T] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def cached(self) -> Optional[T]:
+        """Return the snapshot or None if it must be loaded."""
+        return self._value
+
+    def get(self, load: Callable[[], T]) -> T:
+        """Return the snapshot, loading it with `load` if there is none."""
+        value = self._value
+        if value is not None:
+            return value
+
+        generation = self._generation
+        value = load()
+        with self._lock:
+            # don't keep a snapshot which was loaded while the table changed
+            if generation == self._generation:
+                self._value = value
+        return value
+
+    def invalidate(self, keys: Optional[Iterable[str]] = None):
+        """Drop the snapshot. It always covers the whole table, so keys are ignored."""
+        with self._lock:
+            self._value = None
+            self._generation += 1
+
+
+policy_decision_cache = PolicyDecisionCache(settings.POLICY_CACHE_SIZE)
+# tools by name
+tool_snapshot: "TableSnapshot[Dict[str, Tool]]" = TableSnapshot()
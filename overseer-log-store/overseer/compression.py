@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+""" Compression of large responses """
+
+import gzip
+from typing import Callable, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli is optional
+    brotli = None
+
+
+def available_encoders(
+    gzip_level: int, brotli_quality: int
+) -> Dict[str, Callable[[bytes], bytes]]:
+    """The supported content encodings and their compression functions."""
+    encoders = {"gzip": lambda body: gzip.compress(body, compresslevel=gzip_level)}
+    if brotli is not None:
+        encoders["br"] = lambda body: brotli.compress(body, quality=brotli_quality)
+    return encoders
+
+
+def accepted_encodings(accept_encoding: str) -> List[str]:
+    """Parse the encodings of an `Accept-Encoding` header, ignoring those with q=0."""
+    encodings = []
+    for item in accept_encoding.split(","):
+        encoding, _, parameter = item.partition(";")
+        name, _, value = parameter.partition("=")
+        if name.strip() == "q":
+            try:
+                if float(value) <= 0:
+                    continue
+            except ValueError:
+                continue
+        encodings.append(encoding.strip().lower())
+    return encodings
+
+
+class CompressionMiddleware:
+    """
+    Middleware which compresses responses of at least `minimum_size` bytes using the
+    first of `encodings` the client accepts.
+
+    Only responses which are sent in a single body message are compressed. Streaming
+    responses, e.g. the live feed, are passed through, so that their events aren't held
+    back in the buffer of the compressor. Compression runs in the thread pool to keep
+    the event loop responsive while large pages are compressed.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        encodings: List[str],
+        minimum_size: int = 1000,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        encoders = available_encoders(gzip_level, brotli_quality)
+        self.encoders = {
+            encoding: encoders[encoding]
+            for encoding in encodings
+            if encoding in encoders
+        }
+
+    def _select_encoding(self, scope: Scope) -> Optional[str]:
+        accepted = accepted_encodings(Headers(scope=scope).get("Accept-Encoding", ""))
+        for encoding in self.encoders:
+            if encoding in accepted or "*" in accepted:
+                return encoding
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        encoding = self._select_encoding(scope) if scope["type"] == "http" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        compress = self.encoders[encoding]
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                # hold the headers back until the body shows whether to compress
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            passthrough = True
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+
+            if (
+                not message.get("more_body", False)
+                and len(body) >= self.minimum_size
+                and "Content-Encoding" not in headers
+            ):
+                body = await run_in_threadpool(compress, body)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+                message = {**message, "body": body}
+
+            await send(start_message)
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
@@ -4,16 +4,38 @@
 import datetime as dt
 import itertools
 import random
-from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from fastapi import Depends
-from sqlalchemy import func
+from sqlalchemy import event, func, select, text
 from sqlalchemy.orm import Query, selectinload
 
+import overseer.models as dto
+from overseer.archive import ArchivedAccess, access_archive, matches
 from overseer.auth import get_current_user
 from overseer.db.connection import Session
-from overseer.db.models import DataAccess, DataOwner
-from overseer.models import DataAccessKind, RevoloriId
+from overseer.db.models import DataAccess, DataOwner, DataType, justification_search
+from overseer.live import access_feed
+from overseer.models import (
+    DataAccessFilter,
+    DataAccessKind,
+    HistogramGroup,
+    HistogramInterval,
+    RevoloriId,
+)
+
+LOGGED_ACCESSES = "logged_data_accesses"
+
+# maximum number of bound parameters per statement when deleting archived accesses
+ARCHIVE_DELETE_CHUNK_SIZE = 500
+
+# SQLite expressions mapping the timestamp of an access to the first day of its bucket
+HISTOGRAM_BUCKETS = {
+    HistogramInterval.DAY: func.DATE(DataAccess.timestamp),
+    HistogramInterval.WEEK: func.DATE(DataAccess.timestamp, "weekday 0", "-6 days"),
+    HistogramInterval.MONTH: func.DATE(DataAccess.timestamp, "start of month"),
+}
 
 
 class DataAccessDao:
@@ -31,19 +53,86 @@ class DataAccessDao:
 
     @staticmethod
     def add(session: Session, data_access: DataAccess):
-        """Insert a data access into the database"""
+        """
+        Insert a data access into the database.
+        Its justification is added to the search index when the access is inserted and
+        the access is published to the live feed once the transaction is committed.
+        """
         session.add(data_access)
 
+        if access_feed.has_subscribers():
+            # snapshot the access, its attributes are expired after the commit
+            owner_rids = [owner.owner_rid for owner in data_access.data_owners]
+            access = dict(
+                access_kind=data_access.access_kind,
+                data_types=[data_type.type for data_type in data_access.data_types],
+                justification=data_access.justification,
+                timestamp=data_access.timestamp,
+                tool=data_access.tool,
+                user_rid=data_access.user_rid,
+            )
+            session.info.setdefault(LOGGED_ACCESSES, []).append((owner_rids, access))
+
+    def _filter_query_with_owner(self, query: Query) -> Query:
+        # an IN subquery lets SQLite look the owner up in the owner_rid index instead of
+        # checking the owners of every access
+        owned_accesses = select([DataOwner.data_access_id]).where(
+            DataOwner.owner_rid == self.logged_in_user
+        )
+        return query.filter(DataAccess.id.in_(owned_accesses))
+
+    def change_watermark(self, session: Session) -> Optional[int]:
+        """
+        Return the id of the newest data access of the given data owner. Ids only grow,
+        so the watermark changes whenever an access of the owner is logged. The owner
+        index answers this without reading the accesses.
+        """
+        query = session.query(func.max(DataOwner.data_access_id)).filter(
+            DataOwner.owner_rid == self.logged_in_user
+        )
+        return query.scalar()
+
     @staticmethod
     def _filter_query_with_date_range(
         query: Query,
         date_start: Optional[dt.date] = None,
         date_end: Optional[dt.date] = None,
     ) -> Query:
+        # compare the raw timestamp instead of DATE(timestamp) so the index can be used
         if date_start is not None:
-            query = query.filter(func.DATE(DataAccess.timestamp) >= date_start)
+            start = dt.datetime.combine(date_start, dt.time.min)
+            query = query.filter(DataAccess.timestamp >= start)
         if date_end is not None:
-            query = query.filter(func.DATE(DataAccess.timestamp) <= date_end)
+            end = dt.datetime.combine(date_end + dt.timedelta(days=1), dt.time.min)
+            query = query.filter(DataAccess.timestamp < end)
+
+        return query
+
+    @staticmethod
+    def _filter_query_with_attributes(
+        query: Query, filters: Optional[DataAccessFilter] = None
+    ) -> Query:
+        if filters is None:
+            return query
+
+        if filters.tools:
+            query = query.filter(DataAccess.tool.in_(filters.tools))
+        if filters.user_rids:
+            query = query.filter(DataAccess.user_rid.in_(filters.user_rids))
+        if filters.access_kinds:
+            query = query.filter(DataAccess.access_kind.in_(filters.access_kinds))
+        if filters.data_types:
+            accesses_with_type = select([DataType.data_access_id]).where(
+                DataType.type.in_(filters.data_types)
+            )
+            query = query.filter(DataAccess.id.in_(accesses_with_type))
+        if filters.search and filters.search.strip():
+            matching_accesses = select([justification_search.c.rowid]).where(
+                justification_search.c.justification.op("MATCH")(
+                    _to_fts_query(filters.search)
+                )
+            )
+            query = query.filter(DataAccess.id.in_(matching_accesses))
 
         return query
 
@@ -54,16 +143,17 @@ class DataAccessDao:
         date_end: Optional[dt.date] = None,
         limit: Optional[int] = None,
         offset: Optional[int] = None,
+        filters: Optional[DataAccessFilter] = None,
     ) -> List[DataAccess]:
         """Load all entries of the given data owner."""
 
-        query = session.query(DataAccess).filter(
-            DataAccess.data_owners.any(owner_rid=self.logged_in_user)
+        filtered_query = self._filter_query_with_owner(session.query(DataAccess))
+        filtered_query = self._filter_query_with_date_range(
+            filtered_query, date_start, date_end
         )
+        filtered_query = self._filter_query_with_attributes(filtered_query, filters)
 
-        query = self._filter_query_with_date_range(query, date_start, date_end)
-
-        query = query.order_by(DataAccess.timestamp.desc())
+        query = filtered_query.order_by(DataAccess.timestamp.desc())
 
         if offset:
             query = query.offset(offset)
@@ -76,13 +166,68 @@ class DataAccessDao:
             selectinload(DataAccess.data_types),
         ).all()
 
+        if (limit and len(data_accesses) == limit) or not access_archive.covers(
+            date_start
+        ):
+            return data_accesses
+
+        # accesses are logged when they happen, so the archived accesses are older than
+        # those in the database and continue the page
+        archived_offset = 0
+        if offset and not data_accesses:
+            archived_offset = max(0, offset - filtered_query.count())
+
+        archived_accesses = self._load_archived(date_start, date_end, filters)
+        archived_accesses = itertools.islice(
+            archived_accesses,
+            archived_offset,
+            archived_offset + limit - len(data_accesses) if limit else None,
+        )
+        data_accesses.extend(_from_archived(access) for access in archived_accesses)
+
         return data_accesses
 
+    def _load_archived(
+        self,
+        date_start: Optional[dt.date] = None,
+        date_end: Optional[dt.date] = None,
+        filters: Optional[DataAccessFilter] = None,
+    ) -> Iterator[ArchivedAccess]:
+        """Generate the archived entries of the given data owner, newest first."""
+        for accesses in access_archive.load(self.logged_in_user, date_start, date_end):
+            for access in accesses:
+                if matches(access, date_start, date_end, filters):
+                    yield access
+
+    def _summarize_archived(
+        self,
+        date_start: Optional[dt.date] = None,
+        date_end: Optional[dt.date] = None,
+        filters: Optional[DataAccessFilter] = None,
+    ) -> Iterator[Tuple[ArchivedAccess, int]]:
+        """
+        Generate the archived entries of the given data owner with how many entries
+        share their date, tool, user and access kind. Filters by data type or search
+        need the full entries.
+        """
+        if filters is not None and (
+            filters.data_types or (filters.search and filters.search.strip())
+        ):
+            for access in self._load_archived(date_start, date_end, filters):
+                yield access, 1
+            return
+
+        summary = access_archive.summarize(self.logged_in_user, date_start, date_end)
+        for access, count in summary:
+            if matches(access, date_start, date_end, filters):
+                yield access, count
+
     def count(
         self,
         session: Session,
         date_start: Optional[dt.date] = None,
         date_end: Optional[dt.date] = None,
+        filters: Optional[DataAccessFilter] = None,
     ) -> Dict[str, Dict[str, int]]:
         """
         Count the total number of entries available in the database per key (user_rid,
@@ -93,17 +238,165 @@ class DataAccessDao:
 
         for field_name in ["user_rid", "tool", "access_kind"]:
             field = getattr(DataAccess, field_name)
-            query: Query = session.query(
-                field,
-                func.count(),
-            ).filter(DataAccess.data_owners.any(owner_rid=self.logged_in_user))
+            query: Query = session.query(field, func.count())
 
+            query = self._filter_query_with_owner(query)
             query = self._filter_query_with_date_range(query, date_start, date_end)
+            query = self._filter_query_with_attributes(query, filters)
             query = query.group_by(field)
             result[field_name] = dict(query.all())
 
+        if access_archive.covers(date_start):
+            for access, count in self._summarize_archived(
+                date_start, date_end, filters
+            ):
+                for field_name, counts in result.items():
+                    value = access[field_name]
+                    counts[value] = counts.get(value, 0) + count
+
         return result
 
+    def histogram(
+        self,
+        session: Session,
+        interval: HistogramInterval,
+        group_by: Optional[HistogramGroup] = None,
+        date_start: Optional[dt.date] = None,
+        date_end: Optional[dt.date] = None,
+        filters: Optional[DataAccessFilter] = None,
+    ) -> Dict[str, Dict[Optional[str], int]]:
+        """
+        Count the entries of the given data owner per time bucket and, optionally, per
+        value of the `group_by` key. Returns a mapping from the first day of each bucket
+        to the counts per group in chronological order. The group is None if the
+        entries are not grouped.
+        """
+        bucket = HISTOGRAM_BUCKETS[interval]
+        columns = [bucket]
+        if group_by is not None:
+            columns.append(getattr(DataAccess, group_by.value))
+
+        query: Query = session.query(*columns, func.count())
+
+        query = self._filter_query_with_owner(query)
+        query = self._filter_query_with_date_range(query, date_start, date_end)
+        query = self._filter_query_with_attributes(query, filters)
+        query = query.group_by(*columns).order_by(bucket)
+
+        result: Dict[str, Dict[Optional[str], int]] = OrderedDict()
+        for row in query.all():
+            bucket_start, group, count = (
+                row if group_by is not None else (row[0], None, row[1])
+            )
+            result.setdefault(bucket_start, {})[group] = count
+
+        if not access_archive.covers(date_start):
+            return result
+
+        archived: Dict[str, Dict[Optional[str], int]] = {}
+        for access, count in self._summarize_archived(date_start, date_end, filters):
+            bucket_start = _bucket_start(access["timestamp"].date(), interval)
+            group = access[group_by.value] if group_by is not None else None
+            counts = archived.setdefault(bucket_start, {})
+            counts[group] = counts.get(group, 0) + count
+
+        # archived and live entries may share the bucket at the watermark
+        for bucket_start, counts in result.items():
+            for group, count in counts.items():
+                archived_counts = archived.setdefault(bucket_start, {})
+                archived_counts[group] = archived_counts.get(group, 0) + count
+
+        return OrderedDict(sorted(archived.items()))
+
+    @classmethod
+    def archive(cls, session: Session, before: dt.datetime) -> int:
+        """
+        Move the data accesses logged before the given time into the cold archive and
+        return how many were moved. The accesses are archived one month at a time,
+        oldest first, and every month is committed on its own. Concurrent runs, also
+        of other processes, wait for each other.
+        """
+        with access_archive.lock():
+            cls._recover_pending_segments(session)
+
+            month_start = func.strftime("%Y-%m-01", DataAccess.timestamp)
+            months = (
+                session.query(month_start)
+                .filter(DataAccess.timestamp < before)
+                .distinct()
+                .order_by(month_start)
+                .all()
+            )
+
+            archived = 0
+            for (month,) in months:
+                month = dt.date.fromisoformat(month)
+                month_end = dt.datetime.combine(
+                    (month + dt.timedelta(days=32)).replace(day=1), dt.time.min
+                )
+                archived += cls._archive_month(session, month, min(month_end, before))
+
+            access_archive.advance_watermark(before)
+            return archived
+
+    @staticmethod
+    def _recover_pending_segments(session: Session):
+        """
+        Publish the segments whose accesses were deleted from the database but which
+        weren't published, e.g. after a crash, and discard the others. Must only be
+        called while holding the lock of the archive.
+        """
+        for segment, accesses in access_archive.pending():
+            ids = sorted({access["id"] for access in accesses})
+            # the accesses of a segment are deleted in one transaction, all or none
+            remaining = session.query(DataAccess.id).filter(
+                DataAccess.id.in_(ids[:ARCHIVE_DELETE_CHUNK_SIZE])
+            )
+            if not accesses or remaining.first() is not None:
+                access_archive.discard(segment)
+                continue
+
+            access_archive.publish(segment)
+            newest = max(access["timestamp"] for access in accesses)
+            access_archive.advance_watermark(newest + dt.timedelta(microseconds=1))
+
+    @staticmethod
+    def _archive_month(session: Session, month: dt.date, before: dt.datetime) -> int:
+        data_accesses: List[DataAccess] = (
+            session.query(DataAccess)
+            .filter(
+                DataAccess.timestamp >= dt.datetime.combine(month, dt.time.min),
+                DataAccess.timestamp < before,
+            )
+            .options(
+                selectinload(DataAccess.data_owners),
+                selectinload(DataAccess.data_types),
+            )
+            .all()
+        )
+
+        accesses_per_owner: Dict[RevoloriId, List[ArchivedAccess]] = {}
+        for data_access in data_accesses:
+            access = _to_archived(data_access)
+            for owner in data_access.data_owners:
+                accesses_per_owner.setdefault(owner.owner_rid, []).append(access)
+
+        segment = access_archive.write(month, accesses_per_owner)
+
+        try:
+            _delete_archived(session, data_accesses)
+            session.commit()
+        except Exception:
+            session.rollback()
+            access_archive.discard(segment)
+            raise
+
+        access_archive.publish(segment)
+        access_archive.advance_watermark(before)
+
+        session.expunge_all()
+        return len(data_accesses)
+
     @classmethod
     def generate_log(
         cls,
@@ -159,3 +452,105 @@ class DataAccessDao:
             data_access.data_owners = [DataOwner(owner_rid=owner_rid)]
 
             yield data_access
+
+
+def _bucket_start(date: dt.date, interval: HistogramInterval) -> str:
+    """The first day of the histogram bucket of the date, see `HISTOGRAM_BUCKETS`."""
+    if interval == HistogramInterval.WEEK:
+        date -= dt.timedelta(days=date.weekday())
+    elif interval == HistogramInterval.MONTH:
+        date = date.replace(day=1)
+    return date.isoformat()
+
+
+def _to_archived(data_access: DataAccess) -> ArchivedAccess:
+    return dict(
+        id=data_access.id,
+        access_kind=DataAccessKind(data_access.access_kind).value,
+        data_types=[data_type.type for data_type in data_access.data_types],
+        justification=data_access.justification,
+        timestamp=data_access.timestamp,
+        tool=data_access.tool,
+        user_rid=data_access.user_rid,
+    )
+
+
+def _from_archived(access: ArchivedAccess) -> DataAccess:
+    """Create a transient data access, it is never added to a session."""
+    return DataAccess(
+        id=access["id"],
+        access_kind=access["access_kind"],
+        data_types=[DataType(type=data_type) for data_type in access["data_types"]],
+        justification=access["justification"],
+        timestamp=access["timestamp"],
+        tool=access["tool"],
+        user_rid=access["user_rid"],
+    )
+
+
+def _delete_archived(session: Session, data_accesses: List[DataAccess]):
+    """Delete archived accesses together with their owners, types and search entries."""
+    for start in range(0, len(data_accesses), ARCHIVE_DELETE_CHUNK_SIZE):
+        chunk = data_accesses[start : start + ARCHIVE_DELETE_CHUNK_SIZE]
+        ids = [data_access.id for data_access in chunk]
+
+        indexed = [
+            {"id": data_access.id, "justification": data_access.justification}
+            for data_access in chunk
+            if data_access.justification
+        ]
+        if indexed:
+            # external content tables are told which text to remove from the index
+            session.execute(
+                text(
+                    "INSERT INTO data_accesses_fts(data_accesses_fts, rowid, "
+                    "justification) VALUES ('delete', :id, :justification)"
+                ),
+                indexed,
+            )
+
+        for model, column in [
+            (DataOwner, DataOwner.data_access_id),
+            (DataType, DataType.data_access_id),
+            (DataAccess, DataAccess.id),
+        ]:
+            session.query(model).filter(column.in_(ids)).delete(
+                synchronize_session=False
+            )
+
+
+def _to_fts_query(search: str) -> str:
+    """
+    Convert free text into an FTS5 query matching all of its words.
+    Every word is quoted so that FTS5 operators in the text are matched literally.
+    """
+    words = search.split()
+    return " ".join('"' + word.replace('"', '""') + '"' for word in words)
+
+
+@event.listens_for(DataAccess, "after_insert")
+def _index_justification(mapper, connection, data_access: DataAccess):
+    """Add the justification of an inserted data access to the search index."""
+    if data_access.justification:
+        connection.execute(
+            justification_search.insert().values(
+                rowid=data_access.id, justification=data_access.justification
+            )
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_logged_accesses(session: Session):
+    """Publish the accesses of a committed transaction to the live feed."""
+    for owner_rids, access in session.info.pop(LOGGED_ACCESSES, []):
+        for owner_rid in owner_rids:
+            if access_feed.has_subscribers(owner_rid):
+                single_owner_access = dto.DataAccessSingleOwner(
+                    owner_rid=owner_rid, **access
+                )
+                access_feed.publish(owner_rid, single_owner_access.json())
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_logged_accesses(session: Session, previous_transaction):
+    session.info.pop(LOGGED_ACCESSES, None)
@@ -1,15 +1,59 @@
 #!/usr/bin/env python3
 """ Data access policy DAO module """
 
-from typing import List, Optional, Set, Tuple
+from contextlib import contextmanager
+from typing import Any, Collection, Dict, Iterator, List, Optional, Set, Tuple
 
 from fastapi import Depends
-from sqlalchemy import or_
+from sqlalchemy import Column, MetaData, Table, or_, select
+from sqlalchemy.orm import Query
 
 from overseer.auth import get_current_user
+from overseer.cache import AccessSignature, policy_decision_cache
 from overseer.db.connection import Session
-from overseer.db.models import DataAccess, DataAccessPolicy
-from overseer.models import RevoloriId
+from overseer.db.models import REVOLORI_ID, DataAccess, DataAccessPolicy
+from overseer.invalidation import cache_invalidator
+from overseer.models import DataAccessKind, RevoloriId
+
+POLICY_DECISIONS_CACHE = "policy_decisions"
+
+# owners matched with one bound parameter each. Larger owner lists, e.g. of
+# aggregates, are loaded into a temporary table instead, as SQLite limits the
+# number of bound parameters per statement.
+MAX_BOUND_OWNERS = 500
+
+# temporary table of the connection, not part of the schema
+matching_owners = Table(
+    "matching_owners",
+    MetaData(),
+    Column("owner_rid", REVOLORI_ID, primary_key=True),
+    prefixes=["TEMPORARY"],
+)
+
+
+@contextmanager
+def _owner_criterion(session: Session, owners: Collection[RevoloriId]) -> Iterator:
+    """Yield a criterion matching the policies of the owners."""
+    if len(owners) <= MAX_BOUND_OWNERS:
+        yield DataAccessPolicy.owner_rid.in_(owners)
+        return
+
+    connection = session.connection()
+    matching_owners.create(connection, checkfirst=True)
+    # the DBAPI cursor skips SQLAlchemy's parameter processing of every row and
+    # sorted owners are appended to the primary key instead of inserted in between
+    cursor = connection.connection.cursor()
+    try:
+        cursor.executemany(
+            "INSERT OR IGNORE INTO matching_owners (owner_rid) VALUES (?)",
+            ((owner_rid,) for owner_rid in sorted(owners)),
+        )
+    finally:
+        cursor.close()
+    try:
+        yield DataAccessPolicy.owner_rid.in_(select([matching_owners.c.owner_rid]))
+    finally:
+        connection.execute(matching_owners.delete())
 
 
 class DataAccessPolicyDao:
@@ -25,10 +69,27 @@ class DataAccessPolicyDao:
     def __init__(self, logged_in_user=Depends(get_current_user)):
         self.logged_in_user = logged_in_user
 
+    @staticmethod
+    def _mark_changed(session: Session, owner_rid: RevoloriId):
+        """Invalidate the cached decisions of the owner once the session commits."""
+        cache_invalidator.mark_changed(session, POLICY_DECISIONS_CACHE, owner_rid)
+
     def add(self, session: Session, data_access_policy: DataAccessPolicy):
         """Insert a data access policy into the database"""
         data_access_policy.owner_rid = self.logged_in_user
         session.add(data_access_policy)
+        self._mark_changed(session, self.logged_in_user)
+
+    def update(
+        self,
+        session: Session,
+        data_access_policy: DataAccessPolicy,
+        values: Dict[str, Any],
+    ):
+        """Update the writable fields of a data access policy"""
+        for key, value in values.items():
+            setattr(data_access_policy, key, value)
+        self._mark_changed(session, data_access_policy.owner_rid)
 
     def load_all(self, session: Session) -> List[DataAccessPolicy]:
         """Load all data access policies for the given user."""
@@ -47,16 +108,21 @@ class DataAccessPolicyDao:
         )
         return query.first()
 
-    @staticmethod
-    def load_matching(
-        session: Session, data_access: DataAccess
+    def load_many(
+        self, session: Session, data_access_policy_ids: Collection[int]
     ) -> List[DataAccessPolicy]:
-        """Load all data access policies which permit the given data access"""
-        owners = [owner.owner_rid for owner in data_access.data_owners]
-        date_of_access = data_access.timestamp.date()
-
+        """Load several data access policies by id"""
         query = session.query(DataAccessPolicy).filter(
-            DataAccessPolicy.owner_rid.in_(owners),
+            DataAccessPolicy.id.in_(data_access_policy_ids),
+            DataAccessPolicy.owner_rid == self.logged_in_user,
+        )
+        return query.all()
+
+    @staticmethod
+    def _filter_matching(query: Query, data_access: DataAccess) -> Query:
+        """Filter the policies which permit the given data access."""
+        date_of_access = data_access.timestamp.date()
+        return query.filter(
             or_(
                 DataAccessPolicy.access_kind == data_access.access_kind,
                 DataAccessPolicy.access_kind == None,
@@ -74,33 +140,113 @@ class DataAccessPolicyDao:
             ),
             or_(
                 DataAccessPolicy.validity_period_start_date <= date_of_access,
-                DataAccessPolicy.validity_period_end_date == None,
+                DataAccessPolicy.validity_period_start_date == None,
             ),
         )
 
-        return query.all()
+    @classmethod
+    def load_matching(
+        cls,
+        session: Session,
+        data_access: DataAccess,
+        owners: Optional[Collection[RevoloriId]] = None,
+    ) -> List[DataAccessPolicy]:
+        """
+        Load all data access policies which permit the given data access.
+        Only the policies of `owners` are loaded if given, otherwise the policies of
+        all owners of the access.
+        """
+        if owners is None:
+            owners = {owner.owner_rid for owner in data_access.data_owners}
+
+        with _owner_criterion(session, owners) as owner_criterion:
+            query = session.query(DataAccessPolicy).filter(owner_criterion)
+            return cls._filter_matching(query, data_access).all()
+
+    @classmethod
+    def load_granting_owners(
+        cls, session: Session, data_access: DataAccess, owners: Collection[RevoloriId]
+    ) -> Set[RevoloriId]:
+        """
+        Load which of the owners have a policy permitting the given data access.
+        Unlike `load_matching`, the policies are only read from the owner index.
+        """
+        with _owner_criterion(session, owners) as owner_criterion:
+            query = session.query(DataAccessPolicy.owner_rid).filter(owner_criterion)
+            query = cls._filter_matching(query, data_access).distinct()
+            return {owner_rid for owner_rid, in query}
 
     @classmethod
     def who_granted(
         cls, session: Session, data_access: DataAccess
     ) -> Tuple[Set[RevoloriId], Set[RevoloriId]]:
-        """Checks which data owner of the request grant the access and which reject"""
-        policies = cls.load_matching(session, data_access)
-
+        """
+        Checks which data owner of the request grant the access and which reject.
+        Cached decisions are reused, only the policies of the remaining owners are
+        loaded.
+        """
         # extract all owners from the data access and deduplicate them using a set.
         involved_owners = {owner.owner_rid for owner in data_access.data_owners}
 
-        # examine the owners from the matching policies and those who do not.
-        # deduplicate them using a set.
-        granted_owners = {policy.owner_rid for policy in policies}
+        signature = cls._signature(data_access)
+        granted_owners: Set[RevoloriId] = set()
+        generations: Dict[RevoloriId, int] = {}
+
+        for owner_rid in involved_owners:
+            granted = policy_decision_cache.get(owner_rid, signature)
+            if granted is None:
+                generations[owner_rid] = policy_decision_cache.generation(owner_rid)
+            elif granted:
+                granted_owners.add(owner_rid)
+
+        if generations:
+            matched_owners = cls.load_granting_owners(
+                session, data_access, generations.keys()
+            )
+            for owner_rid, generation in generations.items():
+                policy_decision_cache.put(
+                    owner_rid, signature, generation, owner_rid in matched_owners
+                )
+            granted_owners |= matched_owners
+
         rejected_owners = involved_owners - granted_owners
 
         return granted_owners, rejected_owners
 
+    @staticmethod
+    def _signature(data_access: DataAccess) -> AccessSignature:
+        """The attributes of an access which policy decisions depend on"""
+        return (
+            data_access.tool,
+            DataAccessKind(data_access.access_kind).value,
+            data_access.user_rid,
+            data_access.timestamp.date().isoformat(),
+        )
+
     def delete(self, session: Session, data_access_policy_id: int) -> bool:
         """Deletes a data access policy by id"""
         query = session.query(DataAccessPolicy).filter(
             DataAccessPolicy.id == data_access_policy_id,
             DataAccessPolicy.owner_rid == self.logged_in_user,
         )
+        self._mark_changed(session, self.logged_in_user)
         return 1 == query.delete()
+
+    def delete_many(self, session: Session, data_access_policy_ids: Collection[int]):
+        """Deletes several data access policies by id"""
+        query = session.query(DataAccessPolicy).filter(
+            DataAccessPolicy.id.in_(data_access_policy_ids),
+            DataAccessPolicy.owner_rid == self.logged_in_user,
+        )
+        self._mark_changed(session, self.logged_in_user)
+        query.delete(synchronize_session="fetch")
+
+
+def _invalidate_policy_decisions(owner_rids: Optional[Set[RevoloriId]]):
+    if owner_rids is None:
+        policy_decision_cache.clear()
+    else:
+        policy_decision_cache.invalidate(owner_rids)
+
+
+cache_invalidator.register(POLICY_DECISIONS_CACHE, _invalidate_policy_decisions)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+""" Idempotent request DAO module """
+
+import datetime as dt
+import time
+from typing import Optional
+
+from sqlalchemy import select
+
+from overseer.db.connection import Session
+from overseer.db.models import IdempotentRequest
+
+# seconds between two prunings of the stored responses by the same process
+PRUNE_INTERVAL = 60
+
+
+class IdempotencyDao:
+    """
+    Class for storing the responses of requests with an `Idempotency-Key` header.
+    Responses expire after a time to live and only a bounded number of them is kept.
+    """
+
+    _last_prune = 0.0
+
+    @staticmethod
+    def load(session: Session, key: str, ttl: float) -> Optional[IdempotentRequest]:
+        """Load the stored request with the key unless it expired"""
+        cutoff = dt.datetime.now() - dt.timedelta(seconds=ttl)
+        query = session.query(IdempotentRequest).filter(
+            IdempotentRequest.key == key, IdempotentRequest.created_at >= cutoff
+        )
+        return query.first()
+
+    @staticmethod
+    def add(session: Session, key: str, request_hash: str, response: str, ttl: float):
+        """
+        Store the response of a request. Raises an `IntegrityError` if a response for
+        the key was stored concurrently.
+        """
+        # an expired response isn't pruned yet, replace it
+        cutoff = dt.datetime.now() - dt.timedelta(seconds=ttl)
+        session.query(IdempotentRequest).filter(
+            IdempotentRequest.key == key, IdempotentRequest.created_at < cutoff
+        ).delete(synchronize_session=False)
+
+        session.add(
+            IdempotentRequest(
+                key=key,
+                created_at=dt.datetime.now(),
+                request_hash=request_hash,
+                response=response,
+            )
+        )
+        session.flush()
+
+    @classmethod
+    def prune(cls, session: Session, ttl: float, max_keys: int):
+        """
+        Delete expired responses and the oldest ones exceeding `max_keys`. Does
+        nothing if the same process pruned recently.
+        """
+        if time.monotonic() - cls._last_prune < PRUNE_INTERVAL:
+            return
+        cls._last_prune = time.monotonic()
+
+        cutoff = dt.datetime.now() - dt.timedelta(seconds=ttl)
+        session.query(IdempotentRequest).filter(
+            IdempotentRequest.created_at < cutoff
+        ).delete(synchronize_session=False)
+
+        newest = (
+            select([IdempotentRequest.key])
+            .order_by(IdempotentRequest.created_at.desc())
+            .limit(max_keys)
+        )
+        session.query(IdempotentRequest).filter(
+            IdempotentRequest.key.notin_(newest)
+        ).delete(synchronize_session=False)
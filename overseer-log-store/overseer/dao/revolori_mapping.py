@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+""" Revolori mapping DAO module """
+
+from typing import Dict, Iterator, List, Tuple
+
+from sqlalchemy import and_, bindparam
+
+import overseer.models as dto
+from overseer.db.connection import Session
+from overseer.db.models import RevoloriMapping
+
+# tool of the primary IDs, which Revolori maps to themselves for every tool
+PRIMARY_ID_TOOL = ""
+
+# maximum number of bound parameters per statement
+CHUNK_SIZE = 500
+
+# (tool, tool specific ID) -> Revolori ID
+Mappings = Dict[Tuple[str, str], str]
+
+mappings = RevoloriMapping.__table__
+
+
+def _chunks(items: List, size: int) -> Iterator[List]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+class RevoloriMappingDao:
+    """
+    Class for manipulating the local replica of Revolori's ID mapping.
+    """
+
+    @staticmethod
+    def resolve(
+        session: Session, tool: str, tool_specific_ids: List[str]
+    ) -> Dict[str, str]:
+        """
+        Return the Revolori IDs of the tool specific IDs which are in the replica.
+        Like Revolori, primary IDs are mapped for every tool.
+        """
+        resolved_ids: Dict[str, str] = {}
+        for lookup_tool in [tool, PRIMARY_ID_TOOL]:
+            missing = [id for id in set(tool_specific_ids) if id not in resolved_ids]
+            for chunk in _chunks(missing, CHUNK_SIZE):
+                query = session.query(
+                    RevoloriMapping.tool_specific_id, RevoloriMapping.revolori_id
+                ).filter(
+                    RevoloriMapping.tool == lookup_tool,
+                    RevoloriMapping.tool_specific_id.in_(chunk),
+                )
+                resolved_ids.update(query)
+        return resolved_ids
+
+    @staticmethod
+    def count(session: Session) -> int:
+        """Count the mappings in the replica"""
+        return session.query(RevoloriMapping).count()
+
+    @staticmethod
+    def sync(session: Session, snapshot: Mappings) -> dto.RevoloriMappingSyncResult:
+        """
+        Bring the replica in line with a snapshot of all mappings, writing only the
+        mappings which were added, changed or removed since the last sync.
+        """
+        query = session.query(
+            RevoloriMapping.tool,
+            RevoloriMapping.tool_specific_id,
+            RevoloriMapping.revolori_id,
+        )
+        replica = {(tool, id): revolori_id for tool, id, revolori_id in query}
+
+        added = snapshot.keys() - replica.keys()
+        removed = replica.keys() - snapshot.keys()
+        changed = [
+            key
+            for key in snapshot.keys() & replica.keys()
+            if snapshot[key] != replica[key]
+        ]
+
+        by_key = and_(
+            mappings.c.tool == bindparam("key_tool"),
+            mappings.c.tool_specific_id == bindparam("key_id"),
+        )
+        if removed:
+            session.execute(
+                mappings.delete().where(by_key),
+                [dict(key_tool=tool, key_id=id) for tool, id in removed],
+            )
+        if changed:
+            session.execute(
+                mappings.update().where(by_key),
+                [
+                    dict(key_tool=tool, key_id=id, revolori_id=snapshot[tool, id])
+                    for tool, id in changed
+                ],
+            )
+        if added:
+            session.execute(
+                mappings.insert(),
+                [
+                    dict(tool=tool, tool_specific_id=id, revolori_id=snapshot[tool, id])
+                    for tool, id in added
+                ],
+            )
+
+        return dto.RevoloriMappingSyncResult(
+            added=len(added),
+            updated=len(changed),
+            removed=len(removed),
+            total=len(snapshot),
+        )
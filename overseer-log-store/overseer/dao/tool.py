@@ -1,9 +1,16 @@
 #!/usr/bin/env python3
 """ Tool DAO module """
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
+from sqlalchemy import event
+
+import overseer.models as dto
+from overseer.cache import tool_snapshot
 from overseer.db.connection import Session
 from overseer.db.models import Tool
+from overseer.invalidation import cache_invalidator
+
+TOOLS_CACHE = "tools"
 
 
 class ToolDao:
@@ -21,13 +28,42 @@ class ToolDao:
         """ Load all tools form the database """
         return session.query(Tool).all()
 
+    @staticmethod
+    def load_cached(session: Session) -> Dict[str, dto.Tool]:
+        """ All tools by name, cached until a tool changes in any process """
+
+        def load():
+            tools = session.query(Tool)
+            return {tool.name: dto.Tool(**tool.__dict__) for tool in tools}
+
+        return tool_snapshot.get(load)
+
     @staticmethod
     def load_single(session: Session, tool_name: str) -> Optional[Tool]:
         query = session.query(Tool).filter(Tool.name == tool_name)
         return query.first()
 
+    @staticmethod
+    def update(session: Session, tool: Tool, values: Dict[str, Any]):
+        """ Update the writable fields of a tool """
+        for key, value in values.items():
+            setattr(tool, key, value)
+
     @staticmethod
     def delete(session: Session, tool_name: str) -> bool:
         """ Delete a tool by its name """
         query = session.query(Tool).filter(Tool.name == tool_name)
+        # bulk deletes bypass the mapper events below
+        cache_invalidator.mark_changed(session, TOOLS_CACHE)
         return 1 == query.delete()
+
+
+cache_invalidator.register(TOOLS_CACHE, tool_snapshot.invalidate)
+
+
+@event.listens_for(Tool, "after_insert")
+@event.listens_for(Tool, "after_update")
+@event.listens_for(Tool, "after_delete")
+def _invalidate_tools(mapper, connection, tool: Tool):
+    """ Invalidate the cached tools however they are changed through the ORM """
+    cache_invalidator.mark_changed(Session.object_session(tool), TOOLS_CACHE)
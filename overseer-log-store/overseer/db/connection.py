@@ -2,10 +2,11 @@
 """ Database connection """
 
 from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session as _Session
 from sqlalchemy.orm import sessionmaker
 
-from overseer.db.models import Base
+from overseer.db.models import Base, create_justification_search
 from overseer.settings import settings
 
 
@@ -29,6 +30,10 @@ class Session(_Session):
             raise
 
 
+# latest alembic revision, update it with every migration. Comparing against it
+# saves parsing all migrations on startup, a test checks that it is the head.
+SCHEMA_REVISION = "f1c6d83a9b24"
+
 # `check_same_thread: False` required for SQLite
 engine = create_engine(settings.DATABASE_URI, connect_args={"check_same_thread": False})
 
@@ -43,6 +48,26 @@ SessionLocal = sessionmaker(
 def init_db():
     """ Import models """
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        create_justification_search(connection)
+
+
+def verify_schema():
+    """ Check that the database is migrated to the latest alembic revision """
+    expected_revisions = {SCHEMA_REVISION}
+
+    with engine.connect() as connection:
+        try:
+            rows = connection.execute("SELECT version_num FROM alembic_version")
+            revisions = {row[0] for row in rows}
+        except OperationalError:
+            revisions = set()
+
+    if revisions != expected_revisions:
+        raise RuntimeError(
+            f"Database is at revision {', '.join(revisions) or 'none'}, expected "
+            f"{', '.join(expected_revisions)}. Run `alembic upgrade head` first."
+        )
 
 
 def close_db():
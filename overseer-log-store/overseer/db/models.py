@@ -1,9 +1,20 @@
 #!/usr/bin/env python3
 """ Database models """
 
-from sqlalchemy import Column, Date, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    Column,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import column, table
 
 ACCESS_KIND = String(20)
 REVOLORI_ID = String(100)
@@ -29,6 +40,44 @@ class DataAccess(Base):
     )
     user_rid = Column(REVOLORI_ID, nullable=False)
 
+    __table_args__ = (
+        Index("ix__data_accesses__timestamp", "timestamp"),
+        Index("ix__data_accesses__tool__timestamp", "tool", "timestamp"),
+        Index("ix__data_accesses__user_rid__timestamp", "user_rid", "timestamp"),
+        Index("ix__data_accesses__access_kind__timestamp", "access_kind", "timestamp"),
+    )
+
+
+# FTS5 index over the justifications of the data accesses. It is an external content
+# table, i.e. it only stores the index and reads the text from `data_accesses`.
+# The table is not part of the metadata as SQLAlchemy can't create virtual tables,
+# `init_db` creates it.
+justification_search = table(
+    "data_accesses_fts", column("rowid", Integer), column("justification", Text)
+)
+
+
+def create_justification_search(connection):
+    """
+    Create the search index unless it exists and index the existing justifications,
+    e.g. of a database created before the index was added.
+    """
+    exists = connection.execute(
+        "SELECT 1 FROM sqlite_master "
+        "WHERE type = 'table' AND name = 'data_accesses_fts'"
+    ).first()
+    if exists:
+        return
+
+    connection.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS data_accesses_fts USING fts5("
+        "justification, content='data_accesses', content_rowid='id', "
+        "tokenize='porter unicode61')"
+    )
+    connection.execute(
+        "INSERT INTO data_accesses_fts(data_accesses_fts) VALUES('rebuild')"
+    )
+
 
 class DataOwner(Base):
     __tablename__ = "data_owners"
@@ -36,6 +85,12 @@ class DataOwner(Base):
     data_access_id = Column(Integer, ForeignKey("data_accesses.id"), primary_key=True)
     owner_rid = Column(REVOLORI_ID, primary_key=True)
 
+    __table_args__ = (
+        Index(
+            "ix__data_owners__owner_rid__data_access_id", "owner_rid", "data_access_id"
+        ),
+    )
+
 
 class DataType(Base):
     __tablename__ = "data_types"
@@ -43,6 +98,10 @@ class DataType(Base):
     data_access_id = Column(Integer, ForeignKey("data_accesses.id"), primary_key=True)
     type = Column(String(100), primary_key=True)
 
+    __table_args__ = (
+        Index("ix__data_types__type__data_access_id", "type", "data_access_id"),
+    )
+
 
 class DataAccessPolicy(Base):
     __tablename__ = "data_access_policies"
@@ -58,8 +117,69 @@ class DataAccessPolicy(Base):
     validity_period_end_date = Column(Date)
     validity_period_start_date = Column(Date)
 
+    __table_args__ = (
+        # covers all predicates of `DataAccessPolicyDao.load_matching`, so the matching
+        # policies of an owner are found without reading the table
+        Index(
+            "ix__data_access_policies__owner_rid__tool",
+            "owner_rid",
+            "tool",
+            "access_kind",
+            "user_rid",
+            "validity_period_start_date",
+            "validity_period_end_date",
+        ),
+    )
+
 
 class Tool(Base):
     __tablename__ = "tools"
 
     name = Column(String(20), primary_key=True)
+
+    # admission limits of `/request-access/*` per worker process, None if unlimited
+    max_concurrent_requests = Column(Integer)
+    rate_limit = Column(Float)
+    rate_limit_burst = Column(Integer)
+
+
+class CacheInvalidation(Base):
+    """Change of cached data, see `overseer.invalidation.CacheInvalidator`"""
+
+    __tablename__ = "cache_invalidations"
+
+    id = Column(Integer, primary_key=True)
+
+    cache = Column(String(50), nullable=False)
+    # None if the whole cache is invalidated
+    key = Column(String(100))
+    created_at = Column(DateTime, nullable=False)
+
+    # never reuse the ids of pruned rows, pollers rely on them increasing
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class IdempotentRequest(Base):
+    """Response of a request which was sent with an `Idempotency-Key` header"""
+
+    __tablename__ = "idempotent_requests"
+
+    key = Column(String(200), primary_key=True)
+
+    created_at = Column(DateTime, nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    response = Column(Text, nullable=False)
+
+    __table_args__ = (Index("ix__idempotent_requests__created_at", "created_at"),)
+
+
+class RevoloriMapping(Base):
+    """Local replica of Revolori's ID mapping, see `overseer.replica.MappingReplica`"""
+
+    __tablename__ = "revolori_mappings"
+
+    # `PRIMARY_ID_TOOL` for the primary IDs, which Revolori maps for every tool
+    tool = Column(String(100), primary_key=True)
+    tool_specific_id = Column(String(200), primary_key=True)
+
+    revolori_id = Column(REVOLORI_ID, nullable=False)
@@ -1,16 +1,22 @@
 import logging
 from contextlib import contextmanager
+from typing import Callable
 
 from fastapi import HTTPException
 
-from overseer.services import IdMappingError
-from starlette.status import HTTP_400_BAD_REQUEST
+from overseer.services import IdMappingError, RevoloriUnavailable
+from starlette.status import HTTP_400_BAD_REQUEST, HTTP_503_SERVICE_UNAVAILABLE
 
 logger = logging.getLogger(__name__)
 
 
 @contextmanager
-def http_exception(exc_type: type, status_code: int, detail: str = None):
+def http_exception(
+    exc_type: type,
+    status_code: int,
+    detail: str = None,
+    log: Callable[[Exception], None] = logger.exception,
+):
     """
     Context manager for reraising exceptions as HTTPExceptions
     """
@@ -18,7 +24,7 @@ def http_exception(exc_type: type, status_code: int, detail: str = None):
         yield
     except Exception as exc:
         if isinstance(exc, exc_type):
-            logger.exception(exc)
+            log(exc)
             raise HTTPException(status_code, detail) from exc
         else:
             raise
@@ -36,3 +42,13 @@ def handle_owner_not_signed_up():
         HTTP_400_BAD_REQUEST,
         "One or more owners are not signed up with Revolori.",
     )
+
+
+def handle_revolori_unavailable():
+    return http_exception(
+        RevoloriUnavailable,
+        HTTP_503_SERVICE_UNAVAILABLE,
+        "Revolori is unavailable. Please try again later.",
+        # expected while the circuit breaker is open, so without a stack trace
+        log=logger.warning,
+    )
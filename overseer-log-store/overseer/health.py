@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+""" Background checks of the dependencies for readiness probes """
+
+import datetime as dt
+import logging
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from overseer.db.connection import engine
+from overseer.models import DependencyStatus, ReadinessStatus
+from overseer.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionCounter:
+    """Counts the database connections which are currently checked out."""
+
+    def __init__(self, engine: Engine):
+        self.in_use = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "checkout", self._checkout)
+        event.listen(engine, "checkin", self._checkin)
+
+    def _checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.in_use += 1
+
+    def _checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.in_use -= 1
+
+
+class HealthChecker:
+    """
+    Checks the database and Revolori in a background thread and keeps the latest
+    result in memory, so that readiness probes neither open sessions nor wait for the
+    thread pool.
+
+    The service is ready if the database is available. Revolori is only needed for
+    requesting access, so its status is reported but doesn't affect the readiness.
+    """
+
+    def __init__(self, engine: Engine, timeout: float):
+        self._engine = engine
+        self._timeout = timeout
+        self._connections = ConnectionCounter(engine)
+        self._status: Optional[ReadinessStatus] = None
+        self._database_check_lock = threading.Lock()
+        self._stop_checking = threading.Event()
+        self._checker: Optional[threading.Thread] = None
+
+    def _check_database(self) -> DependencyStatus:
+        start = time.perf_counter()
+        try:
+            with self._engine.connect() as connection:
+                connection.execute("SELECT 1")
+        except Exception as exc:
+            return DependencyStatus(ok=False, error=str(exc))
+        return DependencyStatus(ok=True, latency=(time.perf_counter() - start) * 1000)
+
+    def _check_revolori(self) -> DependencyStatus:
+        import requests  # see `RevoloriService.warm_up`
+
+        start = time.perf_counter()
+        try:
+            response = requests.get(
+                settings.REVOLORI_HEALTH_ENDPOINT, timeout=self._timeout
+            )
+        except requests.RequestException as exc:
+            return DependencyStatus(ok=False, error=str(exc))
+
+        latency = (time.perf_counter() - start) * 1000
+        if response.status_code != 200:
+            error = f"Revolori returned status {response.status_code}."
+            return DependencyStatus(ok=False, latency=latency, error=error)
+        return DependencyStatus(ok=True, latency=latency)
+
+    def _keep(
+        self, database: DependencyStatus, revolori: DependencyStatus
+    ) -> ReadinessStatus:
+        pool = self._engine.pool
+        status = ReadinessStatus(
+            ready=database.ok,
+            checked_at=dt.datetime.now(),
+            database=database,
+            revolori=revolori,
+            connections_in_use=self._connections.in_use,
+            # other pools, like the NullPool used for SQLite files, are unbounded
+            connection_pool_size=pool.size() if isinstance(pool, QueuePool) else None,
+        )
+        self._status = status
+        return status
+
+    def check(self) -> ReadinessStatus:
+        """Check the dependencies now and keep the result."""
+        return self._keep(self._check_database(), self._check_revolori())
+
+    def check_database(self, max_age: float) -> ReadinessStatus:
+        """
+        Check only the database now and keep the result, for probes which find no
+        recent result. Revolori keeps its last status, as waiting for it could exceed
+        the timeout of the probe. Concurrent calls wait for a single check.
+        """
+        with self._database_check_lock:
+            status = self.status(max_age)
+            if status is not None:
+                return status
+
+            previous = self._status
+            revolori = (
+                previous.revolori
+                if previous is not None
+                else DependencyStatus(ok=False, error="Revolori wasn't checked yet.")
+            )
+            return self._keep(self._check_database(), revolori)
+
+    def status(self, max_age: float) -> Optional[ReadinessStatus]:
+        """
+        Return the latest result, or None if there is none or it is older than
+        `max_age` seconds, e.g. because the checker is stuck.
+        """
+        status = self._status
+        if status is None:
+            return None
+
+        age = (dt.datetime.now() - status.checked_at).total_seconds()
+        return status if age <= max_age else None
+
+    def _check_periodically(self, interval: float):
+        while True:
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Checking the health of the dependencies failed.")
+            if self._stop_checking.wait(interval):
+                return
+
+    def start_checking(self, interval: float):
+        """Start checking the dependencies in a background thread."""
+        if self._checker is not None:
+            return
+
+        self._stop_checking.clear()
+        self._checker = threading.Thread(
+            target=self._check_periodically,
+            args=(interval,),
+            name="health-checker",
+            daemon=True,
+        )
+        self._checker.start()
+
+    def stop_checking(self):
+        """Stop checking the dependencies."""
+        if self._checker is None:
+            return
+
+        self._stop_checking.set()
+        self._checker.join()
+        self._checker = None
+
+
+health_checker = HealthChecker(engine, settings.HEALTH_CHECK_TIMEOUT)
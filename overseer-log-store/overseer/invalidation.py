@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+""" Invalidation of in-process caches across worker processes """
+
+import datetime as dt
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import Engine
+
+from overseer.db.connection import Session, engine
+from overseer.db.models import CacheInvalidation
+from overseer.settings import settings
+
+logger = logging.getLogger(__name__)
+
+CHANGED_CACHE_KEYS = "changed_cache_keys"
+
+# drops the given keys from a cache, or all entries if the keys are None
+Invalidate = Callable[[Optional[Set[str]]], None]
+
+invalidations = CacheInvalidation.__table__
+
+
+class CacheInvalidator:
+    """
+    Propagates changes of cached data to the caches of all processes which share the
+    database.
+
+    Write paths mark the changed keys of a cache with `mark_changed`. When the session
+    commits, the changes are recorded in the `cache_invalidations` table within the
+    same transaction and the caches of the own process are invalidated right away.
+    Every process polls the table in the background and invalidates the keys changed
+    by other processes. Processes which fall behind by more than the retention of the
+    table clear their caches completely.
+    """
+
+    def __init__(self, engine: Engine, retention: float):
+        self._engine = engine
+        self._retention = retention
+        self._caches: Dict[str, Invalidate] = {}
+        self._last_id: Optional[int] = None
+        self._last_prune = 0.0
+        self._poll_lock = threading.Lock()
+        self._stop_polling = threading.Event()
+        self._poller: Optional[threading.Thread] = None
+
+    def register(self, cache: str, invalidate: Invalidate):
+        """Register the invalidation function of a cache."""
+        self._caches[cache] = invalidate
+
+    @staticmethod
+    def mark_changed(session: Session, cache: str, key: Optional[str] = None):
+        """Invalidate a key, or the whole cache, in all processes once committed."""
+        session.info.setdefault(CHANGED_CACHE_KEYS, set()).add((cache, key))
+
+    def _invalidate(self, changes: Iterable[Tuple[str, Optional[str]]]):
+        keys_per_cache: Dict[str, Optional[Set[str]]] = defaultdict(set)
+        for cache, key in changes:
+            if key is None or keys_per_cache[cache] is None:
+                keys_per_cache[cache] = None
+            else:
+                keys_per_cache[cache].add(key)
+
+        for cache, keys in keys_per_cache.items():
+            if cache in self._caches:
+                self._caches[cache](keys)
+
+    def _invalidate_all(self):
+        for invalidate in self._caches.values():
+            invalidate(None)
+
+    def _record_changes(self, session: Session):
+        # the commit flushes after `before_commit`, flush the changes marked by
+        # mapper events now
+        session.flush()
+        changes = session.info.get(CHANGED_CACHE_KEYS)
+        if changes:
+            now = dt.datetime.now()
+            session.execute(
+                invalidations.insert(),
+                [dict(cache=cache, key=key, created_at=now) for cache, key in changes],
+            )
+
+    def _apply_changes(self, session: Session):
+        changes = session.info.pop(CHANGED_CACHE_KEYS, None)
+        if changes:
+            self._invalidate(changes)
+
+    def poll(self) -> int:
+        """
+        Invalidate the keys which changed since the last poll and return how many
+        changes were found. Changes of the own process are applied again, which only
+        costs a few cache misses.
+        """
+        with self._poll_lock, self._engine.connect() as connection:
+            if self._last_id is None:
+                # the caches are filled after this point, older changes don't matter
+                last_id = select([func.max(invalidations.c.id)])
+                self._last_id = connection.execute(last_id).scalar() or 0
+                return 0
+
+            query = (
+                select([invalidations.c.id, invalidations.c.cache, invalidations.c.key])
+                .where(invalidations.c.id > self._last_id)
+                .order_by(invalidations.c.id)
+            )
+            rows = connection.execute(query).fetchall()
+            if rows:
+                # ids are consecutive, a gap means unseen changes have been pruned
+                if rows[0].id != self._last_id + 1:
+                    logger.warning("Missed cache invalidations, clearing all caches.")
+                    self._invalidate_all()
+                else:
+                    self._invalidate((row.cache, row.key) for row in rows)
+                self._last_id = rows[-1].id
+
+            if time.monotonic() - self._last_prune > self._retention / 10:
+                self._last_prune = time.monotonic()
+                cutoff = dt.datetime.now() - dt.timedelta(seconds=self._retention)
+                connection.execute(
+                    invalidations.delete().where(invalidations.c.created_at < cutoff)
+                )
+
+            return len(rows)
+
+    def _poll_periodically(self, interval: float):
+        while not self._stop_polling.wait(interval):
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Polling the cache invalidations failed.")
+
+    def start_polling(self, interval: float):
+        """Start polling the changes of other processes in a background thread."""
+        if self._poller is not None:
+            return
+
+        # the first poll only remembers the latest change, so it must happen before
+        # anything is cached
+        self.poll()
+        self._stop_polling.clear()
+        self._poller = threading.Thread(
+            target=self._poll_periodically,
+            args=(interval,),
+            name="cache-invalidator",
+            daemon=True,
+        )
+        self._poller.start()
+
+    def stop_polling(self):
+        """Stop polling the changes of other processes."""
+        if self._poller is None:
+            return
+
+        self._stop_polling.set()
+        self._poller.join()
+        self._poller = None
+
+
+cache_invalidator = CacheInvalidator(engine, settings.CACHE_INVALIDATION_RETENTION)
+
+
+@event.listens_for(Session, "before_commit")
+def _record_cache_invalidations(session: Session):
+    """Record the changed keys in the same transaction as the changes."""
+    cache_invalidator._record_changes(session)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_cache_invalidations(session: Session):
+    """Invalidate the changed keys in this process once they are committed."""
+    cache_invalidator._apply_changes(session)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_cache_invalidations(session: Session, previous_transaction):
+    session.info.pop(CHANGED_CACHE_KEYS, None)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+""" Live feed of newly logged data accesses """
+
+import asyncio
+import threading
+from typing import AsyncIterator, Awaitable, Callable, Dict, Set
+
+from overseer.models import RevoloriId
+from overseer.settings import settings
+
+RESYNC_EVENT = "event: resync\ndata: {}\n\n"
+KEEP_ALIVE_COMMENT = ": keep-alive\n\n"
+
+
+class Subscription:
+    """
+    Queue of server-sent events for a single connected data owner.
+    The queue lives on the event loop of the connection.
+    """
+
+    def __init__(self, owner_rid: RevoloriId, max_size: int):
+        self.owner_rid = owner_rid
+        self.loop = asyncio.get_event_loop()
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=max_size)
+
+    def deliver(self, event: str):
+        """Enqueue an event. Must be called on the event loop of the subscription."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # the client can't keep up, let it reload the accesses instead
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_EVENT)
+
+
+class AccessFeedHub:
+    """
+    In-process fan-out of newly logged data accesses to the subscribed data owners.
+
+    Publishing is thread-safe, so it can happen from the thread pool which runs the
+    routes. Only accesses logged by the same process are delivered.
+    """
+
+    def __init__(self, max_queue_size: int):
+        self._max_queue_size = max_queue_size
+        self._subscriptions: Dict[RevoloriId, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def has_subscribers(self, owner_rid: RevoloriId = None) -> bool:
+        """Check whether anyone, or the given data owner, is subscribed."""
+        if owner_rid is None:
+            return bool(self._subscriptions)
+        return owner_rid in self._subscriptions
+
+    def subscribe(self, owner_rid: RevoloriId) -> Subscription:
+        """Subscribe to the accesses of a data owner on the running event loop."""
+        subscription = Subscription(owner_rid, self._max_queue_size)
+        with self._lock:
+            self._subscriptions.setdefault(owner_rid, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.owner_rid, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.owner_rid, None)
+
+    def publish(self, owner_rid: RevoloriId, data: str, event: str = "data-access"):
+        """Send an event to all subscriptions of the data owner."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(owner_rid, ()))
+
+        message = f"event: {event}\ndata: {data}\n\n"
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+
+    async def stream(
+        self,
+        owner_rid: RevoloriId,
+        is_disconnected: Callable[[], Awaitable[bool]],
+    ) -> AsyncIterator[str]:
+        """Generate server-sent events for the data owner until the client leaves."""
+        subscription = self.subscribe(owner_rid)
+        try:
+            while not await is_disconnected():
+                try:
+                    yield await asyncio.wait_for(
+                        subscription.queue.get(), settings.LIVE_FEED_KEEP_ALIVE
+                    )
+                except asyncio.TimeoutError:
+                    yield KEEP_ALIVE_COMMENT
+        finally:
+            self.unsubscribe(subscription)
+
+
+access_feed = AccessFeedHub(settings.LIVE_FEED_QUEUE_SIZE)
@@ -2,38 +2,105 @@
 """ overseer: Inverse Transparency log store """
 
 import datetime as dt
-from typing import Dict, List, Optional, Set, Tuple
-
-from fastapi import Depends, FastAPI, HTTPException, Query
+import hashlib
+import json
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set, Tuple, Type
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel
 from sqlalchemy.exc import IntegrityError
-from starlette.responses import RedirectResponse, Response
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import (
+    JSONResponse,
+    PlainTextResponse,
+    RedirectResponse,
+    Response,
+    StreamingResponse,
+)
 from starlette.status import (
     HTTP_204_NO_CONTENT,
+    HTTP_304_NOT_MODIFIED,
     HTTP_400_BAD_REQUEST,
     HTTP_404_NOT_FOUND,
     HTTP_409_CONFLICT,
+    HTTP_422_UNPROCESSABLE_ENTITY,
+    HTTP_429_TOO_MANY_REQUESTS,
     HTTP_500_INTERNAL_SERVER_ERROR,
+    HTTP_503_SERVICE_UNAVAILABLE,
 )
 
 import overseer.models as dto
-from overseer.auth import admin_user_logged_in, technical_user_logged_in
+from overseer.admission import admission_control
+from overseer.archive import access_archive
+from overseer.auth import (
+    admin_user_logged_in,
+    get_current_user,
+    issuer_keys,
+    technical_user_logged_in,
+)
+from overseer.cache import policy_decision_cache, tool_snapshot
+from overseer.compression import CompressionMiddleware
 from overseer.dao.data_access import DataAccessDao
 from overseer.dao.data_access_policy import DataAccessPolicyDao
+from overseer.dao.idempotency import IdempotencyDao
 from overseer.dao.tool import ToolDao
-from overseer.db.connection import Session, close_db, get_db, init_db
+from overseer.db.connection import (
+    Session,
+    SessionLocal,
+    close_db,
+    get_db,
+    init_db,
+    verify_schema,
+)
 from overseer.db.models import DataAccess, DataAccessPolicy, DataOwner, DataType, Tool
 from overseer.exception import (
     handle_owner_not_signed_up,
+    handle_revolori_unavailable,
     handle_user_not_signed_up,
     http_exception,
 )
-from overseer.models import DataAccessKind, RevoloriId
-from overseer.services import RevoloriService
+from overseer.health import health_checker
+from overseer.invalidation import cache_invalidator
+from overseer.live import access_feed
+from overseer.models import (
+    DataAccessKind,
+    HistogramGroup,
+    HistogramInterval,
+    RevoloriId,
+)
+from overseer.normalization import find_redundant
+from overseer.profiling import ProfilingMiddleware, load_profile
+from overseer.serialization import FastJSONResponse, Model, build_model, respond
+from overseer.services import RevoloriService, mapping_replica
+from overseer.settings import SchemaCheck, settings
+
+logger = logging.getLogger(__name__)
 
 DOCS_URL = "/docs"
 
-overseer = FastAPI(docs_url=DOCS_URL)
+overseer = FastAPI(
+    docs_url=DOCS_URL,
+    default_response_class=(
+        FastJSONResponse if settings.FAST_SERIALIZATION else JSONResponse
+    ),
+)
+
+# innermost middleware, as the responses of `BaseHTTPMiddleware` subclasses are always
+# streamed and streamed responses aren't compressed
+overseer.add_middleware(
+    CompressionMiddleware,
+    encodings=settings.COMPRESSION_ENCODINGS,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
 
 overseer.add_middleware(
     CORSMiddleware,
@@ -43,19 +110,59 @@ overseer.add_middleware(
     allow_headers=["*"],
 )
 
+overseer.add_middleware(ProfilingMiddleware)
+
 
 ##### APP LIFECYCLE #####
 
 
+# duration of each startup phase in milliseconds
+startup_timings: Dict[str, float] = {}
+
+
+@contextmanager
+def startup_phase(name: str):
+    start = time.perf_counter()
+    yield
+    startup_timings[name] = (time.perf_counter() - start) * 1000
+
+
 @overseer.on_event("startup")
 def startup():
     """Called on app startup"""
-    init_db()
+    with startup_phase("schema"):
+        if settings.SCHEMA_CHECK == SchemaCheck.CREATE:
+            init_db()
+        elif settings.SCHEMA_CHECK == SchemaCheck.VERIFY:
+            verify_schema()
+
+    with startup_phase("issuer_keys"):
+        issuer_keys.reload()
+
+    with startup_phase("cache_invalidations"):
+        cache_invalidator.start_polling(settings.CACHE_SYNC_INTERVAL)
+
+    # not needed for serving the first requests
+    issuer_keys.start_reloading(settings.JWT_KEY_RELOAD_INTERVAL)
+    threading.Thread(target=RevoloriService.warm_up, daemon=True).start()
+    health_checker.start_checking(settings.HEALTH_CHECK_INTERVAL)
+    if mapping_replica.enabled:
+        mapping_replica.start_syncing(settings.REVOLORI_SYNC_INTERVAL)
+
+    logger.info(
+        "Started in %.1fms (%s)",
+        sum(startup_timings.values()),
+        ", ".join(f"{name}: {value:.1f}ms" for name, value in startup_timings.items()),
+    )
 
 
 @overseer.on_event("shutdown")
 def shutdown():
     """Called on app shutdown"""
+    health_checker.stop_checking()
+    mapping_replica.stop_syncing()
+    cache_invalidator.stop_polling()
+    issuer_keys.stop_reloading()
     close_db()
 
 
@@ -67,18 +174,110 @@ async def redirect_to_docs():
     return RedirectResponse(url=DOCS_URL)
 
 
+async def readiness_status() -> dto.ReadinessStatus:
+    """
+    Helper function returning the latest status of the health checker. The database
+    is only checked right away if the checker hasn't run recently, e.g. because it
+    isn't started in tests.
+    """
+    max_age = 3 * settings.HEALTH_CHECK_INTERVAL
+    status = health_checker.status(max_age)
+    if status is None:
+        status = await run_in_threadpool(health_checker.check_database, max_age)
+    return status
+
+
 @overseer.get("/health", response_model=None)
-def check_health(session: Session = Depends(get_db)):
-    try:
-        session.execute("SELECT 1")
-    except Exception as exc:
+async def check_health():
+    """Check whether Overseer is ready, kept for existing probes."""
+    status = await readiness_status()
+    if not status.ready:
         raise HTTPException(
             HTTP_500_INTERNAL_SERVER_ERROR, detail="Database is unavailable."
-        ) from exc
+        )
+
+
+@overseer.get("/health/live", response_model=None)
+async def check_liveness():
+    """Check whether the process is serving requests without touching dependencies."""
+    return {"status": "ok"}
+
+
+@overseer.get(
+    "/health/ready",
+    response_model=dto.ReadinessStatus,
+    responses={HTTP_503_SERVICE_UNAVAILABLE: {"model": dto.ReadinessStatus}},
+)
+async def check_readiness(response: Response):
+    """
+    Check whether Overseer is ready to serve requests. The status is checked in the
+    background and served from memory.
+    """
+    status = await readiness_status()
+    if not status.ready:
+        response.status_code = HTTP_503_SERVICE_UNAVAILABLE
+    return status
+
+
+def data_access_filter(
+    tool: List[str] = Query(None, description="Only include accesses by these tools."),
+    user_rid: List[RevoloriId] = Query(
+        None, description="Only include accesses by these users."
+    ),
+    access_kind: List[DataAccessKind] = Query(
+        None, description="Only include accesses of these kinds."
+    ),
+    data_type: List[str] = Query(
+        None, description="Only include accesses to any of these data types."
+    ),
+    search: str = Query(
+        None,
+        description="Only include accesses whose justification contains all of these "
+        "words.",
+    ),
+) -> dto.DataAccessFilter:
+    """Dependency for the filters on data accesses."""
+    return dto.DataAccessFilter(
+        tools=tool or [],
+        user_rids=user_rid or [],
+        access_kinds=access_kind or [],
+        data_types=data_type or [],
+        search=search,
+    )
+
+
+def data_accesses_etag(request: Request, dao: DataAccessDao, session: Session) -> str:
+    """
+    Helper function for computing a weak ETag of the data accesses of the logged in
+    user, which changes whenever an access is logged for the user or archived.
+    The query parameters are part of the tag as they select the returned accesses.
+    """
+    version = hashlib.sha256()
+    for part in [
+        dao.logged_in_user,
+        str(dao.change_watermark(session)),
+        str(access_archive.watermark()),
+        *sorted(f"{key}={value}" for key, value in request.query_params.multi_items()),
+    ]:
+        version.update(part.encode() + b"\0")
+    return f'W/"{version.hexdigest()[:32]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Helper function for checking an ETag against the `If-None-Match` header."""
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is None:
+        return False
+
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    # the tags are compared weakly, i.e. ignoring the weakness indicator
+    return "*" in tags or etag in tags or etag[2:] in tags
 
 
 @overseer.get("/data-accesses", response_model=dto.DataAccessesResponse)
 def get_data_accesses(
+    request: Request,
+    response: Response,
     date_start: dt.date = Query(None, description="Start of the relevant date range."),
     date_end: dt.date = Query(None, description="End of the relevant date range."),
     limit: Optional[int] = Query(
@@ -91,14 +290,26 @@ def get_data_accesses(
         description="Rows to skip before beginning to return the accesses. Default: 0",
         ge=0,
     ),
+    filters: dto.DataAccessFilter = Depends(data_access_filter),
     dao: DataAccessDao = Depends(),
     session: Session = Depends(get_db),
 ):
-    """Retrieve stored data accesses."""
+    """
+    Retrieve stored data accesses.
+    The response carries an ETag. Requests with a matching `If-None-Match` header are
+    answered with 304 Not Modified.
+    """
 
     with session:
+        # computed before loading, so a tag never claims newer accesses than returned
+        etag = data_accesses_etag(request, dao, session)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(request, etag):
+            return Response(status_code=HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+
         count: Dict[str, Dict[str, int]] = dao.count(
-            session=session, date_start=date_start, date_end=date_end
+            session=session, date_start=date_start, date_end=date_end, filters=filters
         )
 
         accesses: List[DataAccess] = dao.load_all(
@@ -107,10 +318,12 @@ def get_data_accesses(
             date_end=date_end,
             limit=limit,
             offset=offset,
+            filters=filters,
         )
 
         single_owner_accesses = [
-            dto.DataAccessSingleOwner(
+            build_model(
+                dto.DataAccessSingleOwner,
                 access_kind=access.access_kind,
                 data_types=[data_type.type for data_type in access.data_types],
                 justification=access.justification,
@@ -122,14 +335,85 @@ def get_data_accesses(
             for access in accesses
         ]
 
-        return dto.DataAccessesResponse(
+        data_accesses_response = build_model(
+            dto.DataAccessesResponse,
             owner_rid=dao.logged_in_user,
             accesses=single_owner_accesses,
-            overview=dto.DataAccessOverview(**count),
+            overview=build_model(dto.DataAccessOverview, **count),
             offset=offset,
             limit=limit,
             total=sum(count["access_kind"].values()),
         )
+        return respond(data_accesses_response, headers)
+
+
+@overseer.get(
+    "/data-accesses/histogram", response_model=dto.DataAccessHistogramResponse
+)
+def get_data_access_histogram(
+    interval: HistogramInterval = Query(
+        HistogramInterval.DAY, description="The width of the buckets."
+    ),
+    group_by: Optional[HistogramGroup] = Query(
+        None, description="Split the buckets by the values of this key."
+    ),
+    date_start: dt.date = Query(None, description="Start of the relevant date range."),
+    date_end: dt.date = Query(None, description="End of the relevant date range."),
+    filters: dto.DataAccessFilter = Depends(data_access_filter),
+    dao: DataAccessDao = Depends(),
+    session: Session = Depends(get_db),
+):
+    """Count the stored data accesses over time."""
+
+    with session:
+        histogram = dao.histogram(
+            session=session,
+            interval=interval,
+            group_by=group_by,
+            date_start=date_start,
+            date_end=date_end,
+            filters=filters,
+        )
+
+        buckets = [
+            build_model(
+                dto.DataAccessHistogramBucket,
+                start=bucket_start,
+                total=sum(groups.values()),
+                groups=groups if group_by is not None else None,
+            )
+            for bucket_start, groups in histogram.items()
+        ]
+
+        histogram_response = build_model(
+            dto.DataAccessHistogramResponse,
+            owner_rid=dao.logged_in_user,
+            interval=interval,
+            group_by=group_by,
+            buckets=buckets,
+        )
+        return respond(histogram_response)
+
+
+@overseer.get(
+    "/data-accesses/live",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def stream_data_accesses(
+    request: Request, owner_rid: RevoloriId = Depends(get_current_user)
+):
+    """
+    Stream the data accesses of the logged in user as server-sent events as soon as
+    they are logged. Each `data-access` event contains a `DataAccessSingleOwner`.
+    A `resync` event is sent if events had to be dropped because the client fell
+    behind; the client should reload `/data-accesses` then.
+    """
+    return StreamingResponse(
+        access_feed.stream(owner_rid, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
 
 
 def check_who_consented_and_log_access(
@@ -159,6 +443,90 @@ def check_all_consented_and_log_access(
     return all_consented
 
 
+def idempotency_key_header(
+    idempotency_key: Optional[str] = Header(
+        None,
+        max_length=200,
+        description="Unique key of the request. Retries with the same key and body "
+        "return the original response without logging the access again.",
+    )
+) -> Optional[str]:
+    """Dependency for the `Idempotency-Key` header of the request access endpoints."""
+    return idempotency_key
+
+
+def hash_request(path: str, body: BaseModel) -> str:
+    """Helper function for recognizing retries of a request by its path and body."""
+    request = f"{path}\n{body.json(sort_keys=True)}"
+    return hashlib.sha256(request.encode()).hexdigest()
+
+
+def replay_idempotent_request(
+    session: Session,
+    idempotency_key: Optional[str],
+    path: str,
+    body: BaseModel,
+    response_class: Type[Model],
+) -> Optional[Model]:
+    """
+    Helper function for returning the stored response of a request which is retried
+    with the same `Idempotency-Key` header. Returns None if there is no such response.
+    Reusing the key for another endpoint or body is rejected.
+    """
+    if idempotency_key is None:
+        return None
+
+    stored = IdempotencyDao.load(session, idempotency_key, settings.IDEMPOTENCY_KEY_TTL)
+    if stored is None:
+        return None
+
+    if stored.request_hash != hash_request(path, body):
+        raise HTTPException(
+            HTTP_422_UNPROCESSABLE_ENTITY,
+            "The Idempotency-Key was already used for a different request.",
+        )
+    return response_class.parse_raw(stored.response)
+
+
+def store_idempotent_response(
+    session: Session,
+    idempotency_key: Optional[str],
+    path: str,
+    body: BaseModel,
+    response: Model,
+) -> Model:
+    """
+    Helper function for storing the response of a request with an `Idempotency-Key`
+    header in the transaction which logs the access. If a concurrent request with the
+    same key won, the transaction is rolled back and the stored response is returned
+    instead, so the access is logged only once.
+    """
+    if idempotency_key is None:
+        return response
+
+    try:
+        IdempotencyDao.add(
+            session,
+            idempotency_key,
+            hash_request(path, body),
+            response.json(),
+            settings.IDEMPOTENCY_KEY_TTL,
+        )
+    except IntegrityError:
+        session.rollback()
+        stored = replay_idempotent_request(
+            session, idempotency_key, path, body, type(response)
+        )
+        if stored is None:
+            raise
+        return stored
+
+    IdempotencyDao.prune(
+        session, settings.IDEMPOTENCY_KEY_TTL, settings.IDEMPOTENCY_MAX_KEYS
+    )
+    return response
+
+
 def validate_tool_exists(session: Session, tool_name: Optional[str]):
     """
     Helper function for validating that the tool exists in the DB.
@@ -167,19 +535,82 @@ def validate_tool_exists(session: Session, tool_name: Optional[str]):
     The purpose of this function is to return a 400 error instead of a generic 500 error
     caused by a constraint violation.
     """
-    if tool_name is not None and ToolDao.load_single(session, tool_name) is None:
+    if tool_name is not None and tool_name not in ToolDao.load_cached(session):
         raise HTTPException(HTTP_400_BAD_REQUEST, f"Tool '{tool_name}' is unknown.")
 
 
+def validate_tools_exist(session: Session, tool_names: Set[Optional[str]]):
+    """
+    Helper function for validating that several tools exist.
+    See `validate_tool_exists`.
+    """
+    tool_names.discard(None)
+    if not tool_names:
+        return
+
+    unknown_tools = sorted(tool_names - ToolDao.load_cached(session).keys())
+    if unknown_tools:
+        raise HTTPException(HTTP_400_BAD_REQUEST, f"Tools {unknown_tools} are unknown.")
+
+
+def load_tools() -> Dict[str, dto.Tool]:
+    with SessionLocal() as session:
+        return ToolDao.load_cached(session)
+
+
+async def admit_access_request(request: Request):
+    """
+    Dependency for shedding the access requests of tools which exceed their limits.
+    It runs on the event loop before the route, so rejected requests don't wait for
+    the thread pool, the database or Revolori. Unknown tools are left to the route.
+    """
+    try:
+        body = await request.json()  # already parsed and cached by FastAPI
+    except json.JSONDecodeError:
+        body = None  # FastAPI doesn't parse empty bodies, the route rejects them
+
+    # malformed bodies are left to the validation of the route as well
+    name = body.get("tool") if isinstance(body, dict) else None
+    if not isinstance(name, str):
+        yield
+        return
+
+    tools = tool_snapshot.cached()
+    if tools is None:
+        tools = await run_in_threadpool(load_tools)
+
+    tool = tools.get(name)
+    if tool is None:
+        yield
+        return
+
+    admitted, retry_after = admission_control.admit(tool.name, tool)
+    if not admitted:
+        raise HTTPException(
+            HTTP_429_TOO_MANY_REQUESTS,
+            f"Too many access requests of tool '{tool.name}'.",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+    try:
+        yield
+    finally:
+        admission_control.release(tool.name)
+
+
 @overseer.post(
     "/request-access/direct",
     response_model=dto.RequestAccessResponse,
-    dependencies=[Depends(technical_user_logged_in)],
+    dependencies=[
+        Depends(technical_user_logged_in),
+        Depends(admit_access_request),
+    ],
 )
 def request_direct_access(
     body: dto.RequestDirectAccessRequest,
     session: Session = Depends(get_db),
     revolori_service: RevoloriService = Depends(),
+    idempotency_key: Optional[str] = Depends(idempotency_key_header),
 ):
     """
     Requests direct access to the data of a single individual.
@@ -193,8 +624,9 @@ def request_direct_access(
         owners=[body.owner],
     )
 
+    # retries are recognized by the multiuser request, which is the one stored
     response = request_multiuser_direct_access(
-        access_request, session, revolori_service
+        access_request, session, revolori_service, idempotency_key
     )
 
     return dto.RequestAccessResponse(granted=[body.owner] == response.granted)
@@ -203,19 +635,33 @@ def request_direct_access(
 @overseer.post(
     "/request-access/direct/multi",
     response_model=dto.RequestIndividualAccessResponse,
-    dependencies=[Depends(technical_user_logged_in)],
+    dependencies=[
+        Depends(technical_user_logged_in),
+        Depends(admit_access_request),
+    ],
 )
 def request_multiuser_direct_access(
     body: dto.RequestMultiuserDirectAccessRequest,
     session: Session = Depends(get_db),
     revolori_service: RevoloriService = Depends(),
+    idempotency_key: Optional[str] = Depends(idempotency_key_header),
 ):
     """
     Requests direct access to the same data of multiple individuals.
     E.g. data which has been accessed by its id.
     """
 
-    with session:
+    with handle_revolori_unavailable(), session:
+        replayed = replay_idempotent_request(
+            session,
+            idempotency_key,
+            "/request-access/direct/multi",
+            body,
+            dto.RequestIndividualAccessResponse,
+        )
+        if replayed is not None:
+            return replayed
+
         validate_tool_exists(session, body.tool)
 
         with handle_owner_not_signed_up():
@@ -252,27 +698,44 @@ def request_multiuser_direct_access(
                 result.update(owner_rid_mapping[owner])
             return result
 
-        return dto.RequestIndividualAccessResponse(
+        response = dto.RequestIndividualAccessResponse(
             granted=list(map_revolori_id_to_requested_id(granted)),
             rejected=list(map_revolori_id_to_requested_id(rejected)),
         )
+        return store_idempotent_response(
+            session, idempotency_key, "/request-access/direct/multi", body, response
+        )
 
 
 @overseer.post(
     "/request-access/query",
     response_model=dto.RequestAccessResponse,
-    dependencies=[Depends(technical_user_logged_in)],
+    dependencies=[
+        Depends(technical_user_logged_in),
+        Depends(admit_access_request),
+    ],
 )
 def request_query_access(
     body: dto.RequestQueryAccessRequest,
     session: Session = Depends(get_db),
     revolori_service: RevoloriService = Depends(),
+    idempotency_key: Optional[str] = Depends(idempotency_key_header),
 ):
     """
     Requests access to the data of multiple individuals as part of a search query.
     E.g. data which has been displayed as part of a search result.
     """
-    with session:
+    with handle_revolori_unavailable(), session:
+        replayed = replay_idempotent_request(
+            session,
+            idempotency_key,
+            "/request-access/query",
+            body,
+            dto.RequestAccessResponse,
+        )
+        if replayed is not None:
+            return replayed
+
         validate_tool_exists(session, body.tool)
 
         with handle_owner_not_signed_up():
@@ -295,25 +758,42 @@ def request_query_access(
             DataType(type=data_type) for data_type in body.data_types
         ]
 
-        return dto.RequestAccessResponse(
+        response = dto.RequestAccessResponse(
             granted=check_all_consented_and_log_access(session, data_access)
         )
+        return store_idempotent_response(
+            session, idempotency_key, "/request-access/query", body, response
+        )
 
 
 @overseer.post(
     "/request-access/aggregate",
     response_model=dto.RequestAccessResponse,
-    dependencies=[Depends(technical_user_logged_in)],
+    dependencies=[
+        Depends(technical_user_logged_in),
+        Depends(admit_access_request),
+    ],
 )
 def request_aggregate_access(
     body: dto.RequestAggregateAccessRequest,
     session: Session = Depends(get_db),
     revolori_service: RevoloriService = Depends(),
+    idempotency_key: Optional[str] = Depends(idempotency_key_header),
 ):
     """
     Requests access to the data of multiple individuals as part of an aggregate function.
     """
-    with session:
+    with handle_revolori_unavailable(), session:
+        replayed = replay_idempotent_request(
+            session,
+            idempotency_key,
+            "/request-access/aggregate",
+            body,
+            dto.RequestAccessResponse,
+        )
+        if replayed is not None:
+            return replayed
+
         validate_tool_exists(session, body.tool)
 
         with handle_owner_not_signed_up():
@@ -336,9 +816,12 @@ def request_aggregate_access(
             DataType(type=data_type) for data_type in body.data_types
         ]
 
-        return dto.RequestAccessResponse(
+        response = dto.RequestAccessResponse(
             granted=check_all_consented_and_log_access(session, data_access)
         )
+        return store_idempotent_response(
+            session, idempotency_key, "/request-access/aggregate", body, response
+        )
 
 
 @overseer.post(
@@ -386,6 +869,92 @@ def generate(
         return f"{number_of_entries} entries were added"
 
 
+@overseer.post(
+    "/archive",
+    response_model=dto.DataAccessArchiveResult,
+    dependencies=[Depends(admin_user_logged_in)],
+)
+def archive_data_accesses(
+    before: dt.date = Query(
+        None,
+        description="The date before which data accesses are archived. "
+        "Default: `ARCHIVE_AFTER_DAYS` days ago",
+    ),
+    session: Session = Depends(get_db),
+):
+    """Move old data accesses into the cold archive."""
+    if not access_archive.enabled:
+        raise HTTPException(HTTP_400_BAD_REQUEST, "Archiving is disabled.")
+
+    if before is None:
+        before = dt.date.today() - dt.timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+
+    with session:
+        archived = DataAccessDao.archive(
+            session=session, before=dt.datetime.combine(before, dt.time.min)
+        )
+
+    return dto.DataAccessArchiveResult(
+        archived=archived, watermark=access_archive.watermark()
+    )
+
+
+@overseer.get(
+    "/metrics",
+    response_model=Dict[str, Dict[str, float]],
+    dependencies=[Depends(admin_user_logged_in)],
+)
+def get_metrics():
+    """
+    Get the metrics of the in-process caches, the admission of access requests per
+    tool, the lookups of Revolori IDs and the durations of startup phases.
+    """
+    return {
+        "policy_decision_cache": policy_decision_cache.metrics(),
+        "admission": admission_control.metrics(),
+        "revolori": RevoloriService.metrics(),
+        "startup": startup_timings,
+    }
+
+
+@overseer.post(
+    "/revolori-mappings/sync",
+    response_model=dto.RevoloriMappingSyncResult,
+    dependencies=[Depends(admin_user_logged_in)],
+)
+def sync_revolori_mappings():
+    """Synchronize the local replica of Revolori's ID mapping now."""
+    if not mapping_replica.enabled:
+        raise HTTPException(HTTP_400_BAD_REQUEST, "The replica is disabled.")
+
+    with handle_revolori_unavailable():
+        return mapping_replica.sync()
+
+
+@overseer.get(
+    "/profiles/{profile_id}",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(admin_user_logged_in)],
+)
+def get_profile(
+    profile_id: str,
+    sort_by: str = Query(
+        "cumulative",
+        description="The pstats key by which the profile is sorted.",
+        regex="^(calls|cumulative|filename|line|name|ncalls|nfl|pcalls|stdname|time|"
+        "tottime)$",
+    ),
+    limit: int = Query(50, description="Maximum number of functions to list.", ge=1),
+):
+    """Render the profile of a request made with the X-Profile-Authorization header."""
+    profile = load_profile(profile_id, sort_by, limit)
+
+    if profile is None:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND)
+
+    return PlainTextResponse(profile)
+
+
 @overseer.get("/data-access-policies", response_model=List[dto.DataAccessPolicy])
 def get_data_access_policies(
     dao: DataAccessPolicyDao = Depends(),
@@ -394,9 +963,12 @@ def get_data_access_policies(
     """Load all data access policies for the logged in user."""
     with session:
         data_access_policies: List[DataAccessPolicy] = dao.load_all(session=session)
-        return [
-            dto.DataAccessPolicy(**policy.__dict__) for policy in data_access_policies
-        ]
+        return respond(
+            [
+                build_model(dto.DataAccessPolicy, **policy.__dict__)
+                for policy in data_access_policies
+            ]
+        )
 
 
 @overseer.post("/data-access-policies", response_model=dto.DataAccessPolicy)
@@ -416,6 +988,135 @@ def create_data_access_policy(
         return dto.DataAccessPolicy(**data_access_policy.__dict__)
 
 
+@overseer.post(
+    "/data-access-policies/bulk",
+    response_model=dto.DataAccessPoliciesBulkResult,
+)
+def bulk_update_data_access_policies(
+    changes: dto.DataAccessPoliciesBulkUpdate,
+    dao: DataAccessPolicyDao = Depends(),
+    session: Session = Depends(get_db),
+):
+    """
+    Create, update and delete many data access policies of the logged in user in a
+    single transaction. Either all changes are applied or none.
+
+    If `replace` is set, all policies which are not updated are deleted.
+    """
+    update_ids = [policy.id for policy in changes.update]
+    if len(set(update_ids)) != len(update_ids):
+        raise HTTPException(HTTP_400_BAD_REQUEST, "Policies are updated twice.")
+    if set(update_ids) & set(changes.delete):
+        raise HTTPException(
+            HTTP_400_BAD_REQUEST, "Policies are both updated and deleted."
+        )
+
+    with session:
+        validate_tools_exist(
+            session,
+            {policy.tool for policy in changes.create + changes.update},
+        )
+
+        if changes.replace:
+            existing = {policy.id: policy for policy in dao.load_all(session=session)}
+        else:
+            existing = {
+                policy.id: policy
+                for policy in dao.load_many(
+                    session=session,
+                    data_access_policy_ids=update_ids + changes.delete,
+                )
+            }
+
+        missing_ids = sorted(set(update_ids + changes.delete) - existing.keys())
+        if missing_ids:
+            raise HTTPException(
+                HTTP_404_NOT_FOUND, f"Policies {missing_ids} don't exist."
+            )
+
+        updated = []
+        for policy_update in changes.update:
+            data_access_policy = existing[policy_update.id]
+            dao.update(
+                session=session,
+                data_access_policy=data_access_policy,
+                values=policy_update.dict(exclude={"id"}),
+            )
+            updated.append(data_access_policy)
+
+        if changes.replace:
+            deleted_ids = sorted(existing.keys() - set(update_ids))
+        else:
+            deleted_ids = sorted(set(changes.delete))
+        if deleted_ids:
+            dao.delete_many(session=session, data_access_policy_ids=deleted_ids)
+
+        created = [DataAccessPolicy(**policy.dict()) for policy in changes.create]
+        for data_access_policy in created:
+            dao.add(session=session, data_access_policy=data_access_policy)
+        session.flush()  # persist entities to get ids
+
+        return dto.DataAccessPoliciesBulkResult(
+            created=[dto.DataAccessPolicy(**policy.__dict__) for policy in created],
+            updated=[dto.DataAccessPolicy(**policy.__dict__) for policy in updated],
+            deleted=deleted_ids,
+        )
+
+
+def compact_data_access_policies(
+    dao: DataAccessPolicyDao, session: Session, apply: bool
+) -> dto.DataAccessPolicyCompaction:
+    """Helper function for finding and optionally removing redundant policies."""
+    policies = {policy.id: policy for policy in dao.load_all(session=session)}
+    covered_by = find_redundant(list(policies.values()))
+
+    if apply and covered_by:
+        dao.delete_many(session=session, data_access_policy_ids=covered_by.keys())
+
+    return dto.DataAccessPolicyCompaction(
+        redundant=[
+            dto.RedundantDataAccessPolicy(
+                policy=dto.DataAccessPolicy(**policies[policy_id].__dict__),
+                covered_by=other_id,
+            )
+            for policy_id, other_id in sorted(covered_by.items())
+        ],
+        remaining=len(policies) - len(covered_by),
+    )
+
+
+@overseer.get(
+    "/data-access-policies/compaction",
+    response_model=dto.DataAccessPolicyCompaction,
+)
+def preview_data_access_policy_compaction(
+    dao: DataAccessPolicyDao = Depends(),
+    session: Session = Depends(get_db),
+):
+    """
+    List the data access policies of the logged in user which are redundant, i.e.
+    duplicates or subsumed by a more general policy.
+    """
+    with session:
+        return compact_data_access_policies(dao, session, apply=False)
+
+
+@overseer.post(
+    "/data-access-policies/compaction",
+    response_model=dto.DataAccessPolicyCompaction,
+)
+def apply_data_access_policy_compaction(
+    dao: DataAccessPolicyDao = Depends(),
+    session: Session = Depends(get_db),
+):
+    """
+    Delete the redundant data access policies of the logged in user.
+    The permitted accesses stay the same.
+    """
+    with session:
+        return compact_data_access_policies(dao, session, apply=True)
+
+
 @overseer.get(
     "/data-access-policies/{data_access_policy_id}",
     response_model=dto.DataAccessPolicy,
@@ -460,8 +1161,11 @@ def update_data_access_policy(
         if data_access_policy is None:
             raise HTTPException(status_code=HTTP_404_NOT_FOUND)
 
-        for key, value in policy_update.dict().items():
-            setattr(data_access_policy, key, value)
+        dao.update(
+            session=session,
+            data_access_policy=data_access_policy,
+            values=policy_update.dict(),
+        )
 
         return dto.DataAccessPolicy(**data_access_policy.__dict__)
 
@@ -514,6 +1218,25 @@ def create_tool_type(tool: dto.Tool, session: Session = Depends(get_db)):
         return dto.Tool(**new_tool.__dict__)
 
 
+@overseer.put(
+    "/tool-types/{tool_name}",
+    response_model=dto.Tool,
+    dependencies=[Depends(admin_user_logged_in)],
+)
+def update_tool_type(
+    tool_name: str, limits: dto.ToolLimits, session: Session = Depends(get_db)
+):
+    """Update the admission limits of a tool type."""
+    with session:
+        tool = ToolDao.load_single(session, tool_name)
+
+        if tool is None:
+            raise HTTPException(status_code=HTTP_404_NOT_FOUND)
+
+        ToolDao.update(session, tool, limits.dict())
+        return dto.Tool(**tool.__dict__)
+
+
 @overseer.delete(
     "/tool-types/{tool_name}",
     status_code=204,
@@ -76,6 +76,97 @@ class DataAccessOverview(BaseModel):
     )
 
 
+class DataAccessArchiveResult(BaseModel):
+    """
+    Outcome of moving old data accesses into the cold archive.
+    """
+
+    archived: int = Field(..., description="The number of archived data accesses.")
+
+    watermark: Optional[dt.datetime] = Field(
+        ..., description="All data accesses before this time are archived."
+    )
+
+
+class RevoloriMappingSyncResult(BaseModel):
+    """
+    Outcome of synchronizing the local replica of Revolori's ID mapping.
+    """
+
+    added: int = Field(..., description="The number of added mappings.")
+    updated: int = Field(..., description="The number of changed mappings.")
+    removed: int = Field(..., description="The number of removed mappings.")
+    total: int = Field(..., description="The number of mappings after the sync.")
+
+
+class DataAccessFilter(BaseModel):
+    """
+    Filters on the attributes of data accesses.
+    Each filter matches any of its values and is ignored if it is empty.
+    """
+
+    tools: List[str] = []
+    user_rids: List[RevoloriId] = []
+    access_kinds: List[DataAccessKind] = []
+    data_types: List[str] = []
+    search: Optional[str] = None
+
+
+class HistogramInterval(str, Enum):
+    """
+    Enum representing the width of the buckets of a histogram.
+    Weeks start on Monday.
+    """
+
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
+class HistogramGroup(str, Enum):
+    """
+    Enum representing the keys by which the buckets of a histogram can be split.
+    """
+
+    TOOL = "tool"
+    ACCESS_KIND = "access_kind"
+    USER_RID = "user_rid"
+
+
+class DataAccessHistogramBucket(BaseModel):
+    start: dt.date = Field(..., description="The first day of the bucket.")
+
+    total: int = Field(..., description="Number of data accesses within the bucket.")
+
+    groups: Optional[Dict[str, int]] = Field(
+        None,
+        description="Number of data accesses within the bucket per value of the "
+        "group_by key. Only present if the histogram is grouped.",
+    )
+
+
+class DataAccessHistogramResponse(BaseModel):
+    """
+    Response when querying the number of accesses to the data of a user over time.
+    """
+
+    owner_rid: RevoloriId = Field(
+        ..., description="The Revolori ID of the user whose data has been accessed."
+    )
+
+    interval: HistogramInterval = Field(..., description="The width of the buckets.")
+
+    group_by: Optional[HistogramGroup] = Field(
+        ..., description="The key by which the buckets are split."
+    )
+
+    buckets: List[DataAccessHistogramBucket] = Field(
+        ...,
+        description="The buckets in chronological order. "
+        "Buckets without data accesses are omitted.",
+    )
+
+
 class DataAccessesResponse(BaseModel):
     """
     Response when querying the accesses to the data of a user.
@@ -259,9 +350,143 @@ class DataAccessPolicyUpdate(DataAccessPolicyBase):
     pass
 
 
-class Tool(BaseModel):
+class ToolLimits(BaseModel):
+    """
+    Admission limits of the access requests of a tool, applied per worker process.
+    Requests exceeding them are rejected with status 429.
+    """
+
+    max_concurrent_requests: Optional[int] = Field(
+        None,
+        description="Maximum number of access requests handled at the same time. "
+        "Unlimited if not set.",
+        ge=1,
+    )
+    rate_limit: Optional[float] = Field(
+        None,
+        description="Maximum number of access requests per second on average. "
+        "Unlimited if not set.",
+        gt=0,
+    )
+    rate_limit_burst: Optional[int] = Field(
+        None,
+        description="Maximum number of access requests admitted at once after the "
+        "tool was idle. Defaults to the rate limit, rounded up.",
+        ge=1,
+    )
+
+
+class Tool(ToolLimits):
     """
     A tool which is used for accessing data.
     """
 
     name: str = Field(..., description="The name of the tool.")
+
+
+class RedundantDataAccessPolicy(BaseModel):
+    """
+    A data access policy which doesn't permit any access beyond the other policies.
+    """
+
+    policy: DataAccessPolicy = Field(..., description="The redundant policy.")
+
+    covered_by: Optional[int] = Field(
+        ...,
+        description="The id of a remaining policy which permits every access the "
+        "redundant policy permits. Null if the policy never matches because its "
+        "validity period is empty.",
+    )
+
+
+class DataAccessPolicyCompaction(BaseModel):
+    """
+    The redundant data access policies of a user.
+    """
+
+    redundant: List[RedundantDataAccessPolicy] = Field(
+        ..., description="The policies which are removed by the compaction."
+    )
+
+    remaining: int = Field(
+        ..., description="The number of policies which remain after the compaction."
+    )
+
+
+class DataAccessPoliciesBulkUpdate(BaseModel):
+    """
+    Changes to many data access policies of a user which are applied atomically.
+    """
+
+    create: List[DataAccessPolicyUpdate] = Field(
+        [], description="The policies which should be created."
+    )
+
+    update: List[DataAccessPolicy] = Field(
+        [], description="The existing policies which should be updated, by id."
+    )
+
+    delete: List[int] = Field(
+        [], description="The ids of the policies which should be deleted."
+    )
+
+    replace: bool = Field(
+        False,
+        description="Whether all policies which are not updated should be deleted, "
+        "so that the created and updated policies are the only remaining ones.",
+    )
+
+
+class DataAccessPoliciesBulkResult(BaseModel):
+    """
+    The outcome of a bulk change of data access policies.
+    """
+
+    created: List[DataAccessPolicy] = Field(..., description="The created policies.")
+
+    updated: List[DataAccessPolicy] = Field(..., description="The updated policies.")
+
+    deleted: List[int] = Field(..., description="The ids of the deleted policies.")
+
+
+class DependencyStatus(BaseModel):
+    """
+    The status of a service which Overseer depends on.
+    """
+
+    ok: bool = Field(..., description="Whether the service is available.")
+
+    latency: Optional[float] = Field(
+        None, description="The duration of the check in milliseconds."
+    )
+
+    error: Optional[str] = Field(None, description="Why the service is unavailable.")
+
+
+class ReadinessStatus(BaseModel):
+    """
+    Whether Overseer is ready to serve requests, according to the latest check of its
+    dependencies.
+    """
+
+    ready: bool = Field(..., description="Whether the database is available.")
+
+    checked_at: dt.datetime = Field(..., description="The time of the check.")
+
+    database: DependencyStatus = Field(..., description="The status of the database.")
+
+    revolori: DependencyStatus = Field(
+        ...,
+        description="The status of Revolori, which is only needed for requesting "
+        "access.",
+    )
+
+    connections_in_use: int = Field(
+        ..., description="The number of database connections which are checked out."
+    )
+
+    connection_pool_size: Optional[int] = Field(
+        ...,
+        description="The size of the database connection pool. "
+        "Null if the number of connections is unbounded.",
+    )
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+""" Normalization of data access policies """
+
+import datetime as dt
+from typing import Dict, List, Optional
+
+from overseer.db.models import DataAccessPolicy
+
+# fields which are either a wildcard (None) or have to match the access exactly
+MATCHED_FIELDS = ["access_kind", "tool", "user_rid"]
+
+
+def is_empty(policy: DataAccessPolicy) -> bool:
+    """Check whether the validity period of the policy contains no day at all."""
+    start: Optional[dt.date] = policy.validity_period_start_date
+    end: Optional[dt.date] = policy.validity_period_end_date
+    return start is not None and end is not None and start > end
+
+
+def subsumes(general: DataAccessPolicy, specific: DataAccessPolicy) -> bool:
+    """Check whether `general` permits every access which `specific` permits."""
+    for field in MATCHED_FIELDS:
+        value = getattr(general, field)
+        if value is not None and value != getattr(specific, field):
+            return False
+
+    general_start = general.validity_period_start_date
+    specific_start = specific.validity_period_start_date
+    if general_start is not None and (
+        specific_start is None or specific_start < general_start
+    ):
+        return False
+
+    general_end = general.validity_period_end_date
+    specific_end = specific.validity_period_end_date
+    if general_end is not None and (specific_end is None or specific_end > general_end):
+        return False
+
+    return True
+
+
+def find_redundant(policies: List[DataAccessPolicy]) -> Dict[int, Optional[int]]:
+    """
+    Find the policies which can be removed without changing which accesses are
+    permitted, e.g. tool-specific policies next to a wildcard-tool policy.
+
+    Returns a mapping from the id of each redundant policy to the id of a remaining
+    policy which covers it. Policies which never match, because their validity period
+    is empty, are mapped to None. Of several identical policies, the oldest is kept.
+    """
+    covered_by: Dict[int, Optional[int]] = {}
+    candidates = [policy for policy in policies if not is_empty(policy)]
+
+    for policy in policies:
+        if is_empty(policy):
+            covered_by[policy.id] = None
+            continue
+
+        for other in candidates:
+            if other.id == policy.id or not subsumes(other, policy):
+                continue
+
+            # identical policies subsume each other, keep the oldest one
+            if subsumes(policy, other) and policy.id < other.id:
+                continue
+
+            covered_by[policy.id] = other.id
+            break
+
+    # point to a remaining policy; subsumption is transitive and the chains end
+    # because identical policies are ordered by id
+    for policy_id, other_id in covered_by.items():
+        while other_id in covered_by:
+            other_id = covered_by[other_id]
+        covered_by[policy_id] = other_id
+
+    return covered_by
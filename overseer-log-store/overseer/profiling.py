@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+""" Profiling of individual requests """
+
+import asyncio
+import base64
+import binascii
+import cProfile
+import io
+import os
+import pstats
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.status import HTTP_401_UNAUTHORIZED
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from overseer.auth import admin_user_logged_in
+from overseer.settings import settings
+
+PROFILE_AUTHORIZATION_HEADER = "X-Profile-Authorization"
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILE_SUFFIX = ".prof"
+
+
+class _InlineExecutor(ThreadPoolExecutor):
+    """Executor which runs the submitted functions right away in the calling thread."""
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as exc:
+            future.set_exception(exc)
+        return future
+
+
+def _is_admin(authorization: str) -> bool:
+    """Check the basic auth credentials of the profile authorization header."""
+    scheme, _, encoded_credentials = authorization.partition(" ")
+    if scheme.lower() != "basic":
+        return False
+
+    try:
+        credentials = base64.b64decode(encoded_credentials).decode("ascii")
+    except (binascii.Error, UnicodeDecodeError):
+        return False
+
+    username, separator, password = credentials.partition(":")
+    return bool(separator) and admin_user_logged_in.is_valid(username, password)
+
+
+def _profile_path(profile_id: str) -> str:
+    return os.path.join(settings.PROFILE_DIRECTORY, f"{profile_id}{PROFILE_SUFFIX}")
+
+
+def _store_profile(profiler: cProfile.Profile, profile_id: str):
+    """Store a profile and remove the oldest ones exceeding `PROFILE_MAX_COUNT`."""
+    os.makedirs(settings.PROFILE_DIRECTORY, exist_ok=True)
+    profiler.dump_stats(_profile_path(profile_id))
+
+    profiles = [
+        entry
+        for entry in os.scandir(settings.PROFILE_DIRECTORY)
+        if entry.name.endswith(PROFILE_SUFFIX)
+    ]
+    profiles.sort(key=lambda entry: entry.stat().st_mtime_ns)
+    for entry in profiles[: -max(1, settings.PROFILE_MAX_COUNT)]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass  # pruned concurrently
+
+
+class ProfilingMiddleware:
+    """
+    Middleware which runs requests carrying admin credentials in the
+    `X-Profile-Authorization` header under cProfile.
+
+    The profile covers the whole request, i.e. the inner middlewares, resolving the
+    dependencies, the route and validating and serializing the response. To profile
+    nothing but the request, it runs on its own event loop in a separate thread, whose
+    default executor runs the synchronous parts inline instead of in the thread pool.
+    Other requests are passed through untouched.
+
+    The profile is stored in the profile directory and its id is returned in the
+    `X-Profile-Id` response header. The regular `Authorization` header is left
+    untouched, so any route can be profiled with the credentials of its usual user.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        authorization = None
+        if scope["type"] == "http":
+            authorization = Headers(scope=scope).get(PROFILE_AUTHORIZATION_HEADER)
+        if authorization is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not _is_admin(authorization):
+            response = JSONResponse(
+                {"detail": "Incorrect username or password"},
+                status_code=HTTP_401_UNAUTHORIZED,
+            )
+            await response(scope, receive, send)
+            return
+
+        loop = asyncio.get_event_loop()
+        profile_id = uuid.uuid4().hex
+        profiler = cProfile.Profile()
+        # held back until the profile is stored, so it can be fetched right away
+        last_messages: List[Message] = []
+
+        async def call_on_loop(coroutine):
+            future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+            return await asyncio.wrap_future(future)
+
+        async def profiled_receive() -> Message:
+            return await call_on_loop(receive())
+
+        async def profiled_send(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message.setdefault("headers", []))
+                headers[PROFILE_ID_HEADER] = profile_id
+            elif message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                last_messages.append(message)
+                return
+            await call_on_loop(send(message))
+
+        def run_profiled():
+            request_loop = asyncio.new_event_loop()
+            request_loop.set_default_executor(_InlineExecutor())
+            asyncio.set_event_loop(request_loop)
+            profiler.enable()
+            try:
+                request_loop.run_until_complete(
+                    self.app(scope, profiled_receive, profiled_send)
+                )
+            finally:
+                profiler.disable()
+                asyncio.set_event_loop(None)
+                request_loop.close()
+
+        await loop.run_in_executor(None, run_profiled)
+
+        await run_in_threadpool(_store_profile, profiler, profile_id)
+        for message in last_messages:
+            await send(message)
+
+
+def load_profile(profile_id: str, sort_by: str, limit: int) -> Optional[str]:
+    """Render a stored profile as text, or return None if it does not exist."""
+    try:
+        valid_id = uuid.UUID(hex=profile_id).hex == profile_id
+    except ValueError:
+        valid_id = False
+
+    path = _profile_path(profile_id)
+    if not valid_id or not os.path.isfile(path):
+        return None
+
+    stream = io.StringIO()
+    stats = pstats.Stats(path, stream=stream)
+    stats.sort_stats(sort_by).print_stats(limit)
+    return stream.getvalue()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+""" Local replica of Revolori's ID mapping """
+
+import datetime as dt
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+import overseer.models as dto
+from overseer.dao.revolori_mapping import Mappings, RevoloriMappingDao
+from overseer.db.connection import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class MappingReplica:
+    """
+    Keeps a copy of Revolori's ID mapping in the database, so that IDs are resolved
+    without calling Revolori in the steady state.
+
+    Revolori only offers its user list, so every sync fetches all mappings and writes
+    the difference to the replica. Mappings added in Revolori since the last sync
+    are missing from the replica and still resolved by Revolori. Mappings changed or
+    removed in Revolori are served until the next sync, so the replica isn't used at
+    all if its last sync is older than `max_age` seconds.
+    """
+
+    def __init__(
+        self, fetch_snapshot: Callable[[], Mappings], enabled: bool, max_age: float
+    ):
+        self._fetch_snapshot = fetch_snapshot
+        self.enabled = enabled
+        self.max_age = max_age
+        self.last_sync: Optional[dt.datetime] = None
+        self.hits = 0
+        self.misses = 0
+        self.stale_lookups = 0
+        self._sync_lock = threading.Lock()
+        self._stop_syncing = threading.Event()
+        self._syncer: Optional[threading.Thread] = None
+
+    def resolve(self, tool: str, tool_specific_ids: List[str]) -> Dict[str, str]:
+        """
+        Return the Revolori IDs of the tool specific IDs which are in the replica, or
+        none if the replica is stale.
+        """
+        if not self.is_fresh():
+            self.stale_lookups += 1
+            return {}
+
+        with SessionLocal() as session:
+            resolved_ids = RevoloriMappingDao.resolve(session, tool, tool_specific_ids)
+
+        self.hits += len(resolved_ids)
+        self.misses += len(set(tool_specific_ids)) - len(resolved_ids)
+        return resolved_ids
+
+    def is_fresh(self) -> bool:
+        """Whether the replica was synchronized within the last `max_age` seconds."""
+        last_sync = self.last_sync
+        return (
+            last_sync is not None
+            and (dt.datetime.now() - last_sync).total_seconds() <= self.max_age
+        )
+
+    def sync(self) -> dto.RevoloriMappingSyncResult:
+        """Fetch all mappings from Revolori and update the replica."""
+        with self._sync_lock:
+            snapshot = self._fetch_snapshot()
+            with SessionLocal() as session:
+                result = RevoloriMappingDao.sync(session, snapshot)
+
+            self.last_sync = dt.datetime.now()
+            logger.info(
+                "Synchronized %d Revolori mappings: %d added, %d updated, %d removed.",
+                result.total,
+                result.added,
+                result.updated,
+                result.removed,
+            )
+            return result
+
+    def _sync_periodically(self, interval: float):
+        while True:
+            try:
+                self.sync()
+            except Exception:
+                logger.exception("Synchronizing the Revolori mappings failed.")
+            if self._stop_syncing.wait(interval):
+                return
+
+    def start_syncing(self, interval: float):
+        """Start synchronizing the replica in a background thread."""
+        if self._syncer is not None:
+            return
+
+        self._stop_syncing.clear()
+        self._syncer = threading.Thread(
+            target=self._sync_periodically,
+            args=(interval,),
+            name="revolori-replica",
+            daemon=True,
+        )
+        self._syncer.start()
+
+    def stop_syncing(self):
+        """Stop synchronizing the replica."""
+        if self._syncer is None:
+            return
+
+        self._stop_syncing.set()
+        self._syncer.join()
+        self._syncer = None
+
+    def metrics(self) -> Dict[str, float]:
+        last_sync = self.last_sync
+        return {
+            "replica_hits": self.hits,
+            "replica_misses": self.misses,
+            "replica_stale_lookups": self.stale_lookups,
+            "replica_sync_age": (dt.datetime.now() - last_sync).total_seconds()
+            if last_sync is not None
+            else -1,
+        }
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+""" Fast serialization of responses """
+
+from typing import Any, Dict, List, Optional, Type, TypeVar, Union
+
+from pydantic import BaseModel
+from starlette.responses import JSONResponse, Response
+
+from overseer.settings import settings
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, see `Settings.FAST_SERIALIZATION`
+    orjson = None
+
+Model = TypeVar("Model", bound=BaseModel)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response serialized by orjson, which also handles dates and enums."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def build_model(model_class: Type[Model], **values: Any) -> Model:
+    """
+    Create a response model from trusted values, e.g. columns of the database.
+    With fast serialization, the values are not validated. Unknown values, like the
+    state of an SQLAlchemy object in its `__dict__`, are dropped.
+    """
+    if not settings.FAST_SERIALIZATION:
+        return model_class(**values)
+
+    fields = {name: values[name] for name in model_class.__fields__ if name in values}
+    return model_class.construct(**fields)
+
+
+def respond(
+    content: Union[BaseModel, List[BaseModel]],
+    headers: Optional[Dict[str, str]] = None,
+) -> Union[BaseModel, List[BaseModel], Response]:
+    """
+    Return the response model, or a list of them, of a route. With fast serialization,
+    the content is serialized right away instead of being validated and encoded again
+    by FastAPI. The headers are only used for the fast response, set them on the
+    `Response` parameter of the route as well.
+    """
+    if not settings.FAST_SERIALIZATION:
+        return content
+
+    if isinstance(content, list):
+        return FastJSONResponse(
+            [model.dict(by_alias=True) for model in content], headers=headers
+        )
+    return FastJSONResponse(content.dict(by_alias=True), headers=headers)
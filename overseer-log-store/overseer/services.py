@@ -1,12 +1,25 @@
 #!/usr/bin/env python3
 
-from typing import Dict, List, Set
-
-import requests
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Set, Tuple, TypeVar
 
+from overseer.dao.revolori_mapping import PRIMARY_ID_TOOL, Mappings
 from overseer.models import RevoloriId
+from overseer.replica import MappingReplica
 from overseer.settings import settings
 
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# seconds for receiving all users from Revolori
+SNAPSHOT_READ_TIMEOUT = 60
+
 
 class ServiceError(Exception):
     """
@@ -26,16 +39,352 @@ class IdMappingError(Exception):
         super(IdMappingError, self).__init__("One or more ids couldn't be mapped.")
 
 
+class RevoloriUnavailable(Exception):
+    """
+    Error which is raised whenever Revolori doesn't answer in time or isn't called
+    because it failed repeatedly.
+    """
+
+
+class BatchFailed(Exception):
+    """
+    Error which is raised when a batch of coalesced lookups couldn't be mapped, so
+    the lookups must be retried separately.
+    """
+
+
+class Batch:
+    """Lookups of a tool's IDs which are sent to Revolori in the same request."""
+
+    def __init__(self):
+        self.futures: Dict[str, Future] = {}
+        # lookups waiting for any of the futures
+        self.callers = 0
+
+
+class IdResolver:
+    """
+    Coalesces concurrent lookups of tool specific IDs.
+
+    Lookups of an ID which is already being resolved wait for the request in flight
+    instead of sending another one. The first lookup of a tool waits `window` seconds
+    for concurrent lookups of other IDs of the same tool and sends them all in one
+    request. Revolori rejects a request if any of its IDs isn't mapped, so the lookups
+    of a rejected batch with several callers are retried separately.
+    """
+
+    def __init__(
+        self, fetch: Callable[[str, List[str]], Dict[str, str]], window: float
+    ):
+        self._fetch = fetch
+        self._window = window
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Tuple[str, str], Tuple[Future, Batch]] = {}
+        self._pending: Dict[str, Batch] = {}
+        self.requests = 0
+        self.coalesced = 0
+        self.retried = 0
+
+    def resolve(self, tool: str, tool_specific_ids: List[str]) -> Dict[str, str]:
+        """Return the Revolori ID of each tool specific ID."""
+        futures: Dict[str, Future] = {}
+        with self._lock:
+            batch = self._pending.get(tool)
+            is_leader = batch is None
+            if is_leader:
+                batch = self._pending[tool] = Batch()
+
+            joined = set()
+            for tool_specific_id in set(tool_specific_ids):
+                in_flight = self._in_flight.get((tool, tool_specific_id))
+                if in_flight is None:
+                    future = Future()
+                    self._in_flight[(tool, tool_specific_id)] = (future, batch)
+                    batch.futures[tool_specific_id] = future
+                    joined.add(batch)
+                else:
+                    future, other_batch = in_flight
+                    joined.add(other_batch)
+                    self.coalesced += 1
+                futures[tool_specific_id] = future
+
+            for joined_batch in joined:
+                joined_batch.callers += 1
+
+        if is_leader:
+            if self._window > 0:
+                time.sleep(self._window)
+            with self._lock:
+                del self._pending[tool]
+            self._send(tool, batch)
+
+        try:
+            return {id: future.result() for id, future in futures.items()}
+        except BatchFailed:
+            with self._lock:
+                self.retried += 1
+                self.requests += 1
+            return self._fetch(tool, tool_specific_ids)
+
+    def _send(self, tool: str, batch: Batch):
+        if not batch.futures:
+            return
+
+        with self._lock:
+            self.requests += 1
+        try:
+            resolved_ids = self._fetch(tool, list(batch.futures))
+        except Exception as exc:
+            resolved_ids = None
+            error = exc
+        finally:
+            # no caller can join the batch anymore afterwards
+            with self._lock:
+                for tool_specific_id in batch.futures:
+                    del self._in_flight[(tool, tool_specific_id)]
+
+        if resolved_ids is None:
+            # nothing to retry if the lookups of a single caller were rejected
+            if isinstance(error, IdMappingError) and batch.callers > 1:
+                error = BatchFailed()
+            for future in batch.futures.values():
+                future.set_exception(error)
+            return
+
+        for tool_specific_id, future in batch.futures.items():
+            if tool_specific_id in resolved_ids:
+                future.set_result(resolved_ids[tool_specific_id])
+            else:
+                future.set_exception(IdMappingError())
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            "requests": self.requests,
+            "coalesced_lookups": self.coalesced,
+            "retried_lookups": self.retried,
+        }
+
+
+class ChunkedFetcher:
+    """
+    Splits lookups of many IDs, e.g. of the owners of large aggregates, into chunks of
+    `chunk_size` IDs which are requested from Revolori by up to `max_parallel` threads,
+    instead of sending one huge request which may time out. Revolori rejects a chunk if
+    any of its IDs isn't mapped, which fails the lookup without waiting for the rest.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str, List[str]], Dict[str, str]],
+        chunk_size: int,
+        max_parallel: int,
+    ):
+        self._fetch = fetch
+        self._chunk_size = chunk_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_parallel, thread_name_prefix="revolori-chunks"
+        )
+        self._lock = threading.Lock()
+        self.chunked_lookups = 0
+        self.chunks = 0
+
+    def fetch(self, tool: str, tool_specific_ids: List[str]) -> Dict[str, str]:
+        """Return the Revolori ID of each tool specific ID."""
+        size = self._chunk_size
+        if size <= 0 or len(tool_specific_ids) <= size:
+            return self._fetch(tool, tool_specific_ids)
+
+        chunks = [
+            tool_specific_ids[start : start + size]
+            for start in range(0, len(tool_specific_ids), size)
+        ]
+        with self._lock:
+            self.chunked_lookups += 1
+            self.chunks += len(chunks)
+
+        futures = [self._executor.submit(self._fetch, tool, chunk) for chunk in chunks]
+        done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in done:
+            if future.exception() is not None:
+                # chunks which didn't start yet aren't requested anymore
+                for pending in not_done:
+                    pending.cancel()
+                raise future.exception()
+
+        resolved_ids: Dict[str, str] = {}
+        for future in futures:
+            resolved_ids.update(future.result())
+        return resolved_ids
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            "chunked_lookups": self.chunked_lookups,
+            "chunk_requests": self.chunks,
+        }
+
+
+class CircuitBreaker:
+    """
+    Fails fast while Revolori is unhealthy instead of tying up threads waiting for it.
+
+    The circuit opens after `failure_threshold` consecutive calls failed with a timeout,
+    a connection error or a server error. While it is open, calls raise
+    `RevoloriUnavailable` right away. After `recovery_timeout` seconds, a single trial
+    call is let through, which closes the circuit if it succeeds.
+    """
+
+    FAILURES = (RevoloriUnavailable, ServiceError)
+
+    def __init__(self, failure_threshold: int, recovery_timeout: float):
+        self._failure_threshold = failure_threshold
+        self._recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def call(self, function: Callable[..., T], *args) -> T:
+        trial = False
+        with self._lock:
+            if self._opened_at is not None:
+                waiting = time.monotonic() - self._opened_at < self._recovery_timeout
+                if waiting or self._trial_in_flight:
+                    self.rejected += 1
+                    raise RevoloriUnavailable("Revolori is failing, not calling it.")
+                self._trial_in_flight = trial = True
+
+        try:
+            result = function(*args)
+        except self.FAILURES:
+            self._record(trial, failed=True)
+            raise
+        except Exception:
+            # e.g. unmapped IDs, Revolori itself is fine
+            self._record(trial, failed=False)
+            raise
+        self._record(trial, failed=False)
+        return result
+
+    def _record(self, trial: bool, failed: bool):
+        with self._lock:
+            if trial:
+                self._trial_in_flight = False
+            if not failed:
+                self._failures = 0
+                self._opened_at = None
+                return
+
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self._failure_threshold:
+                if self._opened_at is None:
+                    self.opened += 1
+                self._opened_at = time.monotonic()
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            "circuit_open": int(self.is_open),
+            "circuit_opened": self.opened,
+            "circuit_rejected": self.rejected,
+        }
+
+
+class MappingCache:
+    """
+    Bounded LRU cache of the Revolori IDs of tool specific IDs with the time they were
+    resolved, for serving known mappings while Revolori is slow or unavailable.
+    """
+
+    def __init__(self, max_size: int):
+        self._max_size = max_size
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stale_hits = 0
+
+    def get(
+        self, tool: str, tool_specific_ids: List[str], max_age: float
+    ) -> Optional[Tuple[Dict[str, str], float]]:
+        """
+        Return the Revolori IDs of all tool specific IDs and the age of the oldest
+        mapping, or None if any of them is unknown or older than `max_age` seconds.
+        """
+        now = time.monotonic()
+        resolved_ids: Dict[str, str] = {}
+        oldest = now
+        with self._lock:
+            for tool_specific_id in tool_specific_ids:
+                entry = self._entries.get((tool, tool_specific_id))
+                if entry is None or now - entry[1] > max_age:
+                    return None
+                self._entries.move_to_end((tool, tool_specific_id))
+                resolved_ids[tool_specific_id] = entry[0]
+                oldest = min(oldest, entry[1])
+        return resolved_ids, now - oldest
+
+    def put(self, tool: str, resolved_ids: Dict[str, str]):
+        if self._max_size <= 0:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            for tool_specific_id, revolori_id in resolved_ids.items():
+                self._entries[(tool, tool_specific_id)] = (revolori_id, now)
+                self._entries.move_to_end((tool, tool_specific_id))
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+
 class RevoloriService:
-    @staticmethod
-    def get_id_mapping(
-        tool: str, tool_specific_ids: List[str]
-    ) -> Dict[RevoloriId, Set[str]]:
+    _client = None
+    _client_lock = threading.Lock()
+
+    @classmethod
+    def client(cls):
         """
-        Return mapping of unique `RevoloriId`s to their corresponding tool specific ids.
+        HTTP client which keeps connections to Revolori open between requests, enough
+        for all chunks requested in parallel.
         """
+        with cls._client_lock:
+            if cls._client is None:
+                # imported on first use to keep it off the startup path, see `warm_up`
+                import requests
+                from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
+
+                pool_size = max(DEFAULT_POOLSIZE, settings.REVOLORI_PARALLEL_CHUNKS)
+                client = requests.Session()
+                client.mount("http://", HTTPAdapter(pool_maxsize=pool_size))
+                client.mount("https://", HTTPAdapter(pool_maxsize=pool_size))
+                cls._client = client
+            return cls._client
+
+    @classmethod
+    def warm_up(cls):
+        """Create the HTTP client ahead of the first request, e.g. after startup."""
+        cls.client()
+
+    @classmethod
+    def fetch_ids(cls, tool: str, tool_specific_ids: List[str]) -> Dict[str, str]:
+        """
+        Request the Revolori IDs of tool specific IDs from Revolori.
+        """
+        import requests  # see `client`
+
         payload = {tool: tool_specific_ids}
-        response = requests.get(settings.REVOLORI_ID_ENDPOINT, json=payload)
+        try:
+            response = cls.client().get(
+                settings.REVOLORI_ID_ENDPOINT,
+                json=payload,
+                timeout=settings.REVOLORI_TIMEOUT,
+            )
+        except requests.RequestException as exc:
+            raise RevoloriUnavailable(
+                f"Requesting {settings.REVOLORI_ID_ENDPOINT} failed: {exc}"
+            ) from exc
 
         if 400 <= response.status_code < 500:
             raise IdMappingError()
@@ -43,7 +392,16 @@ class RevoloriService:
             raise ServiceError(settings.REVOLORI_ID_ENDPOINT, response.status_code)
 
         # The response is a mapping `tool : { tool_specific_id : revolori_id }`
-        resolved_ids: Dict[str, str] = response.json()[tool]
+        return response.json()[tool]
+
+    @staticmethod
+    def get_id_mapping(
+        tool: str, tool_specific_ids: List[str]
+    ) -> Dict[RevoloriId, Set[str]]:
+        """
+        Return mapping of unique `RevoloriId`s to their corresponding tool specific ids.
+        """
+        resolved_ids = RevoloriService.resolve_ids(tool, tool_specific_ids)
 
         owner_rid_reverse_map: Dict[RevoloriId, Set[str]] = dict()
         for tool_specific_id, revolori_id_str in resolved_ids.items():
@@ -54,6 +412,99 @@ class RevoloriService:
 
         return owner_rid_reverse_map
 
+    @classmethod
+    def fetch_snapshot(cls) -> Mappings:
+        """
+        Request all users from Revolori and return the mappings of their IDs.
+        """
+        import requests  # see `client`
+
+        try:
+            response = cls.client().get(
+                settings.REVOLORI_USER_ENDPOINT,
+                auth=(settings.REVOLORI_USER, settings.REVOLORI_PASSWORD),
+                timeout=(settings.REVOLORI_TIMEOUT, SNAPSHOT_READ_TIMEOUT),
+            )
+        except requests.RequestException as exc:
+            raise RevoloriUnavailable(
+                f"Requesting {settings.REVOLORI_USER_ENDPOINT} failed: {exc}"
+            ) from exc
+
+        if response.status_code != 200:
+            raise ServiceError(settings.REVOLORI_USER_ENDPOINT, response.status_code)
+
+        # Revolori maps an ID to the first user whose primary ID or tool specific ID
+        # it is. Primary IDs are replicated once for all tools, so a tool specific
+        # mapping is only kept if no earlier user has the ID as primary ID. The
+        # replica can then check the tool specific mapping first.
+        snapshot: Mappings = {}
+        for user in response.json():
+            primary_id = user["email"]
+            snapshot.setdefault((PRIMARY_ID_TOOL, primary_id), primary_id)
+            for tool, ids in (user.get("secondaryIDs") or {}).items():
+                for tool_specific_id in ids:
+                    if (PRIMARY_ID_TOOL, tool_specific_id) not in snapshot:
+                        snapshot.setdefault((tool, tool_specific_id), primary_id)
+        return snapshot
+
+    @staticmethod
+    def resolve_ids(tool: str, tool_specific_ids: List[str]) -> Dict[str, str]:
+        """
+        Return the Revolori ID of each tool specific ID. If the local replica is
+        enabled, only the IDs which are missing from it are resolved remotely.
+        """
+        if not mapping_replica.enabled:
+            return RevoloriService.resolve_remote_ids(tool, tool_specific_ids)
+
+        resolved_ids = mapping_replica.resolve(tool, tool_specific_ids)
+        missing = [id for id in tool_specific_ids if id not in resolved_ids]
+        if missing:
+            resolved_ids.update(RevoloriService.resolve_remote_ids(tool, missing))
+        return resolved_ids
+
+    @staticmethod
+    def resolve_remote_ids(tool: str, tool_specific_ids: List[str]) -> Dict[str, str]:
+        """
+        Return the Revolori ID of each tool specific ID from Revolori. Known mappings
+        are served without waiting for Revolori if they are younger than
+        `REVOLORI_MAPPING_MAX_AGE` or, while they are refreshed in the background,
+        younger than `REVOLORI_STALE_MAPPING_AGE`. The latter are also served if
+        Revolori fails.
+        """
+        if settings.REVOLORI_MAPPING_MAX_AGE > 0:
+            known = mapping_cache.get(
+                tool, tool_specific_ids, settings.REVOLORI_STALE_MAPPING_AGE
+            )
+            if known is not None:
+                resolved_ids, age = known
+                if age > settings.REVOLORI_MAPPING_MAX_AGE:
+                    revalidate(tool, tool_specific_ids)
+                return resolved_ids
+
+        try:
+            resolved_ids = id_resolver.resolve(tool, tool_specific_ids)
+        except (RevoloriUnavailable, ServiceError):
+            known = mapping_cache.get(
+                tool, tool_specific_ids, settings.REVOLORI_STALE_MAPPING_AGE
+            )
+            if known is None:
+                raise
+            mapping_cache.stale_hits += 1
+            return known[0]
+
+        mapping_cache.put(tool, resolved_ids)
+        return resolved_ids
+
+    @staticmethod
+    def metrics() -> Dict[str, float]:
+        return {
+            **id_resolver.metrics(),
+            **chunked_fetcher.metrics(),
+            **revolori_breaker.metrics(),
+            "stale_mappings_served": mapping_cache.stale_hits,
+            **mapping_replica.metrics(),
+        }
+
     @staticmethod
     def map_ids(tool: str, tool_specific_ids: List[str]) -> Set[RevoloriId]:
         """
@@ -67,3 +518,47 @@ class RevoloriService:
         Map a tool specific ID to a Revolori ID.
         """
         return cls.map_ids(tool, [tool_specific_id]).pop()
+
+
+revolori_breaker = CircuitBreaker(
+    settings.REVOLORI_FAILURE_THRESHOLD, settings.REVOLORI_RECOVERY_TIMEOUT
+)
+chunked_fetcher = ChunkedFetcher(
+    functools.partial(revolori_breaker.call, RevoloriService.fetch_ids),
+    settings.REVOLORI_CHUNK_SIZE,
+    settings.REVOLORI_PARALLEL_CHUNKS,
+)
+id_resolver = IdResolver(chunked_fetcher.fetch, settings.REVOLORI_BATCH_WINDOW)
+mapping_cache = MappingCache(settings.REVOLORI_MAPPING_CACHE_SIZE)
+mapping_replica = MappingReplica(
+    RevoloriService.fetch_snapshot,
+    enabled=settings.REVOLORI_SYNC_INTERVAL > 0,
+    max_age=2 * settings.REVOLORI_SYNC_INTERVAL,
+)
+
+# refreshes stale mappings, one at a time to not add to the load on Revolori
+revalidation_executor = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="revolori-revalidation"
+)
+revalidating: Set[Tuple[str, str]] = set()
+revalidating_lock = threading.Lock()
+
+
+def revalidate(tool: str, tool_specific_ids: List[str]):
+    """Refresh mappings in the background unless they are already being refreshed."""
+    with revalidating_lock:
+        keys = {(tool, id) for id in tool_specific_ids} - revalidating
+        if not keys:
+            return
+        revalidating.update(keys)
+
+    def refresh():
+        try:
+            mapping_cache.put(tool, id_resolver.resolve(tool, [id for _, id in keys]))
+        except Exception as exc:
+            logger.info("Refreshing the mappings of %s failed: %s", tool, exc)
+        finally:
+            with revalidating_lock:
+                revalidating.difference_update(keys)
+
+    revalidation_executor.submit(refresh)
@@ -1,13 +1,27 @@
 #!/usr/bin/env python3
 
+import importlib.util
 import os
+import tempfile
 import urllib.parse
+from enum import Enum
+from typing import List, Optional
 
 from pydantic import BaseSettings, validator
 
 SQLITE_PREFIX = "sqlite:///"
 
 
+class SchemaCheck(str, Enum):
+    """
+    Enum representing how the database schema is prepared on startup.
+    """
+
+    CREATE = "create"
+    VERIFY = "verify"
+    SKIP = "skip"
+
+
 class Settings(BaseSettings):
     """ Class for reading settings from environment """
 
@@ -28,6 +42,19 @@ class Settings(BaseSettings):
     """
     Path to the public key of the JWT issuer, as well as,
     the algorithm which is used for signing the tokens.
+    The path may also be a directory of `<kid>.pub` files for rotating keys.
+    """
+
+    JWT_KEY_RELOAD_INTERVAL: float = 30
+    """
+    Seconds between checks whether the public keys of the JWT issuer changed.
+    """
+
+    JWT_CACHE_SIZE: int = 10000
+    JWT_CACHE_TTL: int = 300
+    """
+    Maximum number of verified tokens which are cached and the maximum number of
+    seconds a verified token is cached. Set the size to 0 to disable the cache.
     """
 
     REVOLORI_SERVICE_ROOT: str
@@ -40,6 +67,137 @@ class Settings(BaseSettings):
     SQLite connection string.
     """
 
+    SCHEMA_CHECK: SchemaCheck = SchemaCheck.CREATE
+    """
+    How the database schema is prepared on startup: `create` creates missing tables,
+    `verify` only checks that the database is migrated to the latest alembic revision
+    and `skip` does neither. Use `verify` when the migrations are run separately
+    before deploying, so workers come online without inspecting the schema.
+    """
+
+    POLICY_CACHE_SIZE: int = 100000
+    """
+    Maximum number of cached policy decisions. Set to 0 to disable the cache.
+    """
+
+    LIVE_FEED_QUEUE_SIZE: int = 100
+    LIVE_FEED_KEEP_ALIVE: float = 15
+    """
+    Maximum number of undelivered events per live feed connection and the seconds
+    between keep-alive comments on idle connections.
+    """
+
+    PROFILE_DIRECTORY: str = os.path.join(tempfile.gettempdir(), "overseer-profiles")
+    PROFILE_MAX_COUNT: int = 100
+    """
+    Directory where profiles of requests made with the `X-Profile-Authorization`
+    header are stored and the number of profiles which are kept. The oldest profiles
+    are removed first.
+    """
+
+    COMPRESSION_ENCODINGS: List[str] = ["br", "gzip"]
+    COMPRESSION_MINIMUM_SIZE: int = 1000
+    """
+    Content encodings for compressing responses in order of preference and the
+    minimum size in bytes of compressed responses. Brotli (`br`) is only used if the
+    `brotli` package is installed. Set the encodings to `[]` to disable compression.
+    """
+
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    """
+    Compression level of gzip (1-9) and quality of brotli (0-11).
+    Higher values compress better but slower.
+    """
+
+    FAST_SERIALIZATION: bool = False
+    """
+    Serialize responses with orjson and skip validating the response models which are
+    built from trusted values, e.g. on large `/data-accesses` pages. Requires the
+    `orjson` package.
+    """
+
+    ARCHIVE_DIRECTORY: Optional[str] = None
+    ARCHIVE_AFTER_DAYS: int = 365
+    """
+    Directory of the cold archive and the age in days after which data accesses are
+    moved there by the `/archive` endpoint. Archiving is disabled if no directory
+    is set.
+    """
+
+    HEALTH_CHECK_INTERVAL: float = 5
+    HEALTH_CHECK_TIMEOUT: float = 2
+    """
+    Seconds between the background checks of the database and Revolori which are
+    served by `/health/ready`, and the timeout of the request to Revolori.
+    """
+
+    CACHE_SYNC_INTERVAL: float = 1
+    CACHE_INVALIDATION_RETENTION: float = 3600
+    """
+    Seconds between the polls for changes of cached data made by other worker
+    processes, i.e. how long they may serve stale policy decisions and tools, and how
+    long the changes are kept in the database. Workers which don't poll for longer
+    clear all their caches.
+    """
+
+    IDEMPOTENCY_KEY_TTL: float = 86400
+    IDEMPOTENCY_MAX_KEYS: int = 100000
+    """
+    Seconds for which the responses of `/request-access/*` requests with an
+    `Idempotency-Key` header are replayed to retries, and the maximum number of stored
+    responses. The oldest responses are dropped first.
+    """
+
+    REVOLORI_BATCH_WINDOW: float = 0.002
+    """
+    Seconds an ID lookup waits for concurrent lookups of the same tool, so that they
+    are sent to Revolori in one request. Set to 0 to only share identical lookups
+    which are in flight.
+    """
+
+    REVOLORI_CHUNK_SIZE: int = 1000
+    REVOLORI_PARALLEL_CHUNKS: int = 4
+    """
+    Lookups of more IDs, e.g. of the owners of large aggregates, are split into
+    requests of at most this many IDs, of which up to `REVOLORI_PARALLEL_CHUNKS` are
+    sent to Revolori at the same time. Set the chunk size to 0 to never split lookups.
+    """
+
+    REVOLORI_TIMEOUT: float = 2
+    """
+    Seconds for connecting to Revolori and for waiting for its responses.
+    """
+
+    REVOLORI_FAILURE_THRESHOLD: int = 5
+    REVOLORI_RECOVERY_TIMEOUT: float = 10
+    """
+    Number of consecutive failed Revolori requests after which requests fail fast
+    without calling Revolori, and the seconds until Revolori is tried again.
+    """
+
+    REVOLORI_MAPPING_MAX_AGE: float = 0
+    REVOLORI_STALE_MAPPING_AGE: float = 3600
+    REVOLORI_MAPPING_CACHE_SIZE: int = 100000
+    """
+    Resolved IDs are kept in memory. Those younger than the stale age are served if
+    Revolori fails. With a max age above 0, they are served without calling Revolori
+    and, once older than the max age, refreshed in the background while being served
+    (stale-while-revalidate). The cache size is the maximum number of kept IDs.
+    """
+
+    REVOLORI_USER: Optional[str] = None
+    REVOLORI_PASSWORD: Optional[str] = None
+    REVOLORI_SYNC_INTERVAL: float = 0
+    """
+    Credentials of Revolori's user management API (`AUTH_NAME` and `AUTH_PASSWORD`) and
+    the seconds between synchronizations of the local replica of its ID mapping. IDs
+    are resolved with the replica and only missing IDs are requested from Revolori.
+    Changes in Revolori reach the replica with the next sync, and a replica which
+    wasn't synchronized for twice the interval isn't used until it is again. Set the
+    interval to 0 to disable the replica.
+    """
+
     @validator("DATABASE_URI")
     def validate_sqlite_uri(cls, uri: str) -> str:
         if uri[: len(SQLITE_PREFIX)] != SQLITE_PREFIX:
@@ -53,9 +211,33 @@ class Settings(BaseSettings):
 
         return uri
 
+    @validator("FAST_SERIALIZATION")
+    def validate_fast_serialization(cls, fast_serialization: bool) -> bool:
+        if fast_serialization and importlib.util.find_spec("orjson") is None:
+            raise ValueError("Fast serialization requires the orjson package.")
+
+        return fast_serialization
+
     @property
     def REVOLORI_ID_ENDPOINT(self):
         return urllib.parse.urljoin(self.REVOLORI_SERVICE_ROOT, "/id")
 
+    @validator("REVOLORI_SYNC_INTERVAL")
+    def validate_revolori_sync(cls, interval: float, values: dict) -> float:
+        if interval > 0 and not (
+            values.get("REVOLORI_USER") and values.get("REVOLORI_PASSWORD")
+        ):
+            raise ValueError("Synchronizing with Revolori requires its credentials.")
+
+        return interval
+
+    @property
+    def REVOLORI_USER_ENDPOINT(self):
+        return urllib.parse.urljoin(self.REVOLORI_SERVICE_ROOT, "/user")
+
+    @property
+    def REVOLORI_HEALTH_ENDPOINT(self):
+        return urllib.parse.urljoin(self.REVOLORI_SERVICE_ROOT, "/health")
+
 
 settings = Settings()
@@ -0,0 +1,19 @@
+""" Stand-in for the Revolori service which is shared by the unit tests. """
+
+from typing import Dict, List, Set
+
+
+class CountingRevoloriService:
+    """Maps every id to itself and counts the lookups"""
+
+    calls = 0
+
+    def get_id_mapping(self, tool: str, ids: List[str]) -> Dict[str, Set[str]]:
+        CountingRevoloriService.calls += 1
+        return {id: {id} for id in ids}
+
+    def map_ids(self, tool: str, ids: List[str]) -> Set[str]:
+        return set(self.get_id_mapping(tool, ids))
+
+    def map_id(self, tool: str, id: str) -> str:
+        return self.map_ids(tool, [id]).pop()
@@ -0,0 +1,101 @@
+""" Unit tests for the admission control of access requests per tool. """
+
+from fastapi.testclient import TestClient
+
+from overseer.admission import AdmissionControl
+from overseer.auth import admin_user_logged_in, technical_user_logged_in
+from overseer.db.connection import SessionLocal, init_db
+from overseer.db.models import Tool
+from overseer.main import overseer
+from overseer.models import ToolLimits
+from overseer.services import RevoloriService
+
+from revolori_stub import CountingRevoloriService
+
+overseer_client = TestClient(overseer)
+
+TOOL = "admission"
+
+
+def setup_module():
+    init_db()
+    overseer.dependency_overrides[admin_user_logged_in] = lambda: None
+    overseer.dependency_overrides[technical_user_logged_in] = lambda: None
+    overseer.dependency_overrides[RevoloriService] = CountingRevoloriService
+
+    with SessionLocal() as session:
+        if session.query(Tool).get(TOOL) is None:
+            session.add(Tool(name=TOOL))
+
+
+def teardown_module():
+    overseer.dependency_overrides.pop(admin_user_logged_in)
+    overseer.dependency_overrides.pop(technical_user_logged_in)
+    overseer.dependency_overrides.pop(RevoloriService)
+
+
+def request_access():
+    body = {
+        "data_types": ["issue"],
+        "justification": "admission",
+        "tool": TOOL,
+        "user": "admission-user@example.com",
+        "owners": ["admission-owner@example.com"],
+    }
+    return overseer_client.post("/request-access/query", json=body)
+
+
+def test_rate_limited_requests_are_shed():
+    """test requests above the rate limit are rejected without any work"""
+    limits = {"rate_limit": 0.01, "rate_limit_burst": 2}
+    response = overseer_client.put(f"/tool-types/{TOOL}", json=limits)
+    assert response.status_code == 200
+    assert response.json()["rate_limit"] == 0.01
+
+    assert request_access().status_code == 200
+    assert request_access().status_code == 200
+
+    calls = CountingRevoloriService.calls
+    response = request_access()
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+    assert CountingRevoloriService.calls == calls
+
+    response = overseer_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.json()["admission"][f"{TOOL}.shed_rate"] == 1
+
+    # removing the limits applies to the next request
+    response = overseer_client.put(f"/tool-types/{TOOL}", json={})
+    assert response.status_code == 200
+    assert request_access().status_code == 200
+
+
+def test_malformed_requests_are_left_to_validation():
+    """test the admission control doesn't fail on bodies the route rejects"""
+    for tool in [["a"], {"a": 1}, None]:
+        response = overseer_client.post("/request-access/query", json={"tool": tool})
+        assert response.status_code == 422
+
+    for body in [[TOOL], "tool"]:
+        response = overseer_client.post("/request-access/query", json=body)
+        assert response.status_code == 422
+
+    response = overseer_client.post("/request-access/query")
+    assert response.status_code == 422
+
+
+def test_concurrency_limit():
+    """test requests are shed while the tool has too many requests in flight"""
+    admission = AdmissionControl()
+    limits = ToolLimits(max_concurrent_requests=2)
+
+    assert admission.admit(TOOL, limits) == (True, 0)
+    assert admission.admit(TOOL, limits) == (True, 0)
+    assert admission.admit(TOOL, limits) == (False, 1)
+    assert admission.admit("other", limits) == (True, 0)
+
+    admission.release(TOOL)
+    assert admission.admit(TOOL, limits) == (True, 0)
+    assert admission.metrics()[f"{TOOL}.shed_concurrency"] == 1
+    assert admission.metrics()[f"{TOOL}.in_flight"] == 2
@@ -0,0 +1,217 @@
+""" Unit tests for the cold archive of old data accesses. """
+
+import datetime as dt
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+from overseer.archive import AccessArchive, access_archive
+from overseer.auth import get_current_user
+from overseer.dao.data_access import DataAccessDao
+from overseer.db.connection import SessionLocal, init_db
+from overseer.db.models import DataAccess, DataOwner, DataType, Tool
+from overseer.main import overseer
+from overseer.models import DataAccessKind
+from overseer.settings import settings
+
+overseer_client = TestClient(overseer)
+
+OWNER = "archive-owner@example.com"
+
+archive_directory = tempfile.TemporaryDirectory()
+
+
+def add_access(session, timestamp, tool, data_types=(), justification=None):
+    data_access = DataAccess(
+        user_rid="user@example.com",
+        tool=tool,
+        access_kind=DataAccessKind.DIRECT,
+        timestamp=timestamp,
+        justification=justification,
+    )
+    data_access.data_owners = [DataOwner(owner_rid=OWNER)]
+    data_access.data_types = [DataType(type=data_type) for data_type in data_types]
+    DataAccessDao.add(session, data_access)
+
+
+def setup_module():
+    init_db()
+    overseer.dependency_overrides[get_current_user] = lambda: OWNER
+    access_archive.directory = archive_directory.name
+
+    with SessionLocal() as session:
+        for tool in ["jira", "git"]:
+            if session.query(Tool).get(tool) is None:
+                session.add(Tool(name=tool))
+
+    with SessionLocal() as session:
+        # fmt: off
+        add_access(session, dt.datetime(2000, 1, 5, 8), "jira", ["issue"], "Quarterly review of team X")
+        add_access(session, dt.datetime(2000, 1, 20, 9), "git", ["commit"])
+        add_access(session, dt.datetime(2000, 2, 10, 10), "jira", ["issue", "comment"])
+        add_access(session, dt.datetime(2001, 3, 1, 11), "git", [], "Release audit")
+        # fmt: on
+
+    response = overseer_client.post(
+        "/archive",
+        params={"before": "2001-01-01"},
+        auth=(settings.ADMIN_USER, settings.ADMIN_USER_PASSWORD),
+    )
+    assert response.status_code == 200
+    assert response.json()["watermark"] == "2001-01-01T00:00:00"
+
+
+def teardown_module():
+    overseer.dependency_overrides.pop(get_current_user)
+    access_archive.directory = None
+    archive_directory.cleanup()
+
+
+def test_archived_accesses_are_removed_from_database():
+    """test archived accesses, their owners, types and search entries are deleted"""
+    with SessionLocal() as session:
+        owned = session.query(DataOwner).filter(DataOwner.owner_rid == OWNER).all()
+        assert len(owned) == 1
+        assert (
+            session.query(DataAccess)
+            .filter(DataAccess.timestamp < dt.datetime(2001, 1, 1))
+            .count()
+            == 0
+        )
+
+    response = overseer_client.get("/data-accesses", params={"search": "quarterly"})
+    assert response.json()["total"] == 1
+
+
+def test_load_archived_accesses():
+    """test archived accesses continue the listing of the database"""
+    response = overseer_client.get("/data-accesses")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 4
+    assert body["overview"]["tool"] == {"jira": 2, "git": 2}
+    assert [access["timestamp"] for access in body["accesses"]] == [
+        "2001-03-01T11:00:00",
+        "2000-02-10T10:00:00",
+        "2000-01-20T09:00:00",
+        "2000-01-05T08:00:00",
+    ]
+    assert sorted(body["accesses"][1]["data_types"]) == ["comment", "issue"]
+
+    page = overseer_client.get("/data-accesses", params={"limit": 2, "offset": 1})
+    assert [access["timestamp"] for access in page.json()["accesses"]] == [
+        "2000-02-10T10:00:00",
+        "2000-01-20T09:00:00",
+    ]
+
+    page = overseer_client.get("/data-accesses", params={"limit": 2, "offset": 3})
+    assert [access["timestamp"] for access in page.json()["accesses"]] == [
+        "2000-01-05T08:00:00",
+    ]
+
+
+def test_filter_archived_accesses():
+    """test date range and attribute filters apply to archived accesses"""
+    response = overseer_client.get(
+        "/data-accesses",
+        params={"date_start": "2000-01-10", "date_end": "2000-01-31"},
+    )
+    assert response.json()["total"] == 1
+
+    response = overseer_client.get("/data-accesses", params={"tool": "jira"})
+    assert response.json()["total"] == 2
+
+    response = overseer_client.get(
+        "/data-accesses", params={"date_start": "2001-01-01"}
+    )
+    assert response.json()["total"] == 1
+
+
+def test_histogram_of_archived_accesses():
+    """test archived accesses are counted in the histogram"""
+    response = overseer_client.get("/data-accesses/histogram?interval=month")
+    buckets = response.json()["buckets"]
+    assert [(bucket["start"], bucket["total"]) for bucket in buckets] == [
+        ("2000-01-01", 2),
+        ("2000-02-01", 1),
+        ("2001-03-01", 1),
+    ]
+
+
+def test_histogram_reads_summaries(monkeypatch):
+    """test archived accesses are counted without decompressing them"""
+
+    def decompress(*args):
+        raise AssertionError("decompressed the segment")
+
+    monkeypatch.setattr(AccessArchive, "_decompress", staticmethod(decompress))
+    response = overseer_client.get("/data-accesses/histogram?interval=month")
+    assert [bucket["total"] for bucket in response.json()["buckets"]] == [2, 1, 1]
+
+
+def test_pending_segments_are_recovered():
+    """test segments are only visible once their accesses left the database"""
+    with SessionLocal() as session:
+        live_id = session.query(DataAccess.id).filter(DataAccess.tool == "git").scalar()
+    access = dict(
+        id=live_id,
+        access_kind=DataAccessKind.DIRECT.value,
+        data_types=[],
+        justification=None,
+        timestamp=dt.datetime(1999, 12, 24),
+        tool="git",
+        user_rid="user@example.com",
+    )
+
+    # the access is still in the database, the archiving run was interrupted
+    access_archive.write(dt.date(1999, 12, 1), {OWNER: [access]})
+    assert overseer_client.get("/data-accesses").json()["total"] == 4
+    with SessionLocal() as session:
+        DataAccessDao.archive(session, dt.datetime(2001, 1, 1))
+    assert not list(access_archive.pending())
+    assert overseer_client.get("/data-accesses").json()["total"] == 4
+
+    # the access was deleted from the database, but the segment wasn't published
+    access["id"] = live_id + 1000
+    access_archive.write(dt.date(1999, 12, 1), {OWNER: [access]})
+    with SessionLocal() as session:
+        DataAccessDao.archive(session, dt.datetime(2001, 1, 1))
+    assert overseer_client.get("/data-accesses").json()["total"] == 5
+
+
+def test_concurrent_runs_wait_for_each_other(monkeypatch):
+    """test a run doesn't recover the segment another run is still writing"""
+    with SessionLocal() as session:
+        add_access(session, dt.datetime(2000, 6, 1, 8), "jira")
+        add_access(session, dt.datetime(2000, 6, 2, 8), "git")
+
+    written = threading.Event()
+    write = access_archive.write
+
+    def write_and_wait(*args):
+        segment = write(*args)
+        written.set()
+        # the other run would discard the pending segment right now
+        time.sleep(0.2)
+        return segment
+
+    monkeypatch.setattr(access_archive, "write", write_and_wait)
+
+    def archive():
+        with SessionLocal() as session:
+            return DataAccessDao.archive(session, dt.datetime(2001, 1, 1))
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(archive)
+        assert written.wait(5)
+        second = executor.submit(archive)
+        assert (first.result(), second.result()) == (2, 0)
+
+    assert not list(access_archive.pending())
+    response = overseer_client.get(
+        "/data-accesses", params={"date_start": "2000-06-01", "date_end": "2000-06-30"}
+    )
+    assert response.json()["total"] == 2
@@ -0,0 +1,83 @@
+""" Unit tests for verifying JWT tokens. """
+
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from fastapi import HTTPException
+
+from overseer.auth import IssuerKeySet, JWTBearer, VerifiedTokenCache
+
+
+def test_token_cache_hit():
+    """test cached claims are returned for the same token only"""
+    cache = VerifiedTokenCache(max_size=10, max_ttl=60)
+    claims = {"sub": "user@example.com", "exp": time.time() + 60}
+    cache.put("token", claims)
+    assert cache.get("token") == claims
+    assert cache.get("other-token") is None
+
+
+def test_token_cache_honors_exp():
+    """test expired tokens are not served from the cache"""
+    cache = VerifiedTokenCache(max_size=10, max_ttl=60)
+    cache.put("token", {"sub": "user@example.com", "exp": time.time() - 1})
+    assert cache.get("token") is None
+
+
+def test_token_cache_is_bounded():
+    """test the least recently used token is evicted"""
+    cache = VerifiedTokenCache(max_size=2, max_ttl=60)
+    for token in ["a", "b"]:
+        cache.put(token, {"sub": token, "exp": time.time() + 60})
+    cache.get("a")
+    cache.put("c", {"sub": "c", "exp": time.time() + 60})
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def create_key(directory, kid: str) -> bytes:
+    """Save the public key of a new key pair to the directory, return its private key"""
+    private_key = ec.generate_private_key(ec.SECP384R1(), default_backend())
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    (directory / f"{kid}.pub").write_bytes(public_pem)
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+
+
+def create_token(private_key: bytes, headers: dict = None) -> str:
+    content = {"sub": "user@example.com", "exp": time.time() + 60}
+    return jwt.encode(content, private_key, "ES384", headers=headers).decode()
+
+
+def test_key_rotation(tmp_path):
+    """test tokens are verified with the key set while keys are rotated"""
+    old_key = create_key(tmp_path, "old")
+    token_cache = VerifiedTokenCache(max_size=10, max_ttl=60)
+    issuer_keys = IssuerKeySet("ES384", str(tmp_path), on_change=token_cache.clear)
+    bearer = JWTBearer("ES384", issuer_keys, token_cache)
+
+    old_token = create_token(old_key)
+    assert bearer._parse_token(old_token)["sub"] == "user@example.com"
+
+    new_key = create_key(tmp_path, "new")
+    assert issuer_keys.reload()
+    assert bearer._parse_token(create_token(new_key))["sub"] == "user@example.com"
+    assert bearer._parse_token(create_token(new_key, {"kid": "new"}))
+
+    with pytest.raises(HTTPException):
+        bearer._parse_token(create_token(new_key, {"kid": "old"}))
+
+    (tmp_path / "old.pub").unlink()
+    assert issuer_keys.reload()
+    with pytest.raises(HTTPException):
+        bearer._parse_token(old_token)
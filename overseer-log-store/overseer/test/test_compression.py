@@ -0,0 +1,58 @@
+""" Unit tests for compressing responses. """
+
+import gzip
+
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.testclient import TestClient
+
+from overseer.compression import CompressionMiddleware, accepted_encodings
+
+app = Starlette()
+app.add_middleware(CompressionMiddleware, encodings=["gzip"], minimum_size=100)
+
+
+@app.route("/text/{size:int}")
+def text(request):
+    return PlainTextResponse("x" * request.path_params["size"])
+
+
+@app.route("/stream")
+def stream(request):
+    return StreamingResponse(iter([b"x" * 1000, b"y" * 1000]))
+
+
+client = TestClient(app)
+
+
+def get(path: str, accept_encoding: str):
+    # read the raw body to see whether it is compressed
+    return client.get(path, headers={"Accept-Encoding": accept_encoding}, stream=True)
+
+
+def test_compress_large_responses():
+    """test responses above the minimum size are compressed"""
+    response = get("/text/1000", "gzip, deflate")
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(response.raw.read(decode_content=False)) == b"x" * 1000
+
+
+def test_skip_small_and_unaccepted_responses():
+    """test small responses and clients without gzip support are not compressed"""
+    assert "Content-Encoding" not in get("/text/50", "gzip").headers
+    assert "Content-Encoding" not in get("/text/1000", "br").headers
+    assert "Content-Encoding" not in get("/text/1000", "gzip;q=0").headers
+
+
+def test_skip_streaming_responses():
+    """test streamed responses are passed through"""
+    response = get("/stream", "gzip")
+    assert "Content-Encoding" not in response.headers
+    assert response.raw.read(decode_content=False) == b"x" * 1000 + b"y" * 1000
+
+
+def test_accepted_encodings():
+    """test parsing the accepted encodings"""
+    assert accepted_encodings("br;q=1.0, GZIP;q=0.5, identity;q=0") == ["br", "gzip"]
+    assert accepted_encodings("") == [""]
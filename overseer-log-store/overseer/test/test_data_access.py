@@ -0,0 +1,185 @@
+""" Unit tests for querying the data accesses of a data owner. """
+
+import datetime as dt
+
+import pytest
+from fastapi.testclient import TestClient
+
+from overseer.auth import get_current_user
+from overseer.dao.data_access import DataAccessDao
+from overseer.db.connection import SessionLocal, engine, init_db
+from overseer.db.models import DataAccess, DataOwner, DataType, Tool
+from overseer.main import overseer
+from overseer.models import DataAccessKind
+from overseer.settings import settings
+
+overseer_client = TestClient(overseer)
+
+OWNER = "histogram-owner@example.com"
+
+
+def add_access(
+    session, timestamp, tool, user_rid, access_kind, data_types=(), justification=None
+):
+    data_access = DataAccess(
+        user_rid=user_rid,
+        tool=tool,
+        access_kind=access_kind,
+        timestamp=timestamp,
+        justification=justification,
+    )
+    data_access.data_owners = [DataOwner(owner_rid=OWNER)]
+    data_access.data_types = [DataType(type=data_type) for data_type in data_types]
+    DataAccessDao.add(session, data_access)
+
+
+def setup_module():
+    init_db()
+    overseer.dependency_overrides[get_current_user] = lambda: OWNER
+
+    with SessionLocal() as session:
+        for tool in ["jira", "git"]:
+            if session.query(Tool).get(tool) is None:
+                session.add(Tool(name=tool))
+        session.query(DataOwner).filter(DataOwner.owner_rid == OWNER).delete()
+
+    with SessionLocal() as session:
+        # Wednesday, Sunday and Monday of two consecutive ISO weeks
+        # fmt: off
+        add_access(session, dt.datetime(2020, 7, 1, 8), "jira", "a@example.com", DataAccessKind.DIRECT, ["issue"], "Reviewing the projects of team X")
+        add_access(session, dt.datetime(2020, 7, 5, 9), "git", "b@example.com", DataAccessKind.QUERY, ["commit"], "Release audit for project Y")
+        add_access(session, dt.datetime(2020, 7, 6, 10), "jira", "a@example.com", DataAccessKind.QUERY, ["issue", "comment"])
+        add_access(session, dt.datetime(2020, 8, 3, 11), "jira", "b@example.com", DataAccessKind.AGGREGATE)
+        # fmt: on
+
+
+def teardown_module():
+    overseer.dependency_overrides.pop(get_current_user)
+
+
+def test_histogram_per_week():
+    """test accesses are counted per week starting on Monday"""
+    response = overseer_client.get("/data-accesses/histogram?interval=week")
+    assert response.status_code == 200
+    buckets = response.json()["buckets"]
+    assert [(bucket["start"], bucket["total"]) for bucket in buckets] == [
+        ("2020-06-29", 2),
+        ("2020-07-06", 1),
+        ("2020-08-03", 1),
+    ]
+    assert buckets[0]["groups"] is None
+
+
+def test_histogram_grouped_per_month():
+    """test grouped monthly buckets within a date range"""
+    response = overseer_client.get(
+        "/data-accesses/histogram",
+        params={"interval": "month", "group_by": "tool", "date_end": "2020-07-31"},
+    )
+    assert response.status_code == 200
+    assert response.json()["buckets"] == [
+        {"start": "2020-07-01", "total": 3, "groups": {"jira": 2, "git": 1}}
+    ]
+
+
+def test_filter_accesses():
+    """test multi-valued filters are applied to the accesses and the overview"""
+    response = overseer_client.get(
+        "/data-accesses",
+        params=[("tool", "jira"), ("access_kind", "Query"), ("access_kind", "Direkt")],
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 2
+    assert body["overview"]["user_rid"] == {"a@example.com": 2}
+    assert [access["timestamp"] for access in body["accesses"]] == [
+        "2020-07-06T10:00:00",
+        "2020-07-01T08:00:00",
+    ]
+
+
+def test_filter_accesses_by_data_type():
+    """test filtering by data type and date range"""
+    response = overseer_client.get(
+        "/data-accesses",
+        params={"data_type": "issue", "date_start": "2020-07-06"},
+    )
+    assert response.status_code == 200
+    assert response.json()["total"] == 1
+    assert sorted(response.json()["accesses"][0]["data_types"]) == ["comment", "issue"]
+
+
+def test_search_justifications():
+    """test full-text search combined with the date range"""
+    response = overseer_client.get("/data-accesses", params={"search": "project"})
+    assert response.json()["total"] == 2
+
+    response = overseer_client.get(
+        "/data-accesses", params={"search": "project", "date_start": "2020-07-02"}
+    )
+    assert [access["justification"] for access in response.json()["accesses"]] == [
+        "Release audit for project Y"
+    ]
+
+
+def test_search_index_is_created_for_existing_databases():
+    """test a database created without the search index gets it on startup"""
+    with engine.begin() as connection:
+        connection.execute("DROP TABLE data_accesses_fts")
+    init_db()
+
+    response = overseer_client.get("/data-accesses", params={"search": "project"})
+    assert response.json()["total"] == 2
+
+
+def test_search_operators_are_literal():
+    """test FTS5 syntax in the search text doesn't cause errors"""
+    response = overseer_client.get(
+        "/data-accesses", params={"search": 'team "X" OR NEAR(*'}
+    )
+    assert response.status_code == 200
+    assert response.json()["total"] == 0
+
+
+def test_conditional_get():
+    """test unchanged accesses are answered with 304 Not Modified"""
+    response = overseer_client.get("/data-accesses")
+    etag = response.headers["ETag"]
+
+    response = overseer_client.get("/data-accesses", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    # other parameters select other accesses
+    response = overseer_client.get(
+        "/data-accesses?tool=git", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+
+    with SessionLocal() as session:
+        add_access(
+            session,
+            dt.datetime(2020, 9, 1),
+            "git",
+            "c@example.com",
+            DataAccessKind.DIRECT,
+        )
+    response = overseer_client.get("/data-accesses", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["total"] == 5
+
+    with SessionLocal() as session:
+        session.query(DataOwner).filter(
+            DataOwner.data_access_id == DataAccessDao(OWNER).change_watermark(session)
+        ).delete()
+
+
+def test_fast_serialization(monkeypatch):
+    """test fast serialization returns the same documents"""
+    pytest.importorskip("orjson")
+    paths = ["/data-accesses", "/data-accesses/histogram?interval=week&group_by=tool"]
+    standard = [overseer_client.get(path).json() for path in paths]
+
+    monkeypatch.setattr(settings, "FAST_SERIALIZATION", True)
+    assert [overseer_client.get(path).json() for path in paths] == standard
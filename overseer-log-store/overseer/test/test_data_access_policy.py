@@ -0,0 +1,223 @@
+""" Unit tests for evaluating data access policies. """
+
+import datetime as dt
+
+from fastapi.testclient import TestClient
+
+from overseer.auth import get_current_user
+from overseer.cache import policy_decision_cache
+from overseer.dao.data_access_policy import DataAccessPolicyDao
+from overseer.db.connection import SessionLocal, init_db
+from overseer.db.models import DataAccess, DataAccessPolicy, DataOwner, Tool
+from overseer.main import overseer
+from overseer.models import DataAccessKind
+
+overseer_client = TestClient(overseer)
+
+OWNER = "policy-owner@example.com"
+OTHER_OWNER = "policy-other@example.com"
+
+
+def setup_module():
+    init_db()
+    overseer.dependency_overrides[get_current_user] = lambda: OWNER
+
+    with SessionLocal() as session:
+        for tool in ["jira", "git"]:
+            if session.query(Tool).get(tool) is None:
+                session.add(Tool(name=tool))
+        session.query(DataAccessPolicy).filter(
+            DataAccessPolicy.owner_rid.in_([OWNER, OTHER_OWNER])
+        ).delete(synchronize_session=False)
+
+
+def teardown_module():
+    overseer.dependency_overrides.pop(get_current_user)
+
+
+def who_granted(tool: str):
+    data_access = DataAccess(
+        user_rid="user@example.com",
+        tool=tool,
+        access_kind=DataAccessKind.DIRECT,
+        timestamp=dt.datetime(2020, 8, 1, 12),
+    )
+    data_access.data_owners = [
+        DataOwner(owner_rid=OWNER),
+        DataOwner(owner_rid=OTHER_OWNER),
+    ]
+    with SessionLocal() as session:
+        return DataAccessPolicyDao.who_granted(session, data_access)
+
+
+def test_decisions_are_cached_and_invalidated():
+    """test repeated decisions hit the cache until the owner changes a policy"""
+    response = overseer_client.post("/data-access-policies", json={"tool": "jira"})
+    assert response.status_code == 200
+    policy_id = response.json()["id"]
+
+    assert who_granted("jira") == ({OWNER}, {OTHER_OWNER})
+    hits = policy_decision_cache.hits
+    assert who_granted("jira") == ({OWNER}, {OTHER_OWNER})
+    assert policy_decision_cache.hits == hits + 2
+
+    response = overseer_client.put(
+        f"/data-access-policies/{policy_id}", json={"tool": "git"}
+    )
+    assert response.status_code == 200
+    assert who_granted("jira") == (set(), {OWNER, OTHER_OWNER})
+    assert who_granted("git") == ({OWNER}, {OTHER_OWNER})
+
+    response = overseer_client.delete(f"/data-access-policies/{policy_id}")
+    assert response.status_code == 204
+    assert who_granted("git") == (set(), {OWNER, OTHER_OWNER})
+
+
+def test_compaction():
+    """test redundant policies are previewed and removed"""
+    policies = [
+        {"tool": "jira", "user_rid": "user@example.com"},
+        {"tool": None, "user_rid": "user@example.com"},
+        {"tool": "jira", "user_rid": "user@example.com"},
+        {"tool": "git", "validity_period_start_date": "2020-01-01"},
+        {
+            "validity_period_start_date": "2020-02-01",
+            "validity_period_end_date": "2020-01-01",
+        },
+    ]
+    ids = [
+        overseer_client.post("/data-access-policies", json=policy).json()["id"]
+        for policy in policies
+    ]
+
+    response = overseer_client.get("/data-access-policies/compaction")
+    assert response.status_code == 200
+    preview = response.json()
+    assert preview["remaining"] == 2
+    assert [
+        (redundant["policy"]["id"], redundant["covered_by"])
+        for redundant in preview["redundant"]
+    ] == [(ids[0], ids[1]), (ids[2], ids[1]), (ids[4], None)]
+
+    granted_before = who_granted("jira")
+    response = overseer_client.post("/data-access-policies/compaction")
+    assert response.json() == preview
+    assert who_granted("jira") == granted_before
+
+    remaining = overseer_client.get("/data-access-policies").json()
+    assert sorted(policy["id"] for policy in remaining) == [ids[1], ids[3]]
+
+    for policy in remaining:
+        overseer_client.delete(f"/data-access-policies/{policy['id']}")
+
+
+def test_start_date_is_respected():
+    """test policies don't match accesses before their validity period"""
+    response = overseer_client.post(
+        "/data-access-policies",
+        json={"tool": "jira", "validity_period_start_date": "2021-01-01"},
+    )
+    assert who_granted("jira") == (set(), {OWNER, OTHER_OWNER})
+    overseer_client.delete(f"/data-access-policies/{response.json()['id']}")
+
+
+def test_load_matching_checks_the_start_date():
+    """test open-ended policies aren't loaded for accesses before their start date"""
+    with SessionLocal() as session:
+        session.add(
+            DataAccessPolicy(
+                owner_rid=OWNER,
+                tool="git",
+                validity_period_start_date=dt.date(2021, 1, 1),
+            )
+        )
+
+    data_access = DataAccess(
+        user_rid="user@example.com",
+        tool="git",
+        access_kind=DataAccessKind.DIRECT,
+        timestamp=dt.datetime(2020, 8, 1, 12),
+    )
+    with SessionLocal() as session:
+        assert DataAccessPolicyDao.load_matching(session, data_access, [OWNER]) == []
+
+        data_access.timestamp = dt.datetime(2021, 1, 1, 12)
+        (policy,) = DataAccessPolicyDao.load_matching(session, data_access, [OWNER])
+        assert policy.validity_period_end_date is None
+
+        session.delete(policy)
+
+
+def test_bulk_update():
+    """test creating, updating and deleting policies in a single transaction"""
+    ids = [
+        overseer_client.post("/data-access-policies", json={"tool": tool}).json()["id"]
+        for tool in ["jira", "git", "jira"]
+    ]
+    assert who_granted("git") == ({OWNER}, {OTHER_OWNER})
+
+    changes = {
+        "create": [{"tool": "git", "user_rid": "other@example.com"}],
+        "update": [{"id": ids[1], "tool": "jira"}],
+        "delete": [ids[2]],
+    }
+    response = overseer_client.post("/data-access-policies/bulk", json=changes)
+    assert response.status_code == 200
+    result = response.json()
+    assert [policy["tool"] for policy in result["updated"]] == ["jira"]
+    assert result["deleted"] == [ids[2]]
+    created_id = result["created"][0]["id"]
+    assert who_granted("git") == (set(), {OWNER, OTHER_OWNER})
+
+    # nothing is applied if any change is invalid
+    for invalid in [
+        {"create": [{"tool": "unknown-tool"}], "delete": [ids[0]]},
+        {"update": [{"id": created_id + 1000, "tool": "git"}], "delete": [ids[0]]},
+    ]:
+        response = overseer_client.post("/data-access-policies/bulk", json=invalid)
+        assert response.status_code in (400, 404)
+    remaining = overseer_client.get("/data-access-policies").json()
+    assert sorted(policy["id"] for policy in remaining) == [ids[0], ids[1], created_id]
+
+    response = overseer_client.post(
+        "/data-access-policies/bulk",
+        json={
+            "create": [{"tool": "git"}],
+            "update": [changes["update"][0]],
+            "replace": True,
+        },
+    )
+    assert response.json()["deleted"] == [ids[0], created_id]
+    assert who_granted("git") == ({OWNER}, {OTHER_OWNER})
+
+    response = overseer_client.post(
+        "/data-access-policies/bulk", json={"replace": True}
+    )
+    assert overseer_client.get("/data-access-policies").json() == []
+
+
+def test_many_owners():
+    """test accesses with more owners than SQLite allows bound parameters"""
+    response = overseer_client.post("/data-access-policies", json={"tool": "jira"})
+    policy_id = response.json()["id"]
+
+    data_access = DataAccess(
+        user_rid="user@example.com",
+        tool="jira",
+        access_kind=DataAccessKind.AGGREGATE,
+        timestamp=dt.datetime(2020, 8, 1, 12),
+    )
+    others = {f"many-owners-{number}@example.com" for number in range(40000)}
+    data_access.data_owners = [
+        DataOwner(owner_rid=owner_rid) for owner_rid in others | {OWNER}
+    ]
+    policy_decision_cache.clear()
+    with SessionLocal() as session:
+        assert DataAccessPolicyDao.who_granted(session, data_access) == (
+            {OWNER},
+            others,
+        )
+        policies = DataAccessPolicyDao.load_matching(session, data_access)
+        assert [policy.id for policy in policies] == [policy_id]
+
+    overseer_client.delete(f"/data-access-policies/{policy_id}")
@@ -1,7 +1,9 @@
 """ Unit tests creating a local mock Overseer client. """
 
+import pytest
 from fastapi.testclient import TestClient
 
+from overseer.health import health_checker
 from overseer.main import overseer
 
 overseer_client = TestClient(overseer)
@@ -18,3 +20,34 @@ def test_docs_load():
     response = overseer_client.get("/docs")
     assert "text/html" in response.headers["content-type"]
     assert response.status_code == 200
+
+
+def test_liveness():
+    """test the liveness probe doesn't depend on anything"""
+    response = overseer_client.get("/health/live")
+    assert response.status_code == 200
+
+
+def test_readiness():
+    """test the readiness probe reports the status of the dependencies"""
+    response = overseer_client.get("/health/ready")
+    assert response.status_code == 200
+    status = response.json()
+    assert status["ready"] and status["database"]["ok"]
+    assert status["database"]["latency"] >= 0
+    assert "ok" in status["revolori"]
+
+    # served from memory until the status is outdated
+    assert overseer_client.get("/health/ready").json() == status
+
+
+def test_readiness_without_background_checks(monkeypatch):
+    """test outdated statuses are replaced by checking only the database"""
+    monkeypatch.setattr(health_checker, "_status", None)
+    monkeypatch.setattr(health_checker, "_check_revolori", pytest.fail)
+
+    response = overseer_client.get("/health/ready")
+    assert response.status_code == 200
+    status = response.json()
+    assert status["database"]["ok"]
+    assert not status["revolori"]["ok"]
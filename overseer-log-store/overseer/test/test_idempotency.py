@@ -0,0 +1,126 @@
+""" Unit tests for retrying access requests with an Idempotency-Key header. """
+
+from fastapi.testclient import TestClient
+
+from overseer.auth import technical_user_logged_in
+from overseer.db.connection import SessionLocal, init_db
+from overseer.db.models import DataAccess, DataAccessPolicy, Tool
+from overseer.main import overseer
+from overseer.services import RevoloriService
+
+from revolori_stub import CountingRevoloriService
+
+overseer_client = TestClient(overseer)
+
+OWNER = "idempotency-owner@example.com"
+USER = "idempotency-user@example.com"
+
+
+def setup_module():
+    init_db()
+    overseer.dependency_overrides[technical_user_logged_in] = lambda: None
+    overseer.dependency_overrides[RevoloriService] = CountingRevoloriService
+
+    with SessionLocal() as session:
+        for tool in ["jira", "git"]:
+            if session.query(Tool).get(tool) is None:
+                session.add(Tool(name=tool))
+    with SessionLocal() as session:
+        session.add(DataAccessPolicy(owner_rid=OWNER, tool="jira"))
+
+
+def teardown_module():
+    overseer.dependency_overrides.pop(technical_user_logged_in)
+    overseer.dependency_overrides.pop(RevoloriService)
+
+
+def logged_accesses() -> int:
+    with SessionLocal() as session:
+        return session.query(DataAccess).filter(DataAccess.user_rid == USER).count()
+
+
+def request_access(path: str, body: dict, key: str):
+    return overseer_client.post(path, json=body, headers={"Idempotency-Key": key})
+
+
+def test_retries_replay_the_original_response():
+    """test retries neither resolve ids nor log the access again"""
+    body = {
+        "data_types": ["issue"],
+        "justification": "retry",
+        "tool": "jira",
+        "user": USER,
+        "owners": [OWNER],
+    }
+    accesses = logged_accesses()
+    calls = CountingRevoloriService.calls
+
+    response = request_access("/request-access/query", body, "query-1")
+    assert response.status_code == 200
+    assert response.json() == {"granted": True}
+    assert logged_accesses() == accesses + 1
+    assert CountingRevoloriService.calls == calls + 2
+
+    retry = request_access("/request-access/query", body, "query-1")
+    assert retry.status_code == 200
+    assert retry.json() == response.json()
+    assert logged_accesses() == accesses + 1
+    assert CountingRevoloriService.calls == calls + 2
+
+    # without the header, every request is handled
+    assert overseer_client.post("/request-access/query", json=body).status_code == 200
+    assert logged_accesses() == accesses + 2
+
+
+def test_direct_access_retries():
+    """test the single owner endpoint replays its own response"""
+    body = {
+        "data_types": ["issue"],
+        "justification": "retry",
+        "tool": "jira",
+        "user": USER,
+        "owner": OWNER,
+    }
+    accesses = logged_accesses()
+
+    for _ in range(2):
+        response = request_access("/request-access/direct", body, "direct-1")
+        assert response.status_code == 200
+        assert response.json() == {"granted": True}
+    assert logged_accesses() == accesses + 1
+
+
+def test_reused_key_with_different_body():
+    """test a key can't be reused for a different request"""
+    body = {
+        "data_types": ["issue"],
+        "justification": "retry",
+        "tool": "jira",
+        "user": USER,
+        "owners": [OWNER],
+    }
+    assert (
+        request_access("/request-access/aggregate", body, "reused").status_code == 200
+    )
+
+    body["tool"] = "git"
+    assert (
+        request_access("/request-access/aggregate", body, "reused").status_code == 422
+    )
+
+
+def test_reused_key_on_other_endpoint():
+    """test a key can't be reused for a request to another endpoint"""
+    body = {
+        "data_types": ["issue"],
+        "justification": "retry",
+        "tool": "jira",
+        "user": USER,
+        "owners": [OWNER],
+    }
+    assert request_access("/request-access/query", body, "other").status_code == 200
+    accesses = logged_accesses()
+
+    for path in ["/request-access/aggregate", "/request-access/direct/multi"]:
+        assert request_access(path, body, "other").status_code == 422
+    assert logged_accesses() == accesses
@@ -0,0 +1,128 @@
+""" Unit tests for invalidating cached data across worker processes. """
+
+import datetime as dt
+
+from fastapi.testclient import TestClient
+
+from overseer.auth import get_current_user
+from overseer.dao.data_access_policy import DataAccessPolicyDao
+from overseer.db.connection import SessionLocal, engine, init_db
+from overseer.db.models import (
+    CacheInvalidation,
+    DataAccess,
+    DataAccessPolicy,
+    DataOwner,
+    Tool,
+)
+from overseer.invalidation import cache_invalidator
+from overseer.main import overseer
+from overseer.models import DataAccessKind
+
+overseer_client = TestClient(overseer)
+
+OWNER = "invalidation-owner@example.com"
+
+
+def setup_module():
+    init_db()
+    overseer.dependency_overrides[get_current_user] = lambda: OWNER
+
+    with SessionLocal() as session:
+        for tool in ["jira", "git"]:
+            if session.query(Tool).get(tool) is None:
+                session.add(Tool(name=tool))
+    cache_invalidator.poll()
+
+
+def teardown_module():
+    overseer.dependency_overrides.pop(get_current_user)
+
+
+def change_in_other_process(statement, cache: str, key=None):
+    """Change the database like another worker, without touching the own caches"""
+    with engine.begin() as connection:
+        connection.execute(statement)
+        connection.execute(
+            CacheInvalidation.__table__.insert(),
+            dict(cache=cache, key=key, created_at=dt.datetime.now()),
+        )
+
+
+def is_granted() -> bool:
+    data_access = DataAccess(
+        user_rid="user@example.com",
+        tool="jira",
+        access_kind=DataAccessKind.DIRECT,
+        timestamp=dt.datetime(2020, 8, 1, 12),
+    )
+    data_access.data_owners = [DataOwner(owner_rid=OWNER)]
+    with SessionLocal() as session:
+        granted, _ = DataAccessPolicyDao.who_granted(session, data_access)
+    return OWNER in granted
+
+
+def test_policy_changes_of_other_processes():
+    """test cached decisions are invalidated once the changes are polled"""
+    response = overseer_client.post("/data-access-policies", json={"tool": "jira"})
+    assert response.status_code == 200
+    assert is_granted()
+
+    policies = DataAccessPolicy.__table__
+    change_in_other_process(
+        policies.delete().where(policies.c.owner_rid == OWNER),
+        "policy_decisions",
+        OWNER,
+    )
+    assert is_granted()  # still cached
+
+    cache_invalidator.poll()
+    assert not is_granted()
+
+
+def test_tool_changes():
+    """test the cached tools follow changes of this and other processes"""
+    policy = {"tool": "invalidation"}
+    assert overseer_client.post("/data-access-policies", json=policy).status_code == 400
+
+    # added through the ORM, not the DAO
+    with SessionLocal() as session:
+        session.add(Tool(name="invalidation"))
+    assert overseer_client.post("/data-access-policies", json=policy).status_code == 200
+
+    tools = Tool.__table__
+    policies = DataAccessPolicy.__table__
+    with engine.begin() as connection:
+        connection.execute(policies.delete().where(policies.c.tool == "invalidation"))
+    change_in_other_process(
+        tools.delete().where(tools.c.name == "invalidation"), "tools"
+    )
+    cache_invalidator.poll()
+    assert overseer_client.post("/data-access-policies", json=policy).status_code == 400
+
+
+def test_missed_changes_clear_caches():
+    """test a poller which missed pruned changes clears all caches"""
+    response = overseer_client.post("/data-access-policies", json={"tool": "jira"})
+    assert response.status_code == 200
+    assert is_granted()
+
+    policies = DataAccessPolicy.__table__
+    invalidations = CacheInvalidation.__table__
+    change_in_other_process(
+        policies.delete().where(policies.c.owner_rid == OWNER), "unknown"
+    )
+    change_in_other_process(policies.delete().where(policies.c.id < 0), "unknown")
+    with engine.begin() as connection:
+        pruned_id = (
+            connection.execute(
+                invalidations.select().order_by(invalidations.c.id.desc())
+            )
+            .fetchall()[1]
+            .id
+        )
+        connection.execute(
+            invalidations.delete().where(invalidations.c.id == pruned_id)
+        )
+
+    cache_invalidator.poll()
+    assert not is_granted()
@@ -0,0 +1,63 @@
+""" Unit tests for the live feed of data accesses. """
+
+import asyncio
+import datetime as dt
+import json
+
+from overseer.dao.data_access import DataAccessDao
+from overseer.db.connection import SessionLocal, init_db
+from overseer.db.models import DataAccess, DataOwner, Tool
+from overseer.live import access_feed
+from overseer.models import DataAccessKind
+
+
+def setup_module():
+    init_db()
+    with SessionLocal() as session:
+        if session.query(Tool).get("jira") is None:
+            session.add(Tool(name="jira"))
+
+
+def log_access(owner_rids, commit: bool):
+    session = SessionLocal()
+    data_access = DataAccess(
+        user_rid="user@example.com",
+        tool="jira",
+        access_kind=DataAccessKind.DIRECT,
+        timestamp=dt.datetime(2020, 8, 1, 12),
+        justification="live feed test",
+    )
+    data_access.data_owners = [DataOwner(owner_rid=owner) for owner in owner_rids]
+    DataAccessDao.add(session, data_access)
+    if commit:
+        session.commit()
+    else:
+        session.rollback()
+    session.close()
+
+
+def test_committed_accesses_are_published():
+    """test subscribers receive committed accesses of their own data only"""
+
+    async def scenario():
+        loop = asyncio.get_event_loop()
+        owner = access_feed.subscribe("owner@example.com")
+        other = access_feed.subscribe("other@example.com")
+        try:
+            await loop.run_in_executor(None, log_access, ["owner@example.com"], False)
+            await loop.run_in_executor(None, log_access, ["owner@example.com"], True)
+            event = await asyncio.wait_for(owner.queue.get(), timeout=1)
+            assert owner.queue.empty()
+            assert other.queue.empty()
+            return event
+        finally:
+            access_feed.unsubscribe(owner)
+            access_feed.unsubscribe(other)
+
+    event = asyncio.run(scenario())
+    assert event.startswith("event: data-access\n")
+
+    data = json.loads(event.split("data: ", 1)[1])
+    assert data["owner_rid"] == "owner@example.com"
+    assert data["justification"] == "live feed test"
+    assert not access_feed.has_subscribers()
@@ -0,0 +1,107 @@
+""" Unit tests for profiling individual requests. """
+
+import base64
+import os
+import threading
+
+from fastapi.testclient import TestClient
+
+from overseer.auth import get_current_user
+from overseer.db.connection import init_db
+from overseer.main import overseer
+from overseer.profiling import (
+    PROFILE_AUTHORIZATION_HEADER,
+    PROFILE_ID_HEADER,
+    _store_profile,
+)
+from overseer.settings import settings
+
+overseer_client = TestClient(overseer)
+
+admin_credentials = (settings.ADMIN_USER, settings.ADMIN_USER_PASSWORD)
+
+
+def setup_module():
+    init_db()
+    overseer.dependency_overrides[get_current_user] = lambda: "owner@example.com"
+
+
+def teardown_module():
+    overseer.dependency_overrides.pop(get_current_user)
+
+
+def profile_authorization(username: str, password: str) -> dict:
+    credentials = base64.b64encode(f"{username}:{password}".encode()).decode()
+    return {PROFILE_AUTHORIZATION_HEADER: f"Basic {credentials}"}
+
+
+def test_unprofiled_request():
+    """test requests without the profile header are not profiled"""
+    response = overseer_client.get("/data-accesses")
+    assert response.status_code == 200
+    assert PROFILE_ID_HEADER not in response.headers
+
+
+def test_profile_request():
+    """test profiling a route and rendering the stored profile"""
+    response = overseer_client.get(
+        "/data-accesses", headers=profile_authorization(*admin_credentials)
+    )
+    assert response.status_code == 200
+    profile_id = response.headers[PROFILE_ID_HEADER]
+
+    response = overseer_client.get(
+        f"/profiles/{profile_id}", params={"limit": 1000}, auth=admin_credentials
+    )
+    assert response.status_code == 200
+    assert "get_data_accesses" in response.text
+    # dependencies and the serialization of the response are profiled as well
+    assert "data_access_filter" in response.text
+    assert "serialize_response" in response.text
+
+
+def test_old_profiles_are_removed(monkeypatch):
+    """test only the newest profiles are kept"""
+    monkeypatch.setattr(settings, "PROFILE_MAX_COUNT", 2)
+    profile_ids = [
+        overseer_client.get(
+            "/data-accesses", headers=profile_authorization(*admin_credentials)
+        ).headers[PROFILE_ID_HEADER]
+        for _ in range(3)
+    ]
+
+    assert sorted(os.listdir(settings.PROFILE_DIRECTORY)) == sorted(
+        f"{profile_id}.prof" for profile_id in profile_ids[1:]
+    )
+
+
+def test_profiles_are_stored_off_the_event_loop(monkeypatch):
+    """test writing the profile doesn't block the event loop"""
+    threads = []
+
+    def record_thread(*args):
+        threads.append(threading.current_thread())
+        _store_profile(*args)
+
+    monkeypatch.setattr("overseer.profiling._store_profile", record_thread)
+    response = overseer_client.get(
+        "/data-accesses", headers=profile_authorization(*admin_credentials)
+    )
+    assert response.status_code == 200
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_profile_requires_admin():
+    """test profiling is rejected for invalid credentials"""
+    response = overseer_client.get(
+        "/data-accesses", headers=profile_authorization("admin", "wrong-password")
+    )
+    assert response.status_code == 401
+
+
+def test_unknown_profile():
+    """test unknown or malformed profile ids"""
+    response = overseer_client.get("/profiles/../secret", auth=admin_credentials)
+    assert response.status_code == 404
+    response = overseer_client.get("/profiles/0123", auth=admin_credentials)
+    assert response.status_code == 404
@@ -0,0 +1,152 @@
+""" Unit tests for the local replica of Revolori's ID mapping with a stub Revolori. """
+
+import base64
+import datetime as dt
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import overseer.services as services
+from overseer.db.connection import init_db
+from overseer.services import IdMappingError, RevoloriService
+
+CREDENTIALS = ("overseer", "secret")
+
+USERS = [
+    {"email": "ada@example.com", "secondaryIDs": {"slack": ["ada", "ada2"]}},
+    {"email": "bob@example.com", "secondaryIDs": {"slack": ["bob"], "jira": ["b"]}},
+]
+
+
+class StubRevolori(BaseHTTPRequestHandler):
+    """Serves the user list and the ID mapping like Revolori"""
+
+    users = USERS
+    id_requests = []
+
+    def do_GET(self):
+        if self.path == "/user":
+            expected = base64.b64encode(":".join(CREDENTIALS).encode()).decode()
+            if self.headers.get("Authorization") != f"Basic {expected}":
+                return self.respond(401, {"error": "unauthorized"})
+            return self.respond(200, self.users)
+
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        StubRevolori.id_requests.append(body)
+        mapped = {}
+        for tool, ids in body.items():
+            mapped[tool] = {}
+            for id in ids:
+                matches = [
+                    user["email"]
+                    for user in self.users
+                    if id == user["email"] or id in user["secondaryIDs"].get(tool, [])
+                ]
+                if not matches:
+                    return self.respond(400, {"error": "unmatched"})
+                mapped[tool][id] = matches[0]
+        self.respond(200, mapped)
+
+    def respond(self, status: int, body):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def revolori(monkeypatch):
+    init_db()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubRevolori)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    root = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setattr(services.settings, "REVOLORI_SERVICE_ROOT", root)
+    monkeypatch.setattr(services.settings, "REVOLORI_USER", CREDENTIALS[0])
+    monkeypatch.setattr(services.settings, "REVOLORI_PASSWORD", CREDENTIALS[1])
+    monkeypatch.setattr(services.mapping_replica, "enabled", True)
+    monkeypatch.setattr(services.mapping_replica, "max_age", 60)
+    monkeypatch.setattr(StubRevolori, "id_requests", [])
+    yield StubRevolori
+    server.shutdown()
+
+
+def test_ids_are_resolved_locally(revolori):
+    """test synchronized ids are resolved without asking Revolori"""
+    result = services.mapping_replica.sync()
+    assert result.total == 6  # including the primary ids
+
+    assert RevoloriService.get_id_mapping("slack", ["ada", "ada2", "bob"]) == {
+        "ada@example.com": {"ada", "ada2"},
+        "bob@example.com": {"bob"},
+    }
+    assert RevoloriService.map_id("jira", "ada@example.com") == "ada@example.com"
+    assert revolori.id_requests == []
+
+
+def test_only_missing_ids_are_requested(revolori, monkeypatch):
+    """test ids which are not replicated yet are resolved by Revolori"""
+    services.mapping_replica.sync()
+    users = USERS + [{"email": "cy@example.com", "secondaryIDs": {"slack": ["cy"]}}]
+    monkeypatch.setattr(revolori, "users", users)
+
+    assert RevoloriService.map_ids("slack", ["ada", "cy"]) == {
+        "ada@example.com",
+        "cy@example.com",
+    }
+    assert revolori.id_requests == [{"slack": ["cy"]}]
+
+    with pytest.raises(IdMappingError):
+        RevoloriService.map_ids("slack", ["ada", "unknown"])
+
+
+def test_sync_writes_differences(revolori, monkeypatch):
+    """test a sync only adds, updates and removes changed mappings"""
+    services.mapping_replica.sync()
+    users = [
+        {"email": "ada@example.com", "secondaryIDs": {"slack": ["ada", "bob"]}},
+        {"email": "bob@example.com", "secondaryIDs": {"jira": ["b", "b2"]}},
+    ]
+    monkeypatch.setattr(revolori, "users", users)
+
+    result = services.mapping_replica.sync()
+    assert (result.added, result.updated, result.removed) == (1, 1, 1)
+    assert RevoloriService.map_id("slack", "bob") == "ada@example.com"
+
+
+def test_stale_replica_is_not_used(revolori, monkeypatch):
+    """test IDs are resolved by Revolori if the replica wasn't synchronized lately"""
+    services.mapping_replica.sync()
+    last_sync = dt.datetime.now() - dt.timedelta(seconds=61)
+    monkeypatch.setattr(services.mapping_replica, "last_sync", last_sync)
+
+    assert RevoloriService.map_id("slack", "ada") == "ada@example.com"
+    assert revolori.id_requests == [{"slack": ["ada"]}]
+
+
+def test_first_matching_user_wins(revolori, monkeypatch):
+    """test the replica maps IDs to the same user as Revolori"""
+    users = [
+        {"email": "ada@example.com", "secondaryIDs": {"slack": ["bob@example.com"]}},
+        {"email": "bob@example.com", "secondaryIDs": {"slack": ["ada@example.com"]}},
+    ]
+    monkeypatch.setattr(revolori, "users", users)
+    services.mapping_replica.sync()
+
+    ids = ["ada@example.com", "bob@example.com"]
+    expected = {id: RevoloriService.resolve_remote_ids("slack", [id])[id] for id in ids}
+    assert expected == {
+        "ada@example.com": "ada@example.com",
+        "bob@example.com": "ada@example.com",
+    }
+    monkeypatch.setattr(revolori, "id_requests", [])
+
+    assert RevoloriService.resolve_ids("slack", ids) == expected
+    assert revolori.id_requests == []
@@ -0,0 +1,202 @@
+""" Unit tests for resolving tool specific IDs with Revolori. """
+
+import logging
+import socket
+import threading
+import time
+from typing import Dict, List
+
+import pytest
+from fastapi import HTTPException
+
+import overseer.services as services
+from overseer.exception import handle_revolori_unavailable
+from overseer.services import (
+    ChunkedFetcher,
+    CircuitBreaker,
+    IdMappingError,
+    IdResolver,
+    MappingCache,
+    RevoloriService,
+    RevoloriUnavailable,
+)
+
+MAPPED_IDS = {f"user-{i}@example.com": f"rid-{i}" for i in range(10)}
+
+
+class FakeRevolori:
+    """Maps the known ids like Revolori, rejecting requests with unknown ids"""
+
+    def __init__(self):
+        self.requests: List[List[str]] = []
+        self.lock = threading.Lock()
+
+    def fetch(self, tool: str, ids: List[str]) -> Dict[str, str]:
+        with self.lock:
+            self.requests.append(sorted(ids))
+        if any(id not in MAPPED_IDS for id in ids):
+            raise IdMappingError()
+        return {id: MAPPED_IDS[id] for id in ids}
+
+
+def resolve_concurrently(resolver: IdResolver, lookups: List[List[str]]):
+    results = [None] * len(lookups)
+
+    def resolve(index: int):
+        try:
+            results[index] = resolver.resolve("jira", lookups[index])
+        except IdMappingError as exc:
+            results[index] = exc
+
+    threads = [
+        threading.Thread(target=resolve, args=(index,)) for index in range(len(lookups))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_lookups_are_batched():
+    """test concurrent lookups within the window share one request"""
+    revolori = FakeRevolori()
+    resolver = IdResolver(revolori.fetch, window=0.2)
+    ids = list(MAPPED_IDS)
+    lookups = [[ids[0]], [ids[0]], [ids[1], ids[2]], [ids[0], ids[3]]]
+
+    results = resolve_concurrently(resolver, lookups)
+
+    assert revolori.requests == [sorted(ids[:4])]
+    for lookup, result in zip(lookups, results):
+        assert result == {id: MAPPED_IDS[id] for id in lookup}
+
+
+def test_rejected_batches_are_retried_separately():
+    """test an unmapped id only fails the lookup which contains it"""
+    revolori = FakeRevolori()
+    resolver = IdResolver(revolori.fetch, window=0.2)
+    ids = list(MAPPED_IDS)
+
+    results = resolve_concurrently(resolver, [[ids[0]], ["unknown"], [ids[1]]])
+
+    assert results[0] == {ids[0]: MAPPED_IDS[ids[0]]}
+    assert isinstance(results[1], IdMappingError)
+    assert results[2] == {ids[1]: MAPPED_IDS[ids[1]]}
+    assert len(revolori.requests) == 4
+
+
+def test_rejected_single_lookup_is_not_retried():
+    revolori = FakeRevolori()
+    resolver = IdResolver(revolori.fetch, window=0)
+
+    with pytest.raises(IdMappingError):
+        resolver.resolve("jira", ["unknown"])
+    assert len(revolori.requests) == 1
+
+
+def test_large_lookups_are_chunked(monkeypatch):
+    """test large lookups are split into requests which are merged again"""
+    revolori = FakeRevolori()
+    fetcher = ChunkedFetcher(revolori.fetch, chunk_size=3, max_parallel=2)
+    monkeypatch.setattr(services, "id_resolver", IdResolver(fetcher.fetch, window=0))
+    monkeypatch.setattr(services, "mapping_cache", MappingCache(max_size=0))
+    ids = list(MAPPED_IDS)
+
+    mapping = RevoloriService.get_id_mapping("jira", ids)
+
+    assert mapping == {rid: {id} for id, rid in MAPPED_IDS.items()}
+    assert sorted(len(request) for request in revolori.requests) == [1, 3, 3, 3]
+
+
+def test_unmapped_chunk_fails_fast():
+    """test the chunks after an unmapped one aren't requested anymore"""
+    revolori = FakeRevolori()
+    fetcher = ChunkedFetcher(revolori.fetch, chunk_size=1, max_parallel=1)
+
+    with pytest.raises(IdMappingError):
+        fetcher.fetch("jira", ["unknown"] * 2 + list(MAPPED_IDS))
+    assert len(revolori.requests) < len(MAPPED_IDS)
+
+
+def test_circuit_breaker():
+    """test the circuit opens after repeated failures and closes after a trial"""
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.1)
+
+    def fail():
+        raise RevoloriUnavailable("timeout")
+
+    for _ in range(2):
+        with pytest.raises(RevoloriUnavailable):
+            breaker.call(fail)
+    assert breaker.is_open
+
+    # fails fast without calling the function
+    with pytest.raises(RevoloriUnavailable):
+        breaker.call(pytest.fail, "called while open")
+    assert breaker.rejected == 1
+
+    time.sleep(0.1)
+    with pytest.raises(IdMappingError):
+        breaker.call(FakeRevolori().fetch, "jira", ["unknown"])
+    assert not breaker.is_open
+
+
+def test_unreachable_revolori_is_unavailable(monkeypatch):
+    """test connection errors don't surface as generic errors"""
+    with socket.socket() as closed:
+        closed.bind(("127.0.0.1", 0))
+        root = f"http://127.0.0.1:{closed.getsockname()[1]}"
+    monkeypatch.setattr(services.settings, "REVOLORI_SERVICE_ROOT", root)
+
+    with pytest.raises(RevoloriUnavailable):
+        RevoloriService.fetch_ids("jira", ["user@example.com"])
+
+
+def test_unavailable_revolori_is_logged_without_stack(caplog):
+    """test rejected requests don't log a stack trace each"""
+    with pytest.raises(HTTPException) as error:
+        with handle_revolori_unavailable():
+            raise RevoloriUnavailable("Revolori is failing, not calling it.")
+
+    assert error.value.status_code == 503
+    (record,) = caplog.records
+    assert record.levelno == logging.WARNING
+    assert record.exc_info is None
+
+
+def test_stale_mappings_are_served_during_outages(monkeypatch):
+    """test known mappings are served if Revolori fails"""
+    revolori = FakeRevolori()
+    monkeypatch.setattr(services, "id_resolver", IdResolver(revolori.fetch, window=0))
+    monkeypatch.setattr(services, "mapping_cache", MappingCache(max_size=100))
+    ids = list(MAPPED_IDS)[:2]
+
+    expected = {id: MAPPED_IDS[id] for id in ids}
+    assert RevoloriService.resolve_ids("jira", ids) == expected
+
+    def fail(tool: str, ids: List[str]):
+        raise RevoloriUnavailable("timeout")
+
+    monkeypatch.setattr(services, "id_resolver", IdResolver(fail, window=0))
+    assert RevoloriService.resolve_ids("jira", ids) == expected
+    with pytest.raises(RevoloriUnavailable):
+        RevoloriService.resolve_ids("jira", ["user-9@example.com"])
+
+
+def test_stale_while_revalidate(monkeypatch):
+    """test known mappings are served right away and refreshed in the background"""
+    revolori = FakeRevolori()
+    monkeypatch.setattr(services, "id_resolver", IdResolver(revolori.fetch, window=0))
+    monkeypatch.setattr(services, "mapping_cache", MappingCache(max_size=100))
+    monkeypatch.setattr(services.settings, "REVOLORI_MAPPING_MAX_AGE", 0.05)
+    ids = list(MAPPED_IDS)[:1]
+
+    RevoloriService.resolve_ids("jira", ids)
+    RevoloriService.resolve_ids("jira", ids)
+    assert len(revolori.requests) == 1
+
+    time.sleep(0.05)
+    assert RevoloriService.resolve_ids("jira", ids) == {ids[0]: MAPPED_IDS[ids[0]]}
+    services.revalidation_executor.submit(lambda: None).result()
+    assert len(revolori.requests) == 2
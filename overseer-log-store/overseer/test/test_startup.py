@@ -0,0 +1,47 @@
+""" Unit tests for preparing the database schema on startup. """
+
+import os
+
+import pytest
+
+from alembic.script import ScriptDirectory
+from overseer.db.connection import SCHEMA_REVISION, engine, init_db, verify_schema
+
+ALEMBIC_DIRECTORY = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "alembic"
+)
+
+
+def setup_module():
+    init_db()
+
+
+def test_verify_schema():
+    """test the schema is only accepted at the latest alembic revision"""
+    with engine.begin() as connection:
+        connection.execute("DROP TABLE IF EXISTS alembic_version")
+
+    with pytest.raises(RuntimeError, match="revision none"):
+        verify_schema()
+
+    with engine.begin() as connection:
+        connection.execute("CREATE TABLE alembic_version (version_num VARCHAR(32))")
+        connection.execute("INSERT INTO alembic_version VALUES ('1f136811cab5')")
+
+    with pytest.raises(RuntimeError, match="revision 1f136811cab5"):
+        verify_schema()
+
+    with engine.begin() as connection:
+        connection.execute(
+            "UPDATE alembic_version SET version_num = ?", SCHEMA_REVISION
+        )
+
+    verify_schema()
+
+    with engine.begin() as connection:
+        connection.execute("DROP TABLE alembic_version")
+
+
+def test_schema_revision_is_head():
+    """test the revision expected on startup is the latest migration"""
+    assert ScriptDirectory(ALEMBIC_DIRECTORY).get_current_head() == SCHEMA_REVISION